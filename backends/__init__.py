@@ -4,3 +4,5 @@ A backend detects Wayland protocol connections/objects/messages and passes them
 
 from . import gdb_plugin
 from . import libwayland_debug_output
+from . import preload_shim
+from . import wire_proxy
@@ -1,3 +1,4 @@
+import sys
 import gdb # type: ignore
 from typing import Dict, Tuple, Any, List, Tuple
 
@@ -48,7 +49,7 @@ def extract_message(closure, object: wl.ObjectBase, is_sending: bool, new_id_is_
     Arguments: list of wl.Arg
     '''
     closure_message = _fast_access(closure, 'wl_closure.message')
-    message_name = _fast_access(closure_message, 'wl_message.name').string()
+    message_name = sys.intern(_fast_access(closure_message, 'wl_message.name').string())
     # The signiture is that stupid '2uufo?i' thing that has the type info
     signiture = _fast_access(closure_message, 'wl_message.signature').string()
     message_types = _fast_access(closure_message, 'wl_message.types')
@@ -87,7 +88,7 @@ def extract_message(closure, object: wl.ObjectBase, is_sending: bool, new_id_is_
                 if _is_null(arg_type):
                     arg_type_name = None
                 else:
-                    arg_type_name = arg_type['name'].string()
+                    arg_type_name = sys.intern(arg_type['name'].string())
                 if _is_null(value):
                     args.append(wl.Arg.Null(arg_type_name))
                 else:
@@ -98,7 +99,7 @@ def extract_message(closure, object: wl.ObjectBase, is_sending: bool, new_id_is_
                 if _is_null(arg_type):
                     arg_type_name = None
                 else:
-                    arg_type_name = arg_type['name'].string()
+                    arg_type_name = sys.intern(arg_type['name'].string())
                 if new_id_is_actually_an_object:
                     arg_id = int(_fast_access(closure_args[i]['o'], 'wl_object.id'))
                 else:
@@ -138,7 +139,7 @@ def received_message() -> Tuple[str, wl.Message]:
     connection_id = connection_id_of(connection)
     object_id = int(_fast_access(closure, 'wl_closure.sender_id'))
     # wl_object is not a pointer, so can't use _fast_access() to get interface
-    obj_type = _fast_access(wl_object['interface'], 'wl_interface.name').string()
+    obj_type = sys.intern(_fast_access(wl_object['interface'], 'wl_interface.name').string())
     object = wl.UnresolvedObject(object_id, obj_type)
     message = extract_message(closure, object, False, new_id_is_actually_an_object)
     return connection_id, message
@@ -2,4 +2,8 @@
 Parses the logs generated by libwayland when a Wayland app or server is run with WAYLAND_DEBUG=1
 '''
 from . import parse
+from . import time_range
+from . import merge
+from .log_file import open_log
+from .pipeline import Pipeline
 from .runner import run_program
@@ -0,0 +1,102 @@
+'''
+Checkpoints of the state of each connection part way through a log, kept in a file next to the log
+How each message resolves depends on every message before it, so loading part of a log normally means scanning
+everything before it. With checkpoints loading can start from the last checkpoint before the part being loaded instead.
+Only uncompressed logs can have checkpoints, since compressed logs can't be seeked.
+'''
+import os
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from interfaces import ConnectionIDSink
+from . import parse
+
+logger = logging.getLogger(__name__)
+
+# Increment when the format of checkpoint files changes, files with a different version are ignored
+version = 6
+
+# How many bytes of log there are between checkpoints
+interval = 1 << 24
+
+class Checkpoint:
+    '''The state of the connections after the lines up to offset have been processed'''
+    def __init__(self, offset: int, last_time: int, state: Dict[str, Any]) -> None:
+        self.offset = offset
+        self.last_time = last_time
+        self.state = state
+
+    def restore(self, parser: parse.Parser, sink: ConnectionIDSink) -> None:
+        '''Open the connections in the sink as they were, the parser must not have seen any messages yet'''
+        sink.load_state(self.state)
+        parser.known_connections.update(
+            i['connection_id'] for i in self.state['connections'] if i['close_time'] is None)
+        parser.last_time = self.last_time
+
+def sidecar_path(log_path: str) -> str:
+    '''Returns the path of the file the checkpoints of a log are kept in'''
+    return log_path + '.checkpoints'
+
+def _log_identity(log_path: str) -> List[int]:
+    '''Checkpoints are only used if the log has not changed since they were written'''
+    stat = os.stat(log_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def load(log_path: str) -> List[Checkpoint]:
+    '''Returns the checkpoints of a log ordered by offset, or an empty list if it has none that are up to date'''
+    try:
+        with open(sidecar_path(log_path)) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError) as e:
+        logger.info('Could not read checkpoints of ' + log_path + ': ' + str(e))
+        return []
+    if data.get('version') != version or data.get('log') != _log_identity(log_path):
+        logger.info('Ignoring out of date checkpoints of ' + log_path)
+        return []
+    return [Checkpoint(i['offset'], i['last_time'], i['state']) for i in data['checkpoints']]
+
+def save(log_path: str, checkpoints: List[Checkpoint]) -> None:
+    '''Replace the checkpoints of a log'''
+    data = {
+        'version': version,
+        'log': _log_identity(log_path),
+        'checkpoints': [{'offset': i.offset, 'last_time': i.last_time, 'state': i.state} for i in checkpoints],
+    }
+    path = sidecar_path(log_path)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f)
+    os.replace(path + '.tmp', path)
+
+def latest_before(checkpoints: List[Checkpoint], offset: int) -> Optional[Checkpoint]:
+    '''Returns the last checkpoint at or before offset, or None if there isn't one'''
+    result = None
+    for checkpoint in checkpoints:
+        if checkpoint.offset > offset:
+            break
+        result = checkpoint
+    return result
+
+class Writer:
+    '''Takes a checkpoint every interval bytes while a log is being loaded'''
+    def __init__(self, log_path: str, parser: parse.Parser, sink: ConnectionIDSink, existing: List[Checkpoint], offset: int) -> None:
+        '''
+        existing: the checkpoints the log already has, the ones up to offset are kept
+        offset: where in the log loading starts from
+        '''
+        self.log_path = log_path
+        self.parser = parser
+        self.sink = sink
+        self.checkpoints = [i for i in existing if i.offset <= offset]
+        self.next_offset = offset + interval
+
+    def reached(self, offset: int) -> None:
+        '''Called once all lines up to offset have been processed'''
+        if offset >= self.next_offset:
+            self.checkpoints.append(Checkpoint(offset, self.parser.last_time, self.sink.save_state()))
+            self.next_offset = offset + interval
+
+    def save(self) -> None:
+        save(self.log_path, self.checkpoints)
@@ -0,0 +1,53 @@
+import io
+import gzip
+import lzma
+from typing import IO, Any, Callable, List, Tuple
+
+# Compressed input is decompressed in blocks of this many bytes
+block_size = 1 << 20
+
+def _open_zstd(path: str) -> Any:
+    try:
+        import zstandard # type: ignore
+    except ImportError as e:
+        raise RuntimeError('Log is compressed with zstd, which needs the zstandard Python package') from e
+    raw = open(path, 'rb', buffering=block_size)
+    return zstandard.ZstdDecompressor().stream_reader(raw, read_size=block_size, closefd=True)
+
+# Magic bytes each supported compression format starts with, and how to open it as a binary stream
+_formats: List[Tuple[bytes, str, Callable[[str], Any]]] = [
+    (b'\x1f\x8b', 'gzip', lambda path: gzip.open(path, 'rb')),
+    (b'\xfd7zXZ\x00', 'xz', lambda path: lzma.open(path, 'rb')),
+    (b'\x28\xb5\x2f\xfd', 'zstd', _open_zstd),
+]
+
+def compression(path: str) -> str:
+    '''Returns the name of the compression the file at path uses, or an empty string if it is not compressed'''
+    with open(path, 'rb') as f:
+        start = f.read(max(len(magic) for magic, _, _ in _formats))
+    for magic, name, _ in _formats:
+        if start.startswith(magic):
+            return name
+    return ''
+
+def _open_decompressed(path: str, name: str) -> IO[bytes]:
+    opener = next(opener for _, format_name, opener in _formats if format_name == name)
+    return io.BufferedReader(opener(path), buffer_size=block_size)
+
+def open_log_bytes(path: str) -> IO[bytes]:
+    '''Like open_log(), but the lines are read as undecoded bytes
+    Only uncompressed logs can be seeked, check with compression() first
+    '''
+    name = compression(path)
+    if not name:
+        return open(path, 'rb')
+    return _open_decompressed(path, name)
+
+def open_log(path: str) -> IO[str]:
+    '''Open a log file for reading as text, transparently decompressing gzip, xz and zstd logs as they are read
+    Raises: FileNotFoundError if the file does not exist, RuntimeError if the compression is not supported
+    '''
+    name = compression(path)
+    if not name:
+        return open(path)
+    return io.TextIOWrapper(_open_decompressed(path, name), encoding='utf-8', errors='replace')
@@ -0,0 +1,73 @@
+'''
+Loads several logs at once (such as a compositor's and those of its clients), merged into one stream by timestamp
+Each log is parsed as it is read, and a heap picks whichever has the earliest next line, so only a batch of each log is
+in memory at a time. Every log has its own parser and sink, so connection IDs in different logs never collide.
+'''
+import heapq
+from typing import IO, Iterator, List, Tuple
+
+from interfaces import ConnectionIDSink
+from core import wl
+from core.output import Output
+from . import parse, time_range
+from .log_file import open_log, open_log_bytes
+
+# The most lines from one log that are passed to its parser at once
+run_size = 1 << 10
+
+# A parsed line, the time to sort it by, which log it is from and its line number (so ties never compare the items)
+_Entry = Tuple[int, int, int, parse.Item]
+
+def _entries(log: IO[str], index: int) -> Iterator[_Entry]:
+    '''Lines that are not messages take the time of the message before them, so they keep their place in the log'''
+    time = -1
+    line_number = 0
+    while True:
+        try:
+            lines = log.readlines(parse.read_batch_size)
+        except KeyboardInterrupt:
+            return
+        if not lines:
+            return
+        for line in lines:
+            item = parse.parse_item(line)
+            if isinstance(item[1], wl.Message):
+                time = item[1].timestamp
+            yield time, index, line_number, item
+            line_number += 1
+
+def into_sinks(paths: List[str], out: Output, sinks: List[ConnectionIDSink]) -> None:
+    '''Load the logs at paths, each into the sink at the same index
+    The messages of each log must be in order. Consecutive messages from the same log are passed on together.
+    Raises: FileNotFoundError if a file does not exist, RuntimeError if the compression is not supported
+    '''
+    assert len(paths) == len(sinks)
+    firsts = []
+    for path in paths:
+        with open_log_bytes(path) as raw:
+            first = time_range.first_timestamp(raw)
+        if first is not None:
+            firsts.append(first)
+    if firsts:
+        # Logs can start at different times, so timestamps are relative to whichever starts first
+        for sink in sinks:
+            sink.set_start_time(min(firsts))
+    parsers = [parse.Parser(out, sink) for sink in sinks]
+    logs = [open_log(path) for path in paths]
+    try:
+        run: List[parse.Item] = []
+        run_index = 0
+        for _, index, _, item in heapq.merge(*(_entries(log, i) for i, log in enumerate(logs))):
+            if index != run_index or len(run) >= run_size:
+                if run:
+                    parsers[run_index].process_items(run)
+                run = []
+                run_index = index
+            run.append(item)
+        if run:
+            parsers[run_index].process_items(run)
+    finally:
+        for log in logs:
+            log.close()
+    for parser in parsers:
+        parser.cleanup()
@@ -1,5 +1,6 @@
 import re
-from typing import IO, Iterator, Optional, List, Tuple, Set
+import sys
+from typing import IO, Any, AnyStr, Callable, Iterator, Optional, List, Tuple, Set, Union
 
 from interfaces import ConnectionIDSink
 from core import wl
@@ -29,7 +30,7 @@ class WlPatterns:
             array_re + '|' +
             fd_re + r')$')
         self.arg_re = re.compile(all_args_re)
-        timestamp_regex = r'\[\s*(?P<timestamp>\d+[\.,]\d+)\s*\]'
+        timestamp_regex = r'\[\s*(?P<ms>\d+)[\.,](?P<fraction>\d+)\s*\]'
         conn_re = r'( \<(?P<conn>\w+)\>)?'
         queue_re = r'( {.*})?'
         message_regex = r'(?P<type>\w+)[@#](?P<id>\d+)\.(?P<message>\w+)\((?P<args>.*)\)$'
@@ -48,10 +49,12 @@ def argument(p: WlPatterns, value_str: str) -> wl.Arg.Base:
         if match.group('int'):
             return wl.Arg.Int(int(value_str))
         elif match.group('obj_id'):
-            return wl.Arg.Object(wl.UnresolvedObject(int(match.group('obj_id')), match.group('obj_type')), False)
+            return wl.Arg.Object(wl.UnresolvedObject(int(match.group('obj_id')), sys.intern(match.group('obj_type'))), False)
         elif match.group('new_id'):
             type_name: Optional[str] = match.group('new_type')
-            if not type_name:
+            if type_name:
+                type_name = sys.intern(type_name)
+            else:
                 type_name = None
             return wl.Arg.Object(wl.UnresolvedObject(int(match.group('new_id')), type_name), True)
         elif match.group('nil'):
@@ -93,6 +96,18 @@ def argument_list(p: WlPatterns, args_str: str) -> Tuple[wl.Arg.Base, ...]:
     str_list = argument_list_strs(args_str)
     return tuple(argument(p, s) for s in str_list)
 
+def microseconds(ms: AnyStr, fraction: AnyStr) -> int:
+    '''Turns the parts of a timestamp such as [770203.519] (milliseconds, then the fraction after the point) into
+    whole microseconds, without going through a float
+    '''
+    digits = len(fraction)
+    if digits == 3:
+        return int(ms) * 1000 + int(fraction)
+    elif digits < 3:
+        return int(ms) * 1000 + int(fraction) * 10 ** (3 - digits)
+    else:
+        return int(ms) * 1000 + int(fraction[:3])
+
 def message(raw: str) -> Tuple[str, wl.Message]:
     p = WlPatterns.lazy_get_instance()
     sent = True
@@ -102,57 +117,146 @@ def message(raw: str) -> Tuple[str, wl.Message]:
         match = p.in_msg_re.search(raw)
     if not match:
         raise RuntimeError(raw)
-    abs_timestamp = float(match.group('timestamp').replace(',', '.')) / 1000.0
+    timestamp = microseconds(match.group('ms'), match.group('fraction'))
     conn_id = match.group('conn')
     if not conn_id:
         conn_id = 'PARSED'
-    type_name = match.group('type')
+    type_name = sys.intern(match.group('type'))
     obj_id = int(match.group('id'))
-    message_name = match.group('message')
+    message_name = sys.intern(match.group('message'))
     message_args_str = match.group('args')
     message_args = argument_list(p, message_args_str)
-    return conn_id, wl.Message(abs_timestamp, wl.UnresolvedObject(obj_id, type_name), sent, message_name, message_args)
+    return conn_id, wl.Message(timestamp, wl.UnresolvedObject(obj_id, type_name), sent, message_name, message_args)
+
+def split_lines(partial_line: bytes, data: bytes) -> Tuple[List[str], bytes]:
+    '''Split a chunk of raw output into lines
+    partial_line: the unterminated end of the previous chunk
+    returns: the complete lines, and the new unterminated end
+    '''
+    lines = (partial_line + data).split(b'\n')
+    partial_line = lines.pop()
+    return [line.decode('utf-8', 'replace') for line in lines], partial_line
+
+# A parsed message and the connection ID it was on, or None and a line that could not be parsed
+Item = Tuple[Optional[str], Union[wl.Message, str]]
+
+# How many bytes of lines are read from a file at a time
+read_batch_size = 1 << 16
+
+def parse_item(line: str) -> Item:
+    try:
+        return message(line.strip())
+    except RuntimeError as e:
+        return None, str(e)
 
 class Parser:
     def __init__(self, out: Output, sink: ConnectionIDSink):
         self.out = out
         self.sink = sink
         self.known_connections: Set[str] = set()
-        self.last_time = 0.0
+        self.last_time = 0
+        self.parse = True
+        self.partial_line = b''
 
-    def handle_message(self, conn_id: str, msg: wl.Message):
-        self.last_time = msg.timestamp
+    def _open_if_new(self, conn_id: str, first: wl.Message) -> None:
         if not conn_id in self.known_connections:
             self.known_connections.add(conn_id)
             is_server = None
-            if msg.name ==  'get_registry':
-                is_server = not msg.sent
-            self.sink.open_connection(self.last_time, conn_id, is_server)
+            if first.name ==  'get_registry':
+                is_server = not first.sent
+            self.sink.open_connection(first.timestamp, conn_id, is_server)
+
+    def handle_message(self, conn_id: str, msg: wl.Message):
+        self.last_time = msg.timestamp
+        self._open_if_new(conn_id, msg)
         self.sink.message(conn_id, msg)
 
+    def handle_messages(self, conn_id: str, msgs: List[wl.Message]) -> None:
+        '''Like handle_message(), but for several messages on the same connection'''
+        self.last_time = msgs[-1].timestamp
+        self._open_if_new(conn_id, msgs[0])
+        self.sink.messages(conn_id, msgs)
+
+    def track_line(self, line: str) -> None:
+        '''Parse a line that is not being loaded, it only updates which objects exist'''
+        try:
+            conn_id, msg = message(line.strip())
+        except RuntimeError:
+            return
+        self._process(self._track, conn_id, msg)
+
+    def _track(self, conn_id: str, msg: wl.Message) -> None:
+        self.last_time = msg.timestamp
+        self._open_if_new(conn_id, msg)
+        self.sink.track(conn_id, msg)
+
+    def parse_line(self, line: str) -> None:
+        try:
+            conn_id, msg = message(line.strip())
+        except RuntimeError as e:
+            self.out.unprocessed(str(e))
+            return
+        self.process_message(conn_id, msg)
+
+    def process_message(self, conn_id: str, msg: wl.Message) -> None:
+        '''Handle an already parsed message'''
+        self._process(self.handle_message, conn_id, msg)
+
+    def process_items(self, items: List[Item]) -> None:
+        '''Handle parsed lines, consecutive messages on the same connection are passed to the sink together'''
+        run: List[wl.Message] = []
+        run_conn_id = ''
+        for conn_id, parsed in items:
+            if conn_id is not None and conn_id == run_conn_id:
+                assert isinstance(parsed, wl.Message)
+                run.append(parsed)
+                continue
+            if run:
+                self._process(self.handle_messages, run_conn_id, run)
+                run = []
+            if conn_id is None:
+                assert isinstance(parsed, str)
+                self.out.unprocessed(parsed)
+                run_conn_id = ''
+            else:
+                assert isinstance(parsed, wl.Message)
+                run.append(parsed)
+                run_conn_id = conn_id
+        if run:
+            self._process(self.handle_messages, run_conn_id, run)
+
+    def _process(self, handle: Callable[[str, Any], None], conn_id: str, parsed: Any) -> None:
+        if not self.parse:
+            return
+        try:
+            handle(conn_id, parsed)
+        except RuntimeError as e:
+            self.out.unprocessed(str(e))
+        except Exception as e:
+            import traceback
+            self.out.show(traceback.format_exc())
+            self.out.error(e)
+            self.parse = False
+
     def parse_all(self, input_file: IO):
-        parse = True
         while True:
             try:
-                line = input_file.readline()
+                lines = input_file.readlines(read_batch_size)
             except KeyboardInterrupt:
                 break
-            if line == '':
+            if not lines:
                 break
-            line = line.strip() # be sure to strip after the empty check
-            try:
-                conn_id, msg = message(line)
-                if parse:
-                    self.handle_message(conn_id, msg)
-            except RuntimeError as e:
-                self.out.unprocessed(str(e))
-            except Exception as e:
-                import traceback
-                self.out.show(traceback.format_exc())
-                self.out.error(e)
-                parse = False
+            self.process_items([parse_item(line) for line in lines])
+
+    def feed(self, data: bytes) -> None:
+        '''Parse a chunk of raw output, which does not need to start or end on a line boundary'''
+        lines, self.partial_line = split_lines(self.partial_line, data)
+        self.process_items([parse_item(line) for line in lines])
 
     def cleanup(self):
+        if self.partial_line:
+            self.parse_line(self.partial_line.decode('utf-8', 'replace'))
+            self.partial_line = b''
         for conn_id in self.known_connections:
             self.sink.close_connection(self.last_time, conn_id)
 
@@ -0,0 +1,132 @@
+import os
+import queue
+import threading
+import logging
+from typing import Optional, List, Union
+
+from interfaces import ConnectionIDSink, UIState
+from frontends.tui import Backpressure
+from core.output import Output
+from . import parse
+
+logger = logging.getLogger(__name__)
+
+read_size = 1 << 16
+# Parsed messages are queued in batches of up to this size, to keep locking and thread switching overhead low
+max_batch_size = 256
+
+# Parsed lines, or (with drop-display) raw output that ends at the end of a line
+Batch = Union[List[parse.Item], bytes]
+
+class Pipeline:
+    '''Reads and parses WAYLAND_DEBUG output on a background thread
+    Parsed messages wait in a bounded queue until run() passes them to the sink, which is where they get resolved,
+    matched and shown. When the queue is full the parsing thread stops reading, so the program writing the output
+    blocks.
+    With the drop-display backpressure policy the thread never stops reading, and the queue is not bounded. Parsing
+    is most of the work it would do (and it shares the GIL with the main thread), so it only queues raw output and
+    run() parses it. Once the backlog of queued lines is mostly full, the lines run() takes from the queue are
+    loaded into history only: output is suppressed until the backlog is processed.
+    '''
+    def __init__(
+        self,
+        out: Output,
+        sink: ConnectionIDSink,
+        ui_state: UIState,
+        backpressure: Backpressure,
+        queue_size: int
+    ) -> None:
+        self.out = out
+        self.ui_state = ui_state
+        self.backpressure = backpressure
+        self.parser = parse.Parser(out, sink)
+        self.batch_size = max(min(queue_size // 4, max_batch_size), 1)
+        max_batches = max(queue_size // self.batch_size, 1)
+        drop_display = backpressure == Backpressure.DROP_DISPLAY
+        self.queue: 'queue.Queue[Optional[Batch]]' = queue.Queue(maxsize=0 if drop_display else max_batches)
+        # Lines queued with drop-display, changed by both threads so protected by the lock
+        self.backlog = 0
+        self.backlog_lock = threading.Lock()
+        # Thresholds are in lines
+        self.suppress_at = max(queue_size * 3 // 4, 1)
+        self.unsuppress_at = queue_size // 4
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self, fd: int) -> None:
+        '''Start reading from the given file descriptor on a background thread
+        The file descriptor is closed once it reaches end of file
+        '''
+        read = self._read_raw if self.backpressure == Backpressure.DROP_DISPLAY else self._read
+        self.thread = threading.Thread(name='parser', target=read, args=(fd,), daemon=True)
+        self.thread.start()
+
+    def run(self) -> None:
+        '''Processes parsed messages until the input ends, must be called on the main thread'''
+        suppressed = False
+        try:
+            while True:
+                batch = self.queue.get()
+                if batch is None:
+                    break
+                if not isinstance(batch, bytes):
+                    self.parser.process_items(batch)
+                    continue
+                lines, _ = parse.split_lines(b'', batch)
+                with self.backlog_lock:
+                    backlog = self.backlog
+                    self.backlog -= len(lines)
+                if not suppressed and backlog >= self.suppress_at:
+                    logger.info('Suppressing output with ' + str(backlog) + ' messages backed up')
+                    suppressed = True
+                    self.ui_state.set_output_suppressed(True)
+                elif suppressed and backlog <= self.unsuppress_at:
+                    suppressed = False
+                    self.ui_state.set_output_suppressed(False)
+                for i in range(0, len(lines), self.batch_size):
+                    self.parser.process_items([parse.parse_item(line) for line in lines[i:i + self.batch_size]])
+        except KeyboardInterrupt:
+            pass
+        if suppressed:
+            self.ui_state.set_output_suppressed(False)
+        self.parser.cleanup()
+
+    def _read(self, fd: int) -> None:
+        partial_line = b''
+        try:
+            while True:
+                data = os.read(fd, read_size)
+                if not data:
+                    break
+                lines, partial_line = parse.split_lines(partial_line, data)
+                for i in range(0, len(lines), self.batch_size):
+                    self.queue.put([parse.parse_item(line) for line in lines[i:i + self.batch_size]])
+            if partial_line:
+                self.queue.put([parse.parse_item(partial_line.decode('utf-8', 'replace'))])
+        finally:
+            os.close(fd)
+            self.queue.put(None)
+
+    def _read_raw(self, fd: int) -> None:
+        '''Like _read(), but never waits for run() and leaves splitting and parsing lines to it'''
+        partial_line = b''
+        try:
+            while True:
+                data = os.read(fd, read_size)
+                if not data:
+                    break
+                end = data.rfind(b'\n') + 1
+                if not end:
+                    partial_line += data
+                    continue
+                self._put_raw(partial_line + data[:end])
+                partial_line = data[end:]
+            if partial_line:
+                self._put_raw(partial_line + b'\n')
+        finally:
+            os.close(fd)
+            self.queue.put(None)
+
+    def _put_raw(self, data: bytes) -> None:
+        with self.backlog_lock:
+            self.backlog += data.count(b'\n')
+        self.queue.put(data)
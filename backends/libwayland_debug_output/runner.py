@@ -1,34 +1,12 @@
 import subprocess
 import os
-import threading
 import logging
-from typing import List, Dict, Callable
+from typing import Callable
 
 from interfaces import UIState, ConnectionIDSink, CommandSink
 from frontends.tui import Arguments, TerminalUI
 from core.output import Output
-from . import parse
-
-class _Subprocess:
-    def __init__(self, args: Arguments, stderr_fd: int):
-        self.args = args
-        self.stderr_fd = stderr_fd
-        self.returncode: int = 99
-
-    def run(self) -> None:
-        env = os.environ.copy()
-        # Add libwayland libs to LD_LIBRARY_PATH
-        env['LD_LIBRARY_PATH'] = ':'.join(filter(None, [self.args.wayland_lib_dir, env.get('LD_LIBRARY_PATH', '')]))
-        env['WAYLAND_DEBUG'] = '1'
-        logging.info('Running ' + repr(self.args.command_args))
-        self.returncode = subprocess.run(
-            self.args.command_args,
-            stderr=self.stderr_fd,
-            env=env,
-            bufsize=1,
-        ).returncode
-        logging.info('Program finished with exit code ' + str(self.returncode))
-        os.close(self.stderr_fd)
+from .pipeline import Pipeline
 
 def run_program(
     output: Output,
@@ -39,13 +17,18 @@ def run_program(
     input_func: Callable[[str], str]
 ) -> int:
     ui = TerminalUI(command_sink, ui_state, input_func)
-    readable, writable = os.pipe()
-    subprocess = _Subprocess(args, writable)
-    thread = threading.Thread(name='subprocess', target=subprocess.run)
-    thread.start()
-    with os.fdopen(readable, 'r') as spicket:
-        parse.into_sink(spicket, output, connection_id_sink)
-    thread.join(timeout=1)
-    assert not thread.is_alive(), 'Failed to join subprocess thread'
+    env = os.environ.copy()
+    # Add libwayland libs to LD_LIBRARY_PATH
+    env['LD_LIBRARY_PATH'] = ':'.join(filter(None, [args.wayland_lib_dir, env.get('LD_LIBRARY_PATH', '')]))
+    env['WAYLAND_DEBUG'] = '1'
+    logging.info('Running ' + repr(args.command_args))
+    process = subprocess.Popen(args.command_args, stderr=subprocess.PIPE, env=env)
+    assert process.stderr is not None
+    pipeline = Pipeline(output, connection_id_sink, ui_state, args.backpressure, args.queue_size)
+    pipeline.start(os.dup(process.stderr.fileno()))
+    process.stderr.close()
+    pipeline.run()
+    returncode = process.wait()
+    logging.info('Program finished with exit code ' + str(returncode))
     ui.run_until_stopped()
-    return subprocess.returncode
+    return returncode
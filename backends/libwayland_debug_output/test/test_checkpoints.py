@@ -0,0 +1,113 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from core import ConnectionManager, output
+from core.wl import protocol
+from backends.libwayland_debug_output import parse, time_range, checkpoints
+
+def log_lines():
+    yield '[1000.000]  -> wl_display@1.get_registry(new id wl_registry@2)'
+    yield '[1000.000]  -> wl_registry@2.bind(1, "wl_compositor", 4, new id [unknown]@4)'
+    yield '[1000.000]  -> wl_registry@2.bind(2, "xdg_wm_base", 1, new id [unknown]@5)'
+    yield '[1000.000]  -> wl_compositor@4.create_surface(new id wl_surface@3)'
+    yield '[1000.000]  -> xdg_wm_base@5.get_xdg_surface(new id xdg_surface@6, wl_surface@3)'
+    yield '[1000.000]  -> xdg_surface@6.get_toplevel(new id xdg_toplevel@9)'
+    yield '[1000.000]  -> xdg_toplevel@9.set_app_id("some.app.id")'
+    # Answered long after any checkpoint is taken
+    yield '[1000.000]  -> wl_display@1.sync(new id wl_callback@30)'
+    for i in range(100):
+        time = 2000 + i * 1000
+        yield '[%d.000]  -> wl_compositor@4.create_surface(new id wl_surface@%d)' % (time, 10 + i % 5)
+        yield '[%d.100]  -> wl_display@1.sync(new id wl_callback@20)' % time
+        yield '[%d.300] wl_callback@20.done(%d)' % (time, i)
+        yield '[%d.400] wl_display@1.delete_id(20)' % time
+        yield '[%d.500]  -> wl_surface@%d.destroy()' % (time, 10 + i % 5)
+        yield '[%d.900] wl_display@1.delete_id(%d)' % (time, 10 + i % 5)
+    yield '[150000.000] wl_callback@30.done(1)'
+    yield '[200000.000]  -> wl_surface@3.commit()'
+
+log = ''.join(line + '\n' for line in log_lines())
+
+class TestCheckpoints(unittest.TestCase):
+    def setUp(self):
+        # So destructors such as wl_callback.done are tracked before the start
+        protocol.load_all(output.Strict())
+        self.addCleanup(protocol.dump_all)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'log')
+        with open(self.path, 'w') as f:
+            f.write(log)
+        # Small enough that the log has several batches and checkpoints
+        for patch in (mock.patch.object(checkpoints, 'interval', 1000), mock.patch.object(parse, 'read_batch_size', 300)):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def load(self, start, write_checkpoints):
+        manager = ConnectionManager()
+        time_range.into_sink(self.path, output.Strict(), manager, start, None, write_checkpoints)
+        connection = manager.connections()[0]
+        return connection, [str(message) for message in connection.messages()]
+
+    def test_no_checkpoints_by_default(self):
+        self.load(None, False)
+        self.assertFalse(os.path.exists(checkpoints.sidecar_path(self.path)))
+        self.assertEqual(checkpoints.load(self.path), [])
+
+    def test_written_every_interval(self):
+        self.load(None, True)
+        saved = checkpoints.load(self.path)
+        self.assertGreater(len(saved), 3)
+        offsets = [checkpoint.offset for checkpoint in saved]
+        self.assertEqual(offsets, sorted(offsets))
+        for a, b in zip(offsets, offsets[1:]):
+            self.assertGreaterEqual(b - a, checkpoints.interval)
+
+    def test_loading_from_checkpoint_gives_same_result(self):
+        _, expected = self.load(50.2, False)
+        connection, _ = self.load(None, True)
+        with mock.patch.object(ConnectionManager, 'load_state', autospec=True, side_effect=ConnectionManager.load_state) as load_state:
+            connection, result = self.load(50.2, False)
+            load_state.assert_called_once()
+        self.assertEqual(result, expected)
+        self.assertEqual(connection.app_id(), 'some.app.id')
+        self.assertEqual(result[0], str(connection.messages()[0]))
+
+    def test_loading_from_checkpoint_keeps_lifetimes_and_roundtrips(self):
+        expected, _ = self.load(50.2, False)
+        self.load(None, True)
+        connection, _ = self.load(50.2, False)
+        self.assertEqual(connection.object_lifetimes().report(), expected.object_lifetimes().report())
+        self.assertEqual(connection.object_lifetimes().peak_live, expected.object_lifetimes().peak_live)
+        latencies = connection.roundtrips().latencies
+        self.assertEqual((latencies.count, latencies.max), (101, 149.0))
+        self.assertEqual(latencies.counts(), expected.roundtrips().latencies.counts())
+
+    def test_writing_from_checkpoint_keeps_earlier_ones(self):
+        self.load(None, True)
+        before = [checkpoint.offset for checkpoint in checkpoints.load(self.path)]
+        self.load(50.2, True)
+        after = [checkpoint.offset for checkpoint in checkpoints.load(self.path)]
+        self.assertEqual(after, before)
+
+    def test_ignored_when_log_changes(self):
+        self.load(None, True)
+        with open(self.path, 'a') as f:
+            f.write('[300000.000]  -> wl_surface@3.commit()\n')
+        self.assertEqual(checkpoints.load(self.path), [])
+
+    def test_ignored_when_version_changes(self):
+        self.load(None, True)
+        with mock.patch.object(checkpoints, 'version', checkpoints.version + 1):
+            self.assertEqual(checkpoints.load(self.path), [])
+
+    def test_latest_before(self):
+        saved = [checkpoints.Checkpoint(offset, 0.0, {}) for offset in (10, 20, 30)]
+        self.assertIsNone(checkpoints.latest_before(saved, 5))
+        self.assertIs(checkpoints.latest_before(saved, 20), saved[1])
+        self.assertIs(checkpoints.latest_before(saved, 25), saved[1])
+        self.assertIs(checkpoints.latest_before(saved, 100), saved[2])
@@ -0,0 +1,65 @@
+import os
+import io
+import gzip
+import lzma
+import tempfile
+import unittest
+from unittest import mock
+
+from backends.libwayland_debug_output import log_file
+
+lines = ''.join('[%d.000]  -> wl_display@1.sync(new id wl_callback@%d)\n' % (1000 + i, i + 2) for i in range(1000))
+
+class TestOpenLog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'log')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, data):
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+    def read(self):
+        with log_file.open_log(self.path) as f:
+            return f.read()
+
+    def test_plain(self):
+        self.write(lines.encode('utf-8'))
+        self.assertEqual(log_file.compression(self.path), '')
+        self.assertEqual(self.read(), lines)
+
+    def test_gzip(self):
+        self.write(gzip.compress(lines.encode('utf-8')))
+        self.assertEqual(log_file.compression(self.path), 'gzip')
+        self.assertEqual(self.read(), lines)
+
+    def test_xz(self):
+        self.write(lzma.compress(lines.encode('utf-8')))
+        self.assertEqual(log_file.compression(self.path), 'xz')
+        self.assertEqual(self.read(), lines)
+
+    def test_zstd(self):
+        try:
+            import zstandard # type: ignore
+        except ImportError:
+            self.skipTest('zstandard not installed')
+        self.write(zstandard.ZstdCompressor().compress(lines.encode('utf-8')))
+        self.assertEqual(log_file.compression(self.path), 'zstd')
+        self.assertEqual(self.read(), lines)
+
+    def test_zstd_without_zstandard_raises(self):
+        self.write(b'\x28\xb5\x2f\xfd' + b'\x00' * 16)
+        with mock.patch.dict('sys.modules', {'zstandard': None}):
+            with self.assertRaises(RuntimeError):
+                log_file.open_log(self.path)
+
+    def test_empty(self):
+        self.write(b'')
+        self.assertEqual(self.read(), '')
+
+    def test_missing_file_raises(self):
+        with self.assertRaises(FileNotFoundError):
+            log_file.open_log(self.path)
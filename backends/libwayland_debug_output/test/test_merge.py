@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from core import ConnectionManager, ConnectionImpl, output
+from core.correlate import Correlator
+from backends.libwayland_debug_output import merge
+
+client_log_lines = [
+    '[1000.000]  -> wl_display@1.get_registry(new id wl_registry@2)',
+    '[1000.100] wl_registry@2.global(1, "wl_compositor", 4)',
+    '[1000.200]  -> wl_registry@2.bind(1, "wl_compositor", 4, new id [unknown]@3)',
+    'not a wayland message',
+    '[1000.300]  -> wl_compositor@3.create_surface(new id wl_surface@4)',
+    '[1001.000]  -> wl_surface@4.commit()',
+]
+
+# The same connection as seen by the compositor, which started logging first
+server_log_lines = [
+    '[999.000] wl_display@1.get_registry(new id wl_registry@2)',
+    '[1000.060]  -> wl_registry@2.global(1, "wl_compositor", 4)',
+    '[1000.250] wl_registry@2.bind(1, "wl_compositor", 4, new id [unknown]@3)',
+    '[1000.350] wl_compositor@3.create_surface(new id wl_surface@4)',
+    '[1001.050] wl_surface@4.commit()',
+]
+
+class TestMerge(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = []
+        for name, lines in (('client', client_log_lines), ('server', server_log_lines)):
+            path = os.path.join(self.tmp.name, name + '.log')
+            with open(path, 'w') as f:
+                f.write(''.join(line + '\n' for line in lines))
+            self.paths.append(path)
+        self.manager = ConnectionManager()
+        self.out = mock.Mock(spec=output.Output)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def load(self):
+        sinks = [self.manager.namespace(str(i) + '/') for i in range(len(self.paths))]
+        merge.into_sinks(self.paths, self.out, sinks)
+        return sinks
+
+    def test_each_file_has_its_own_connections(self):
+        client, server = self.load()
+        self.assertEqual(len(client.opened), 1)
+        self.assertEqual(len(server.opened), 1)
+        # Both logs use the same connection ID
+        self.assertEqual(len(self.manager.connections()), 2)
+        self.assertFalse(client.opened[0].is_server())
+        self.assertTrue(server.opened[0].is_server())
+        self.assertEqual(len(client.opened[0].messages()), 5)
+        self.assertFalse(client.opened[0].is_open())
+
+    def test_merged_in_time_order(self):
+        times = []
+        message_batch = ConnectionImpl.message_batch
+        def record(connection, messages):
+            times.extend(message.timestamp for message in messages)
+            message_batch(connection, messages)
+        with mock.patch.object(ConnectionImpl, 'message_batch', autospec=True, side_effect=record):
+            self.load()
+        self.assertEqual(len(times), 10)
+        self.assertEqual(times, sorted(times))
+
+    def test_timestamps_relative_to_earliest_file(self):
+        client, server = self.load()
+        self.assertEqual(server.opened[0].messages()[0].timestamp, 0)
+        self.assertEqual(client.opened[0].messages()[0].timestamp, 1000)
+
+    def test_unparsed_lines_stay_in_place(self):
+        # The client is the second connection, since the server log starts first
+        self.out.unprocessed.side_effect = lambda line: self.assertEqual(len(self.manager.connections()[1].messages()), 3)
+        self.load()
+        self.out.unprocessed.assert_called_once_with('not a wayland message')
+
+    def test_correlate(self):
+        correlator = Correlator()
+        self.manager.add_connection_list_listener(correlator, True)
+        client, server = self.load()
+        matches = correlator.matches({client.opened[0]: 'client', server.opened[0]: 'server'})
+        self.assertEqual(len(matches), 1)
+        self.assertIs(matches[0][0], client.opened[0])
+        self.assertIs(matches[0][1], server.opened[0])
+        self.assertGreater(matches[0][2], 0.8)
@@ -1,12 +1,11 @@
 import unittest
+from unittest import mock
+import interfaces
+from core import output
 from core.wl import *
 from backends.libwayland_debug_output import parse
 
 class TestParseMessage(unittest.TestCase):
-    def setUp(self):
-        assert hasattr(Message, 'base_time')
-        Message.base_time = None
-
     def test_parse_empty_raises(self):
         with self.assertRaises(RuntimeError):
             m = parse.message('')
@@ -18,7 +17,7 @@ class TestParseMessage(unittest.TestCase):
     def test_parse_in_message_no_args(self):
         conn_id, m = parse.message('[1234567.890] some_object@12.some_message()')
         self.assertIsInstance(m, Message)
-        self.assertEqual(m.timestamp, 0)
+        self.assertEqual(m.timestamp, 1234567890)
         self.assertEqual(m.obj.type, 'some_object')
         self.assertEqual(m.obj.id, 12)
         self.assertEqual(m.sent, False)
@@ -29,7 +28,7 @@ class TestParseMessage(unittest.TestCase):
     def test_parse_out_message_no_args(self):
         conn_id, m = parse.message('[1234567.890]  -> some_object@12.some_message()')
         self.assertIsInstance(m, Message)
-        self.assertEqual(m.timestamp, 0)
+        self.assertEqual(m.timestamp, 1234567890)
         self.assertEqual(m.obj.type, 'some_object')
         self.assertEqual(m.obj.id, 12)
         self.assertEqual(m.sent, True)
@@ -38,21 +37,41 @@ class TestParseMessage(unittest.TestCase):
         self.assertEqual(m.destroyed_obj, None)
 
     def test_parse_message_timestamp(self):
-        parse.message('[1234567.890] some_object@12.some_message()')
-        conn_id, m = parse.message('[1234588.390] other_object@6.some_message()')
-        self.assertIsInstance(m, Message)
-        self.assertAlmostEqual(m.timestamp, 20.5 / 1000)
+        conn_id, a = parse.message('[1234567.890] some_object@12.some_message()')
+        conn_id, b = parse.message('[1234588.390] other_object@6.some_message()')
+        self.assertIsInstance(b, Message)
+        self.assertEqual(b.timestamp - a.timestamp, 20500)
 
     def test_parse_message_timestamp_with_comma(self):
-        parse.message('[1234567,890] some_object@12.some_message()')
-        conn_id, m = parse.message('[1234588,390] other_object@6.some_message()')
-        self.assertIsInstance(m, Message)
-        self.assertAlmostEqual(m.timestamp, 20.5 / 1000)
+        conn_id, a = parse.message('[1234567,890] some_object@12.some_message()')
+        conn_id, b = parse.message('[1234588,390] other_object@6.some_message()')
+        self.assertIsInstance(b, Message)
+        self.assertEqual(b.timestamp - a.timestamp, 20500)
+
+    def test_parse_message_timestamp_is_exact(self):
+        conn_id, a = parse.message('[770203.519] some_object@12.some_message()')
+        conn_id, b = parse.message('[770203.520] some_object@12.some_message()')
+        self.assertIsInstance(a.timestamp, int)
+        self.assertEqual(a.timestamp, 770203519)
+        self.assertEqual(b.timestamp - a.timestamp, 1)
+
+    def test_parse_message_timestamp_with_other_precisions(self):
+        conn_id, a = parse.message('[1234567.8] some_object@12.some_message()')
+        conn_id, b = parse.message('[1234567.890123] some_object@12.some_message()')
+        self.assertEqual(a.timestamp, 1234567800)
+        self.assertEqual(b.timestamp, 1234567890)
+
+    def test_parse_message_names_are_interned(self):
+        conn_id, a = parse.message('[1234567.890] some_object@12.some_message(new id other_type@4)')
+        conn_id, b = parse.message('[1234568.890]  -> some_object@12.some_message(other_type@4)')
+        self.assertIs(a.obj.type, b.obj.type)
+        self.assertIs(a.name, b.name)
+        self.assertIs(a.args[0].obj.type, b.args[0].obj.type)
 
     def parse_message_with_args(self, args_str):
         conn_id, m = parse.message('[1234567.890] some_object@12.some_message(' + args_str + ')')
         self.assertIsInstance(m, Message)
-        self.assertEqual(m.timestamp, 0)
+        self.assertEqual(m.timestamp, 1234567890)
         self.assertEqual(m.obj.type, 'some_object')
         self.assertEqual(m.obj.id, 12)
         self.assertEqual(m.sent, False)
@@ -160,3 +179,61 @@ class TestParseArg(unittest.TestCase):
         self.assertEqual(a.obj.type, None)
         self.assertEqual(a.obj.id, 47)
         self.assertEqual(a.is_new, True)
+
+def sunk_messages(sink):
+    '''All messages given to a mock sink, whether one at a time or in batches'''
+    messages = []
+    for name, args, kwargs in sink.method_calls:
+        if name == 'message':
+            messages.append(args[1])
+        elif name == 'messages':
+            messages.extend(args[1])
+    return messages
+
+class TestParserFeed(unittest.TestCase):
+    def setUp(self):
+        self.sink = mock.Mock(spec=interfaces.ConnectionIDSink)
+        self.parser = parse.Parser(output.Strict(), self.sink)
+
+    def names(self):
+        return [message.name for message in sunk_messages(self.sink)]
+
+    def test_feed_splits_lines_across_chunks(self):
+        data = (
+            b'[1234567.890]  -> wl_display@1.get_registry(new id wl_registry@2)\n'
+            b'[1234567.900] wl_registry@2.global(1, "wl_compositor", 4)\n'
+        )
+        self.parser.feed(data[:20])
+        self.assertEqual(self.names(), [])
+        self.parser.feed(data[20:80])
+        self.assertEqual(self.names(), ['get_registry'])
+        self.parser.feed(data[80:])
+        self.assertEqual(self.names(), ['get_registry', 'global'])
+
+    def test_cleanup_parses_unterminated_line(self):
+        self.parser.feed(b'[1234567.890]  -> wl_display@1.get_registry(new id wl_registry@2)')
+        self.assertEqual(self.names(), [])
+        self.parser.cleanup()
+        self.assertEqual(self.names(), ['get_registry'])
+        self.sink.close_connection.assert_called_once()
+
+    def test_consecutive_messages_on_a_connection_are_batched(self):
+        self.parser.feed(
+            b'[1234567.890] <a>  -> wl_display@1.sync(new id wl_callback@2)\n'
+            b'[1234567.900] <a>  -> wl_display@1.sync(new id wl_callback@3)\n'
+            b'[1234567.910] <b>  -> wl_display@1.sync(new id wl_callback@2)\n')
+        self.assertEqual([(call[0][0], len(call[0][1])) for call in self.sink.messages.call_args_list], [('a', 2), ('b', 1)])
+        self.assertEqual(self.sink.open_connection.call_count, 2)
+
+    def test_unprocessable_batch_is_unprocessed(self):
+        out = mock.Mock(spec=output.Output)
+        self.sink.messages.side_effect = RuntimeError('bad message')
+        parser = parse.Parser(out, self.sink)
+        parser.feed(b'[1234567.890]  -> wl_display@1.sync(new id wl_callback@2)\n')
+        out.unprocessed.assert_called_once_with('bad message')
+
+    def test_feed_handles_invalid_utf8(self):
+        out = mock.Mock(spec=output.Output)
+        parser = parse.Parser(out, self.sink)
+        parser.feed(b'\xff\xfe junk\n')
+        out.unprocessed.assert_called_once()
@@ -0,0 +1,90 @@
+import unittest
+from unittest import mock
+import os
+import time
+import threading
+
+import interfaces
+from core import output
+from frontends.tui import Backpressure
+from backends.libwayland_debug_output import Pipeline
+
+def sunk_messages(sink):
+    '''All messages given to a mock sink, whether one at a time or in batches'''
+    messages = []
+    for name, args, kwargs in sink.method_calls:
+        if name == 'message':
+            messages.append(args[1])
+        elif name == 'messages':
+            messages.extend(args[1])
+    return messages
+
+def sync_line(i):
+    return ('[%d.000]  -> wl_display@1.sync(new id wl_callback@%d)\n' % (1000 + i, i + 2)).encode('utf-8')
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.sink = mock.Mock(spec=interfaces.ConnectionIDSink)
+        self.ui_state = mock.Mock(spec=interfaces.UIState)
+        self.out = mock.Mock(spec=output.Output)
+
+    def run_pipeline(self, data, backpressure=Backpressure.BLOCK, queue_size=100, wait_for_full=False):
+        readable, writable = os.pipe()
+        pipeline = Pipeline(self.out, self.sink, self.ui_state, backpressure, queue_size)
+        pipeline.start(readable)
+        with os.fdopen(writable, 'wb') as f:
+            f.write(data)
+        if wait_for_full:
+            deadline = time.perf_counter() + 5
+            while not (pipeline.queue.full() or pipeline.backlog >= pipeline.suppress_at):
+                self.assertLess(time.perf_counter(), deadline)
+                time.sleep(0.001)
+        pipeline.run()
+        return pipeline
+
+    def test_messages_reach_sink_in_order(self):
+        self.run_pipeline(b''.join(sync_line(i) for i in range(500)), queue_size=10)
+        self.sink.open_connection.assert_called_once()
+        messages = sunk_messages(self.sink)
+        self.assertEqual(len(messages), 500)
+        self.assertEqual([m.args[0].obj.id for m in messages], [i + 2 for i in range(500)])
+        self.sink.close_connection.assert_called_once()
+
+    def test_unterminated_last_line(self):
+        self.run_pipeline(sync_line(0) + sync_line(1).rstrip(b'\n'))
+        self.assertEqual(len(sunk_messages(self.sink)), 2)
+
+    def test_unparsable_line_is_unprocessed(self):
+        self.run_pipeline(b'hello\n' + sync_line(0))
+        self.out.unprocessed.assert_called_once_with('hello')
+        self.assertEqual(len(sunk_messages(self.sink)), 1)
+
+    def test_block_never_suppresses_output(self):
+        self.run_pipeline(b''.join(sync_line(i) for i in range(20)), queue_size=4, wait_for_full=True)
+        self.ui_state.set_output_suppressed.assert_not_called()
+
+    def test_drop_display_suppresses_output_while_backed_up(self):
+        self.run_pipeline(b''.join(sync_line(i) for i in range(20)), Backpressure.DROP_DISPLAY, 8, True)
+        calls = [call[0][0] for call in self.ui_state.set_output_suppressed.call_args_list]
+        self.assertEqual(calls[0], True)
+        self.assertEqual(calls[-1], False)
+        self.assertEqual(len(sunk_messages(self.sink)), 20)
+
+    def test_drop_display_does_not_block_the_program(self):
+        # More than fits in a pipe, so writing would not finish if the reader waited for the queue
+        data = b''.join(sync_line(i) for i in range(5000))
+        readable, writable = os.pipe()
+        pipeline = Pipeline(self.out, self.sink, self.ui_state, Backpressure.DROP_DISPLAY, 8)
+        pipeline.start(readable)
+        def write():
+            with os.fdopen(writable, 'wb') as f:
+                f.write(data)
+        writer = threading.Thread(target=write, daemon=True)
+        writer.start()
+        writer.join(5)
+        self.assertFalse(writer.is_alive())
+        pipeline.run()
+        messages = sunk_messages(self.sink)
+        self.assertEqual([m.args[0].obj.id for m in messages], [i + 2 for i in range(5000)])
+        calls = [call[0][0] for call in self.ui_state.set_output_suppressed.call_args_list]
+        self.assertEqual(calls, [True, False])
@@ -0,0 +1,110 @@
+import glob
+import io
+import os
+import unittest
+from unittest import mock
+
+from core import ConnectionManager, output
+from core.util import project_root
+from core.wl import protocol, resolver
+from backends.libwayland_debug_output import parse
+
+log_dir = os.path.join(project_root(), 'resources', 'libwayland_debug_logs')
+
+# The gedit log was recorded with a libwayland that printed garbage for the IDs of server created objects, these are
+# the IDs the offers were actually given
+server_obj_ids = {
+    '@529381776)': '@4278190080)',
+    '@529305856)': '@4278190081)',
+    '@514195440)': '@4278190082)',
+}
+
+def read_log(name):
+    with open(os.path.join(log_dir, name)) as f:
+        return f.readlines()
+
+def repaired_server_obj_log():
+    lines = []
+    for line in read_log('gedit-with-server-owned-objects.log'):
+        for bad, good in server_obj_ids.items():
+            line = line.replace(bad, good)
+        lines.append(line)
+    return lines
+
+def without_destructors(descriptor, *args):
+    original_descriptor_init(descriptor, *args)
+    descriptor.is_destructor = False
+
+original_descriptor_init = resolver._Descriptor.__init__
+
+class Replay:
+    def __init__(self, lines, destructors=True):
+        self.out = mock.Mock(spec=output.Output)
+        self.manager = ConnectionManager()
+        if destructors:
+            parse.into_sink(io.StringIO(''.join(lines)), self.out, self.manager)
+        else:
+            with mock.patch.object(resolver._Descriptor, '__init__', without_destructors):
+                parse.into_sink(io.StringIO(''.join(lines)), self.out, self.manager)
+
+    def messages(self):
+        return [str(message) for conn in self.manager.connections() for message in conn.messages()]
+
+    def output(self):
+        # Errors are passed to the output as exceptions, which only compare equal to themselves
+        return [str(call) for call in self.out.method_calls]
+
+    def objects(self):
+        return [
+            (str(message.obj), message.obj.alive)
+            for conn in self.manager.connections()
+            for message in conn.messages()
+        ]
+
+    def lifetimes(self):
+        return {
+            name: (interface.created, interface.destroyed)
+            for name, interface in self.manager.object_lifetimes().interfaces.items()
+        }
+
+class TestSampleLogs(unittest.TestCase):
+    '''Destroying server owned objects with their destructor should not change how anything else is resolved'''
+    def setUp(self):
+        protocol.load_all(output.Strict())
+        self.addCleanup(protocol.dump_all)
+
+    def test_sample_logs_resolve_the_same_without_server_owned_destroys(self):
+        paths = sorted(glob.glob(os.path.join(log_dir, '*.log')))
+        self.assertGreater(len(paths), 0)
+        for path in paths:
+            with self.subTest(log=os.path.basename(path)):
+                lines = read_log(os.path.basename(path))
+                new = Replay(lines)
+                old = Replay(lines, destructors=False)
+                self.assertEqual(new.messages(), old.messages())
+                self.assertEqual(new.output(), old.output())
+                self.assertEqual(new.objects(), old.objects())
+                self.assertEqual(new.lifetimes(), old.lifetimes())
+
+    def test_server_owned_offers_are_destroyed_by_destructor(self):
+        lines = repaired_server_obj_log()
+        new = Replay(lines)
+        old = Replay(lines, destructors=False)
+        self.assertEqual(new.messages(), old.messages())
+        self.assertEqual(new.output(), old.output())
+        new_lifetimes = new.lifetimes()
+        old_lifetimes = old.lifetimes()
+        self.assertEqual(new_lifetimes.pop('zwp_primary_selection_offer_v1'), (2, 1))
+        self.assertEqual(old_lifetimes.pop('zwp_primary_selection_offer_v1'), (2, 0))
+        self.assertEqual(new_lifetimes, old_lifetimes)
+        changed = [
+            (new_obj, old_obj)
+            for new_obj, old_obj in zip(new.objects(), old.objects())
+            if new_obj != old_obj
+        ]
+        self.assertGreater(len(changed), 0)
+        for (new_name, new_alive), (old_name, old_alive) in changed:
+            self.assertEqual(new_name, old_name)
+            self.assertIn('zwp_primary_selection_offer_v1@4278190081', new_name)
+            self.assertFalse(new_alive)
+            self.assertTrue(old_alive)
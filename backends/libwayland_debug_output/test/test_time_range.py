@@ -0,0 +1,187 @@
+import os
+import io
+import gzip
+import tempfile
+import unittest
+
+from core import ConnectionManager, output
+from core.wl import protocol
+from backends.libwayland_debug_output import time_range
+
+# About a second apart, surface 3 is created before the others are destroyed, so it has to be tracked to resolve later
+log_lines = [
+    '[1000.000]  -> wl_display@1.get_registry(new id wl_registry@2)',
+    '[1500.000]  -> wl_registry@2.bind(1, "wl_compositor", 4, new id [unknown]@4)',
+    '[2000.000]  -> wl_compositor@4.create_surface(new id wl_surface@3)',
+    '[3000.000]  -> wl_compositor@4.create_surface(new id wl_surface@5)',
+    '[4000.000]  -> wl_surface@5.destroy()',
+    '[5000.000] wl_display@1.delete_id(5)',
+    '[6000.000]  -> wl_surface@3.commit()',
+    'not a wayland message',
+    '[7000.000]  -> wl_compositor@4.create_surface(new id wl_surface@5)',
+    '[8000.000]  -> wl_surface@5.commit()',
+]
+log = ''.join(line + '\n' for line in log_lines)
+
+class TestTimestamps(unittest.TestCase):
+    def test_line_timestamp(self):
+        self.assertEqual(time_range.line_timestamp(b'[1234.500]  -> wl_display@1.sync(new id wl_callback@2)'), 1234500)
+
+    def test_line_timestamp_with_comma(self):
+        self.assertEqual(time_range.line_timestamp(b'[1234,500] wl_callback@2.done(7)'), 1234500)
+
+    def test_line_timestamp_of_other_output(self):
+        self.assertIsNone(time_range.line_timestamp(b'not a wayland message'))
+
+    def test_first_timestamp(self):
+        self.assertEqual(time_range.first_timestamp(io.BytesIO(b'hello\n' + log.encode())), 1000000)
+
+    def test_last_timestamp_seekable(self):
+        self.assertEqual(time_range.last_timestamp(io.BytesIO(log.encode() + b'bye\n'), True), 8000000)
+
+    def test_last_timestamp_across_blocks(self):
+        data = log.encode() + b'x' * (time_range._tail_block_size * 3) + b'\n'
+        self.assertEqual(time_range.last_timestamp(io.BytesIO(data), True), 8000000)
+
+    def test_last_timestamp_not_seekable(self):
+        self.assertEqual(time_range.last_timestamp(io.BytesIO(log.encode()), False), 8000000)
+
+    def test_no_timestamps(self):
+        self.assertIsNone(time_range.first_timestamp(io.BytesIO(b'a\nb\n')))
+        self.assertIsNone(time_range.last_timestamp(io.BytesIO(b'a\nb\n'), True))
+
+    def test_seek_time(self):
+        data = log.encode()
+        for line in log_lines[:-3]:
+            timestamp = time_range.line_timestamp(line.encode())
+            if timestamp is not None:
+                offset = time_range.seek_time(io.BytesIO(data), timestamp)
+                self.assertEqual(data[offset:].split(b'\n')[0], line.encode())
+
+    def test_seek_time_includes_other_output_before_line(self):
+        data = log.encode()
+        offset = time_range.seek_time(io.BytesIO(data), 7000000)
+        self.assertTrue(data[offset:].startswith(b'not a wayland message\n[7000.000]'))
+
+    def test_seek_time_between_lines(self):
+        data = log.encode()
+        offset = time_range.seek_time(io.BytesIO(data), 3500000)
+        self.assertTrue(data[offset:].startswith(b'[4000.000]'))
+
+    def test_seek_time_past_end(self):
+        data = log.encode()
+        self.assertEqual(time_range.seek_time(io.BytesIO(data), 100000000), len(data))
+
+class TestIntoSink(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'log')
+        self.write(log.encode())
+        self.manager = ConnectionManager()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, data):
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+    def load(self, start, end):
+        time_range.into_sink(self.path, output.Strict(), self.manager, start, end)
+        connections = self.manager.connections()
+        self.assertEqual(len(connections), 1)
+        return connections[0]
+
+    def loaded(self, start, end):
+        return [str(message.obj) + '.' + message.name for message in self.load(start, end).messages()]
+
+    def test_everything(self):
+        self.assertEqual(len(self.loaded(None, None)), 9)
+
+    def test_from(self):
+        self.assertEqual(self.loaded(4.5, None), [
+            'wl_surface@3a.commit',
+            'wl_compositor@4a.create_surface',
+            'wl_surface@5b.commit',
+        ])
+
+    def test_to(self):
+        self.assertEqual(self.loaded(None, 1.0), [
+            'wl_display@1a.get_registry',
+            'wl_registry@2a.bind',
+            'wl_compositor@4a.create_surface',
+        ])
+
+    def test_from_and_to(self):
+        self.assertEqual(self.loaded(2, 3), [
+            'wl_compositor@4a.create_surface',
+            'wl_surface@5a.destroy',
+        ])
+
+    def test_from_end(self):
+        self.assertEqual(self.loaded(-1.0, None), [
+            'wl_compositor@4a.create_surface',
+            'wl_surface@5b.commit',
+        ])
+
+    def test_timestamps_are_from_start_of_log(self):
+        self.assertEqual(self.load(-1.0, None).messages()[0].timestamp, 6000000)
+
+    def test_skipped_objects_are_tracked(self):
+        connection = self.load(6.5, None)
+        self.assertEqual([str(obj) for obj in connection.live_objects('wl_surface')], ['wl_surface@3a', 'wl_surface@5b'])
+
+    def test_compressed(self):
+        self.write(gzip.compress(log.encode()))
+        self.assertEqual(self.loaded(3.5, 5.5), [
+            'wl_display@1a.delete_id',
+            'wl_surface@3a.commit',
+        ])
+
+# A server owned object destroyed by its destructor and a connection named by a layer surface, both before the start
+protocol_log_lines = [
+    '[1000.000]  -> wl_display@1.get_registry(new id wl_registry@2)',
+    '[1100.000]  -> wl_registry@2.bind(1, "wl_seat", 7, new id [unknown]@3)',
+    '[1200.000]  -> wl_registry@2.bind(2, "wl_data_device_manager", 3, new id [unknown]@4)',
+    '[1300.000]  -> wl_data_device_manager@4.get_data_device(new id wl_data_device@5, wl_seat@3)',
+    '[1400.000] wl_data_device@5.data_offer(new id wl_data_offer@4278190080)',
+    '[1500.000]  -> wl_data_offer@4278190080.destroy()',
+    '[1600.000]  -> wl_registry@2.bind(3, "wl_compositor", 4, new id [unknown]@6)',
+    '[1700.000]  -> wl_compositor@6.create_surface(new id wl_surface@7)',
+    '[1800.000]  -> wl_registry@2.bind(4, "zwlr_layer_shell_v1", 4, new id [unknown]@8)',
+    '[1900.000]  -> zwlr_layer_shell_v1@8.get_layer_surface(new id zwlr_layer_surface_v1@9, wl_surface@7, nil, 2, "panel")',
+    '[3000.000]  -> wl_surface@7.commit()',
+]
+
+class TestTrackedLines(unittest.TestCase):
+    def setUp(self):
+        protocol.load_all(output.Strict())
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'log')
+        with open(self.path, 'wb') as f:
+            f.write(''.join(line + '\n' for line in protocol_log_lines).encode())
+
+    def tearDown(self):
+        protocol.dump_all()
+        self.tmp.cleanup()
+
+    def load(self, start):
+        manager = ConnectionManager()
+        time_range.into_sink(self.path, output.Strict(), manager, start, None)
+        return manager.connections()[0]
+
+    def test_destructors_and_naming_messages_are_tracked(self):
+        tracked = time_range.tracked_re()
+        for line in protocol_log_lines[1:10]:
+            self.assertTrue(tracked.search(line.encode()), line)
+        self.assertFalse(tracked.search(protocol_log_lines[10].encode()))
+
+    def test_state_after_start_matches_full_parse(self):
+        full = self.load(None)
+        skipped = self.load(1.5)
+        self.assertEqual(len(skipped.messages()), 1)
+        self.assertEqual(skipped.title, 'panel')
+        self.assertEqual(skipped.title, full.title)
+        self.assertEqual(
+            [str(obj) for obj in skipped.live_objects(None)], [str(obj) for obj in full.live_objects(None)])
+        self.assertEqual(skipped.object_lifetimes().live_counts(), full.object_lifetimes().live_counts())
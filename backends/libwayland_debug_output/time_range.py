@@ -0,0 +1,226 @@
+'''
+Loads the part of a log between two times
+Uncompressed logs are binary searched by the timestamp at the start of each line to find where to start. The lines
+before that still need to be read so objects created earlier can be resolved (starting from a checkpoint if there is
+one), but only lines that can create or destroy objects are parsed, and they are not kept.
+'''
+import io
+import re
+from typing import IO, List, Optional, Pattern
+
+from interfaces import ConnectionIDSink
+from core.clock import from_seconds
+from core.connection_impl import naming_messages
+from core.wl import protocol
+from core.output import Output
+from . import parse, checkpoints
+from .log_file import compression, open_log_bytes
+
+_timestamp_re = re.compile(rb'\s*\[\s*(\d+)[\.,](\d+)\s*\]')
+
+
+# How many bytes are read at a time when looking backwards from the end of a log
+_tail_block_size = 1 << 16
+
+def line_timestamp(line: bytes) -> Optional[int]:
+    '''Returns the timestamp at the start of a log line in microseconds, or None if it doesn't have one'''
+    match = _timestamp_re.match(line)
+    if match is None:
+        return None
+    return parse.microseconds(match.group(1), match.group(2))
+
+def first_timestamp(log: IO[bytes]) -> Optional[int]:
+    '''Returns the first timestamp in the log after the current position, or None if there isn't one'''
+    for line in log:
+        timestamp = line_timestamp(line)
+        if timestamp is not None:
+            return timestamp
+    return None
+
+def last_timestamp(log: IO[bytes], seekable: bool) -> Optional[int]:
+    '''Returns the last timestamp in the log, or None if there isn't one
+    Seekable logs are read backwards from the end, others are read all the way through
+    '''
+    if not seekable:
+        last = None
+        for line in log:
+            timestamp = line_timestamp(line)
+            if timestamp is not None:
+                last = timestamp
+        return last
+    end = log.seek(0, io.SEEK_END)
+    partial_line = b''
+    while end > 0:
+        start = max(0, end - _tail_block_size)
+        log.seek(start)
+        lines = (log.read(end - start) + partial_line).split(b'\n')
+        partial_line = lines.pop(0) if start > 0 else b''
+        for line in reversed(lines):
+            timestamp = line_timestamp(line)
+            if timestamp is not None:
+                return timestamp
+        end = start
+    return None
+
+def _line_start(log: IO[bytes], offset: int) -> int:
+    '''Returns the offset of the first line that starts at or after offset, and seeks to it'''
+    if offset == 0:
+        return log.seek(0)
+    log.seek(offset - 1)
+    log.readline()
+    return log.tell()
+
+def seek_time(log: IO[bytes], time: int) -> int:
+    '''Returns the offset of the line after the last one with a timestamp before time
+    The log must be seekable and its timestamps in order.
+    '''
+    low = 0
+    high = log.seek(0, io.SEEK_END)
+    while low < high:
+        middle = (low + high) // 2
+        _line_start(log, middle)
+        timestamp = first_timestamp(log)
+        if timestamp is None or timestamp >= time:
+            high = middle
+        else:
+            low = middle + 1
+    return _line_start(log, low)
+
+def _from_ends(seconds: Optional[float], first: int, last: int) -> Optional[int]:
+    if seconds is None:
+        return None
+    elif seconds < 0:
+        return last + from_seconds(seconds)
+    else:
+        return first + from_seconds(seconds)
+
+def tracked_re() -> Pattern[bytes]:
+    '''Lines before the start are only parsed if they match this, nothing else changes which objects exist (or the
+    name of the connection)
+    Built from the loaded protocols, since any destructor destroys server owned objects
+    '''
+    names = ['delete_id'] + protocol.destructor_names() + list(naming_messages)
+    return re.compile(rb'new id|\.(?:' + b'|'.join(re.escape(name.encode('utf-8')) for name in names) + rb')\(')
+
+def _track(parser: parse.Parser, tracked: Pattern[bytes], lines: List[bytes]) -> None:
+    search = tracked.search
+    for line in lines:
+        if search(line):
+            parser.track_line(line.decode('utf-8', 'replace'))
+
+def _skip_seekable(
+    parser: parse.Parser,
+    tracked: Pattern[bytes],
+    log: IO[bytes],
+    offset: int,
+    stop: int,
+    writer: Optional[checkpoints.Writer]
+) -> List[bytes]:
+    log.seek(offset)
+    remaining = stop - offset
+    while remaining > 0:
+        lines = log.readlines(parse.read_batch_size)
+        if not lines:
+            break
+        size = sum(len(line) for line in lines)
+        if size <= remaining:
+            remaining -= size
+            _track(parser, tracked, lines)
+            if writer:
+                writer.reached(stop - remaining)
+            continue
+        # The start is on a line boundary somewhere in this batch, lines after it are loaded normally
+        for i, line in enumerate(lines):
+            if remaining <= 0:
+                break
+            remaining -= len(line)
+        _track(parser, tracked, lines[:i])
+        return lines[i:]
+    return []
+
+def _skip_stream(parser: parse.Parser, tracked: Pattern[bytes], log: IO[bytes], start: int) -> List[bytes]:
+    while True:
+        lines = log.readlines(parse.read_batch_size)
+        if not lines:
+            return []
+        for i, line in enumerate(lines):
+            timestamp = line_timestamp(line)
+            if timestamp is not None and timestamp >= start:
+                _track(parser, tracked, lines[:i])
+                return lines[i:]
+        _track(parser, tracked, lines)
+
+def _load(parser: parse.Parser, log: IO[bytes], end: Optional[int], lines: List[bytes], writer: Optional[checkpoints.Writer]) -> None:
+    while True:
+        if end is not None:
+            for i, line in enumerate(lines):
+                timestamp = line_timestamp(line)
+                if timestamp is not None and timestamp > end:
+                    parser.process_items([parse.parse_item(line.decode('utf-8', 'replace')) for line in lines[:i]])
+                    return
+        parser.process_items([parse.parse_item(line.decode('utf-8', 'replace')) for line in lines])
+        if writer:
+            writer.reached(log.tell())
+        try:
+            lines = log.readlines(parse.read_batch_size)
+        except KeyboardInterrupt:
+            return
+        if not lines:
+            return
+
+def into_sink(
+    path: str,
+    out: Output,
+    sink: ConnectionIDSink,
+    start: Optional[float],
+    end: Optional[float],
+    write_checkpoints: bool = False
+) -> None:
+    '''Load the messages of the log at path that are between start and end
+    start and end are seconds since the first message, or before the last message if negative. Either can be None for
+    the start or end of the log. Messages before start are only used to keep track of objects and are not sent to the
+    sink, so they do not show up in the connection's history. If the log has checkpoints, scanning for objects starts
+    from the last one before start.
+    write_checkpoints: if to save checkpoints of the lines loaded or scanned, so later loads can start from them
+    Raises: FileNotFoundError if the file does not exist, RuntimeError if the compression is not supported
+    '''
+    seekable = not compression(path)
+    if write_checkpoints and not seekable:
+        out.warn('Checkpoints can only be written for uncompressed logs')
+        write_checkpoints = False
+    with open_log_bytes(path) as log:
+        first = first_timestamp(log)
+    if first is None:
+        first = 0
+    last = first
+    if (start is not None and start < 0) or (end is not None and end < 0):
+        with open_log_bytes(path) as log:
+            last = last_timestamp(log, seekable) or first
+    start_time = _from_ends(start, first, last)
+    end_time = _from_ends(end, first, last)
+    # Timestamps are shown relative to the start of the log, not the first message loaded
+    sink.set_start_time(first)
+    parser = parse.Parser(out, sink)
+    existing = checkpoints.load(path) if seekable else []
+    writer = None
+    with open_log_bytes(path) as log:
+        lines: List[bytes] = []
+        if start_time is not None and seekable:
+            stop = seek_time(log, start_time)
+            offset = 0
+            checkpoint = checkpoints.latest_before(existing, stop)
+            if checkpoint is not None:
+                checkpoint.restore(parser, sink)
+                offset = checkpoint.offset
+            if write_checkpoints:
+                writer = checkpoints.Writer(path, parser, sink, existing, offset)
+            lines = _skip_seekable(parser, tracked_re(), log, offset, stop, writer)
+        else:
+            if write_checkpoints:
+                writer = checkpoints.Writer(path, parser, sink, existing, 0)
+            if start_time is not None:
+                lines = _skip_stream(parser, tracked_re(), log, start_time)
+        _load(parser, log, end_time, lines, writer)
+    parser.cleanup()
+    if writer:
+        writer.save()
@@ -0,0 +1,6 @@
+'''
+Traces Wayland programs with a preloaded library that hooks into libwayland
+The library streams compact binary records of each message, which is much faster than WAYLAND_DEBUG or GDB
+'''
+from . import decode
+from .runner import run_program
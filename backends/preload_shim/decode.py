@@ -0,0 +1,112 @@
+import sys
+import struct
+import logging
+from typing import Dict, Set, Tuple
+
+from interfaces import ConnectionIDSink
+from core import wl
+from core.wl import protocol, wire
+from core.output import Output
+
+logger = logging.getLogger(__name__)
+
+# Must be kept in sync with struct shim_record_header in shim/record.h
+record_header = struct.Struct('=IBBHIIQQII')
+# Must be kept in sync with struct shim_chunk_header in shim/record.h
+chunk_header = struct.Struct('=IHH')
+
+RECORD_INTERFACE = 0
+RECORD_MESSAGE = 1
+RECORD_CLOSE = 2
+
+FLAG_SENT = 1 << 0
+FLAG_SERVER = 1 << 1
+
+CHUNK_LAST = 1 << 0
+
+class RecordDecoder:
+    '''Decodes the records written by the preload shim and sends the messages they contain to a sink
+    Data can be fed in in arbitrary pieces, partial records are kept until the rest arrives
+    Records are split into chunks by the shim so chunks from different processes don't get mixed up part way through,
+    the chunks of each process are put back together here
+    '''
+    def __init__(self, out: Output, sink: ConnectionIDSink) -> None:
+        self.out = out
+        self.sink = sink
+        self.buffer = bytearray()
+        # Records that have only had some of their chunks arrive, by pid
+        self.partial_records: Dict[int, bytearray] = {}
+        # Interface IDs are assigned per process, so keys are (pid, interface ID)
+        self.interface_names: Dict[Tuple[int, int], str] = {}
+        self.known_connections: Set[str] = set()
+        self.last_time = 0
+
+    def feed(self, data: bytes) -> None:
+        self.buffer += data
+        offset = 0
+        while len(self.buffer) - offset >= chunk_header.size:
+            pid, size, flags = chunk_header.unpack_from(self.buffer, offset)
+            end = offset + chunk_header.size + size
+            if len(self.buffer) < end:
+                break
+            record = self.partial_records.setdefault(pid, bytearray())
+            record += self.buffer[offset + chunk_header.size:end]
+            offset = end
+            if flags & CHUNK_LAST:
+                del self.partial_records[pid]
+                self._complete_record(bytes(record))
+        del self.buffer[:offset]
+
+    def _complete_record(self, record: bytes) -> None:
+        if len(record) < record_header.size or record_header.unpack_from(record, 0)[0] != len(record):
+            raise RuntimeError('Invalid record of ' + str(len(record)) + ' bytes')
+        try:
+            self._record(record)
+        except RuntimeError as e:
+            self.out.error('Failed to decode record: ' + str(e))
+
+    def _record(self, record: bytes) -> None:
+        _, kind, flags, interface_id, pid, object_id, timestamp_us, connection, opcode, _ = (
+            record_header.unpack_from(record, 0))
+        if kind == RECORD_INTERFACE:
+            name = sys.intern(record[record_header.size:].decode('utf-8', 'replace'))
+            self.interface_names[(pid, interface_id)] = name
+            return
+        conn_id = 'preload:' + str(pid) + ':' + hex(connection)
+        is_server = bool(flags & FLAG_SERVER)
+        if kind == RECORD_CLOSE:
+            if conn_id in self.known_connections:
+                self.known_connections.remove(conn_id)
+                self.sink.close_connection(timestamp_us, conn_id)
+        elif kind == RECORD_MESSAGE:
+            sent = bool(flags & FLAG_SENT)
+            interface_name = self.interface_names.get((pid, interface_id))
+            if interface_name is None:
+                raise RuntimeError('Message on unknown interface ID ' + str(interface_id) + ' from process ' + str(pid))
+            # Servers send events and clients send requests
+            is_event = sent == is_server
+            message = protocol.get_message_by_opcode(interface_name, is_event, opcode)
+            if message is None:
+                self.out.unprocessed(
+                    'Unknown ' + ('event' if is_event else 'request') + ' ' + str(opcode) +
+                    ' on ' + interface_name + '@' + str(object_id))
+                return
+            args = wire.decode_args(message, record, record_header.size, None)
+            self.last_time = timestamp_us
+            msg = wl.Message(self.last_time, wl.UnresolvedObject(object_id, interface_name), sent, message.name, args)
+            if conn_id not in self.known_connections:
+                self.known_connections.add(conn_id)
+                self.sink.open_connection(self.last_time, conn_id, is_server)
+            self.sink.message(conn_id, msg)
+        else:
+            logger.warning('Ignoring record of unknown kind ' + str(kind))
+
+    def cleanup(self) -> None:
+        incomplete = len(self.buffer) + sum(len(record) for record in self.partial_records.values())
+        if incomplete:
+            logger.warning('Discarding ' + str(incomplete) + ' bytes of incomplete records')
+            self.buffer = bytearray()
+            self.partial_records = {}
+        for conn_id in self.known_connections:
+            self.sink.close_connection(self.last_time, conn_id)
+        self.known_connections = set()
@@ -0,0 +1,71 @@
+import subprocess
+import os
+import logging
+from typing import Callable
+
+from interfaces import UIState, ConnectionIDSink, CommandSink
+from frontends.tui import Arguments, TerminalUI
+from core.output import Output
+from core.util import project_root
+from .decode import RecordDecoder
+
+shim_fd_env = 'WAYLAND_DEBUG_SHIM_FD'
+read_size = 1 << 16
+
+def shim_source_path() -> str:
+    return os.path.join(project_root(), 'backends', 'preload_shim', 'shim')
+
+def shim_library_path() -> str:
+    '''Returns the path to the shim library, building it first if needed'''
+    import shutil
+    build_dir = os.path.join(shim_source_path(), 'build')
+    lib_path = os.path.join(build_dir, 'libwayland-debug-shim.so')
+    if os.path.isfile(lib_path):
+        return lib_path
+    meson = shutil.which('meson')
+    ninja = shutil.which('ninja')
+    if not meson or not ninja:
+        raise RuntimeError('meson and ninja are needed to build the preload shim (' + lib_path + ' does not exist)')
+    logging.info('Building preload shim')
+    if not os.path.isdir(build_dir):
+        subprocess.run([meson, 'setup', 'build'], cwd=shim_source_path(), check=True)
+    subprocess.run([ninja, '-C', build_dir], check=True)
+    if not os.path.isfile(lib_path):
+        raise RuntimeError('Failed to build ' + lib_path)
+    return lib_path
+
+def run_program(
+    output: Output,
+    args: Arguments,
+    connection_id_sink: ConnectionIDSink,
+    command_sink: CommandSink,
+    ui_state: UIState,
+    input_func: Callable[[str], str]
+) -> int:
+    ui = TerminalUI(command_sink, ui_state, input_func)
+    shim = shim_library_path()
+    readable, writable = os.pipe()
+    env = os.environ.copy()
+    env['LD_PRELOAD'] = ':'.join(filter(None, [shim, env.get('LD_PRELOAD', '')]))
+    env['LD_LIBRARY_PATH'] = ':'.join(filter(None, [args.wayland_lib_dir, env.get('LD_LIBRARY_PATH', '')]))
+    env[shim_fd_env] = str(writable)
+    logging.info('Running ' + repr(args.command_args) + ' with ' + shim + ' preloaded')
+    process = subprocess.Popen(args.command_args, env=env, pass_fds=(writable,))
+    # The child (and any processes it spawns) hold the only write ends, so we get EOF when they all exit
+    os.close(writable)
+    decoder = RecordDecoder(output, connection_id_sink)
+    try:
+        while True:
+            data = os.read(readable, read_size)
+            if not data:
+                break
+            decoder.feed(data)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        os.close(readable)
+    decoder.cleanup()
+    returncode = process.wait()
+    logging.info('Program finished with exit code ' + str(returncode))
+    ui.run_until_stopped()
+    return returncode
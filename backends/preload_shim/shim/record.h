@@ -0,0 +1,60 @@
+// The binary record format written by the shim
+// Must be kept in sync with backends/preload_shim/decode.py
+
+#ifndef RECORD_H
+#define RECORD_H
+
+#include <stdint.h>
+
+enum shim_record_kind
+{
+    // Payload is the name of the interface (without a null terminator), assigns the interface_id
+    SHIM_RECORD_INTERFACE = 0,
+    // Payload is the message arguments in the Wayland wire format, except fds are sent inline as ints
+    SHIM_RECORD_MESSAGE = 1,
+    // No payload, the connection has been closed
+    SHIM_RECORD_CLOSE = 2,
+};
+
+enum shim_record_flags
+{
+    SHIM_FLAG_SENT = 1 << 0,
+    SHIM_FLAG_SERVER = 1 << 1,
+};
+
+// All fields are in host byte order, no padding
+// Records from different processes may be interleaved, so interface IDs and connections are only unique per pid
+// Records are not written directly, they are split into chunks (see shim_chunk_header)
+struct shim_record_header
+{
+    uint32_t size; // Total size of the record in bytes, including this header
+    uint8_t kind; // A shim_record_kind
+    uint8_t flags; // A bitmask of shim_record_flags
+    uint16_t interface_id;
+    uint32_t pid;
+    uint32_t object_id;
+    uint64_t timestamp_us; // CLOCK_MONOTONIC in microseconds
+    uint64_t connection; // Pointer to the wl_display (client) or wl_client (server)
+    uint32_t opcode;
+    uint32_t reserved;
+};
+
+enum shim_chunk_flags
+{
+    // This chunk ends a record
+    SHIM_CHUNK_LAST = 1 << 0,
+};
+
+// Written before each chunk of a record
+// Each chunk (including this header) is at most PIPE_BUF bytes and written with a single write(), which POSIX
+// guarantees is not interleaved with writes from other processes. Forked children share the file descriptor, so
+// without this their records could be interleaved part way through. A process sends the chunks of a record one after
+// another, so they are put back together by pid.
+struct shim_chunk_header
+{
+    uint32_t pid;
+    uint16_t size; // Size of the record data in this chunk, not including this header
+    uint16_t flags; // A bitmask of shim_chunk_flags
+};
+
+#endif // RECORD_H
@@ -0,0 +1,31 @@
+#ifndef SHIM_H
+#define SHIM_H
+
+#include <stdbool.h>
+#include <stdint.h>
+#include <wayland-util.h>
+
+// Returns the Wayland ID of a non-null object argument
+typedef uint32_t (*shim_object_id_func_t)(struct wl_object* object);
+
+// If records are being written (WAYLAND_DEBUG_SHIM_FD is set)
+bool shim_enabled(void);
+
+// Write a message record
+// new_ids_are_objects: if new_id arguments hold objects instead of IDs (true for events a client receives)
+void shim_write_message(
+    uint64_t connection,
+    bool is_server,
+    bool sent,
+    const char* interface_name,
+    uint32_t object_id,
+    uint32_t opcode,
+    const struct wl_message* message,
+    const union wl_argument* args,
+    shim_object_id_func_t object_id_of,
+    bool new_ids_are_objects);
+
+// Write a record saying the connection has been closed
+void shim_write_close(uint64_t connection, bool is_server);
+
+#endif // SHIM_H
@@ -0,0 +1,187 @@
+// Hooks into libwayland-client so messages on client connections are recorded
+// Uses the client message observer API (libwayland 1.23+), which is looked up at runtime so the shim still loads
+// (and traces servers) with older versions
+
+#define _GNU_SOURCE
+#include <dlfcn.h>
+#include <pthread.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <wayland-client-core.h>
+
+#include "shim.h"
+
+// Mirrors the start of struct wl_client_observed_message, declared here so we build against older headers
+struct shim_client_observed_message
+{
+    struct wl_proxy* proxy;
+    int message_opcode;
+    const struct wl_message* message;
+    int arguments_count;
+    const union wl_argument* arguments;
+};
+
+// Mirrors enum wl_client_message_type
+enum shim_client_message_type
+{
+    SHIM_CLIENT_MESSAGE_REQUEST = 0,
+    SHIM_CLIENT_MESSAGE_EVENT = 1,
+};
+
+typedef void (*shim_client_observer_func_t)(
+    void* user_data,
+    enum shim_client_message_type type,
+    const struct shim_client_observed_message* message);
+typedef void* (*create_client_observer_func_t)(struct wl_display*, shim_client_observer_func_t, void*);
+typedef struct wl_display* (*connect_func_t)(const char*);
+typedef struct wl_display* (*connect_to_fd_func_t)(int);
+typedef void (*disconnect_func_t)(struct wl_display*);
+
+// Grows as needed, empty slots are NULL
+static pthread_mutex_t displays_lock = PTHREAD_MUTEX_INITIALIZER;
+static struct wl_display** observed_displays = NULL;
+static int observed_capacity = 0;
+
+static uint32_t proxy_id(struct wl_object* object)
+{
+    // A wl_proxy starts with it's wl_object
+    return wl_proxy_get_id((struct wl_proxy*)object);
+}
+
+static void observer(
+    void* user_data,
+    enum shim_client_message_type type,
+    const struct shim_client_observed_message* message)
+{
+    bool sent = type == SHIM_CLIENT_MESSAGE_REQUEST;
+    shim_write_message(
+        (uint64_t)(uintptr_t)user_data,
+        false,
+        sent,
+        wl_proxy_get_class(message->proxy),
+        wl_proxy_get_id(message->proxy),
+        (uint32_t)message->message_opcode,
+        message->message,
+        message->arguments,
+        proxy_id,
+        !sent);
+}
+
+// Returns false if the display was already being observed (wl_display_connect may call wl_display_connect_to_fd), or
+// could not be added
+static bool add_observed_display(struct wl_display* display)
+{
+    int empty = -1;
+    pthread_mutex_lock(&displays_lock);
+    for (int i = 0; i < observed_capacity; i++)
+    {
+        if (observed_displays[i] == display)
+        {
+            pthread_mutex_unlock(&displays_lock);
+            return false;
+        }
+        if (!observed_displays[i] && empty < 0)
+        {
+            empty = i;
+        }
+    }
+    if (empty < 0)
+    {
+        int capacity = observed_capacity ? observed_capacity * 2 : 16;
+        struct wl_display** displays = realloc(observed_displays, sizeof(struct wl_display*) * (size_t)capacity);
+        if (!displays)
+        {
+            pthread_mutex_unlock(&displays_lock);
+            fprintf(stderr, "wayland-debug shim: out of memory, not tracing a connection\n");
+            return false;
+        }
+        for (int i = observed_capacity; i < capacity; i++)
+        {
+            displays[i] = NULL;
+        }
+        empty = observed_capacity;
+        observed_displays = displays;
+        observed_capacity = capacity;
+    }
+    observed_displays[empty] = display;
+    pthread_mutex_unlock(&displays_lock);
+    return true;
+}
+
+static bool remove_observed_display(struct wl_display* display)
+{
+    bool removed = false;
+    pthread_mutex_lock(&displays_lock);
+    for (int i = 0; i < observed_capacity; i++)
+    {
+        if (observed_displays[i] == display)
+        {
+            observed_displays[i] = NULL;
+            removed = true;
+        }
+    }
+    pthread_mutex_unlock(&displays_lock);
+    return removed;
+}
+
+static void observe_display(struct wl_display* display)
+{
+    static create_client_observer_func_t create_observer = NULL;
+    static bool warned = false;
+    if (!display || !shim_enabled() || !add_observed_display(display))
+    {
+        return;
+    }
+    if (!create_observer)
+    {
+        create_observer = (create_client_observer_func_t)dlsym(RTLD_DEFAULT, "wl_display_create_client_observer");
+    }
+    if (!create_observer)
+    {
+        if (!warned)
+        {
+            fprintf(stderr, "wayland-debug shim: libwayland-client is too old to trace clients (needs 1.23+)\n");
+            warned = true;
+        }
+        return;
+    }
+    create_observer(display, observer, display);
+}
+
+struct wl_display* wl_display_connect(const char* name)
+{
+    static connect_func_t real = NULL;
+    if (!real)
+    {
+        real = (connect_func_t)dlsym(RTLD_NEXT, "wl_display_connect");
+    }
+    struct wl_display* display = real(name);
+    observe_display(display);
+    return display;
+}
+
+struct wl_display* wl_display_connect_to_fd(int fd)
+{
+    static connect_to_fd_func_t real = NULL;
+    if (!real)
+    {
+        real = (connect_to_fd_func_t)dlsym(RTLD_NEXT, "wl_display_connect_to_fd");
+    }
+    struct wl_display* display = real(fd);
+    observe_display(display);
+    return display;
+}
+
+void wl_display_disconnect(struct wl_display* display)
+{
+    static disconnect_func_t real = NULL;
+    if (!real)
+    {
+        real = (disconnect_func_t)dlsym(RTLD_NEXT, "wl_display_disconnect");
+    }
+    if (remove_observed_display(display))
+    {
+        shim_write_close((uint64_t)(uintptr_t)display, false);
+    }
+    real(display);
+}
@@ -0,0 +1,334 @@
+// Builds records and writes them to the file descriptor given by wayland-debug
+
+#define _GNU_SOURCE
+#include <errno.h>
+#include <limits.h>
+#include <pthread.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+#include <unistd.h>
+
+#include "shim.h"
+#include "record.h"
+
+#define SHIM_FD_ENV "WAYLAND_DEBUG_SHIM_FD"
+#define MAX_INTERFACES 0xffff
+
+static pthread_once_t init_once = PTHREAD_ONCE_INIT;
+static pthread_mutex_t lock = PTHREAD_MUTEX_INITIALIZER;
+static int out_fd = -1;
+
+// Interfaces are identified by the address of their name, with a string comparison fallback
+static const char** interface_names = NULL;
+static int interface_count = 0;
+static int interface_capacity = 0;
+
+// The record currently being built
+static char* buffer = NULL;
+static size_t buffer_size = 0;
+static size_t buffer_capacity = 0;
+
+static void before_fork(void)
+{
+    // Makes sure no other thread is part way through a record when the process is copied
+    pthread_mutex_lock(&lock);
+}
+
+static void after_fork_in_parent(void)
+{
+    pthread_mutex_unlock(&lock);
+}
+
+static void after_fork_in_child(void)
+{
+    // Interfaces are identified per pid, so the child has to announce them again under its own
+    interface_count = 0;
+    pthread_mutex_unlock(&lock);
+}
+
+static void init(void)
+{
+    const char* fd_str = getenv(SHIM_FD_ENV);
+    if (fd_str)
+    {
+        out_fd = atoi(fd_str);
+        // Nothing has been recorded before this, so a child forked earlier has nothing to forget
+        pthread_atfork(before_fork, after_fork_in_parent, after_fork_in_child);
+    }
+}
+
+bool shim_enabled(void)
+{
+    pthread_once(&init_once, init);
+    return out_fd >= 0;
+}
+
+static uint64_t now_us(void)
+{
+    struct timespec time;
+    clock_gettime(CLOCK_MONOTONIC, &time);
+    return (uint64_t)time.tv_sec * 1000000 + (uint64_t)time.tv_nsec / 1000;
+}
+
+static void reserve(size_t size)
+{
+    if (buffer_size + size <= buffer_capacity)
+    {
+        return;
+    }
+    size_t capacity = buffer_capacity ? buffer_capacity : 4096;
+    while (capacity < buffer_size + size)
+    {
+        capacity *= 2;
+    }
+    char* new_buffer = realloc(buffer, capacity);
+    if (!new_buffer)
+    {
+        fprintf(stderr, "wayland-debug shim: out of memory\n");
+        abort();
+    }
+    buffer = new_buffer;
+    buffer_capacity = capacity;
+}
+
+static void append(const void* data, size_t size)
+{
+    reserve(size);
+    memcpy(buffer + buffer_size, data, size);
+    buffer_size += size;
+}
+
+static void append_u32(uint32_t value)
+{
+    append(&value, sizeof(value));
+}
+
+// Appends the size, then the data padded to 32 bits (same as strings and arrays in the wire format)
+static void append_sized(const void* data, uint32_t size)
+{
+    static const char padding[4] = {0, 0, 0, 0};
+    append_u32(size);
+    append(data, size);
+    append(padding, (4 - size % 4) % 4);
+}
+
+static void begin_record(
+    enum shim_record_kind kind,
+    uint8_t flags,
+    uint16_t interface_id,
+    uint64_t connection,
+    uint32_t object_id,
+    uint32_t opcode)
+{
+    struct shim_record_header header = {
+        .size = 0,
+        .kind = kind,
+        .flags = flags,
+        .interface_id = interface_id,
+        .pid = (uint32_t)getpid(),
+        .object_id = object_id,
+        .timestamp_us = now_us(),
+        .connection = connection,
+        .opcode = opcode,
+        .reserved = 0,
+    };
+    buffer_size = 0;
+    append(&header, sizeof(header));
+}
+
+// Writes all of the data, returns false if the write failed
+static bool write_all(const char* data, size_t size)
+{
+    size_t written = 0;
+    while (written < size)
+    {
+        ssize_t result = write(out_fd, data + written, size - written);
+        if (result < 0)
+        {
+            if (errno == EINTR)
+            {
+                continue;
+            }
+            return false;
+        }
+        written += (size_t)result;
+    }
+    return true;
+}
+
+static void finish_record(void)
+{
+    ((struct shim_record_header*)buffer)->size = (uint32_t)buffer_size;
+    char chunk[PIPE_BUF];
+    const size_t max_chunk_data = sizeof(chunk) - sizeof(struct shim_chunk_header);
+    struct shim_chunk_header header = {
+        .pid = (uint32_t)getpid(),
+        .size = 0,
+        .flags = 0,
+    };
+    size_t offset = 0;
+    while (offset < buffer_size)
+    {
+        size_t size = buffer_size - offset;
+        if (size > max_chunk_data)
+        {
+            size = max_chunk_data;
+        }
+        header.size = (uint16_t)size;
+        header.flags = offset + size == buffer_size ? SHIM_CHUNK_LAST : 0;
+        memcpy(chunk, &header, sizeof(header));
+        memcpy(chunk + sizeof(header), buffer + offset, size);
+        // A pipe never writes part of a chunk this size, so this is a single write
+        if (!write_all(chunk, sizeof(header) + size))
+        {
+            // wayland-debug has probably gone away, don't keep trying
+            out_fd = -1;
+            return;
+        }
+        offset += size;
+    }
+}
+
+static uint16_t interface_id_of(const char* name)
+{
+    for (int i = 0; i < interface_count; i++)
+    {
+        if (interface_names[i] == name)
+        {
+            return (uint16_t)i;
+        }
+    }
+    for (int i = 0; i < interface_count; i++)
+    {
+        if (strcmp(interface_names[i], name) == 0)
+        {
+            return (uint16_t)i;
+        }
+    }
+    if (interface_count >= MAX_INTERFACES)
+    {
+        fprintf(stderr, "wayland-debug shim: too many interfaces\n");
+        abort();
+    }
+    if (interface_count >= interface_capacity)
+    {
+        interface_capacity = interface_capacity ? interface_capacity * 2 : 64;
+        interface_names = realloc(interface_names, sizeof(const char*) * (size_t)interface_capacity);
+        if (!interface_names)
+        {
+            fprintf(stderr, "wayland-debug shim: out of memory\n");
+            abort();
+        }
+    }
+    uint16_t id = (uint16_t)interface_count;
+    interface_names[interface_count++] = name;
+    begin_record(SHIM_RECORD_INTERFACE, 0, id, 0, 0, 0);
+    append(name, strlen(name));
+    finish_record();
+    return id;
+}
+
+void shim_write_message(
+    uint64_t connection,
+    bool is_server,
+    bool sent,
+    const char* interface_name,
+    uint32_t object_id,
+    uint32_t opcode,
+    const struct wl_message* message,
+    const union wl_argument* args,
+    shim_object_id_func_t object_id_of,
+    bool new_ids_are_objects)
+{
+    if (!shim_enabled())
+    {
+        return;
+    }
+    pthread_mutex_lock(&lock);
+    if (out_fd < 0)
+    {
+        pthread_mutex_unlock(&lock);
+        return;
+    }
+    uint16_t interface_id = interface_id_of(interface_name);
+    uint8_t flags = (sent ? SHIM_FLAG_SENT : 0) | (is_server ? SHIM_FLAG_SERVER : 0);
+    begin_record(SHIM_RECORD_MESSAGE, flags, interface_id, connection, object_id, opcode);
+    int i = 0;
+    for (const char* c = message->signature; *c; c++)
+    {
+        switch (*c)
+        {
+        case 'i':
+            append_u32((uint32_t)args[i++].i);
+            break;
+        case 'u':
+            append_u32(args[i++].u);
+            break;
+        case 'f':
+            append_u32((uint32_t)args[i++].f);
+            break;
+        case 'h':
+            append_u32((uint32_t)args[i++].h);
+            break;
+        case 's':
+            if (args[i].s)
+            {
+                append_sized(args[i].s, (uint32_t)strlen(args[i].s) + 1);
+            }
+            else
+            {
+                append_u32(0);
+            }
+            i++;
+            break;
+        case 'o':
+            append_u32(args[i].o ? object_id_of(args[i].o) : 0);
+            i++;
+            break;
+        case 'n':
+            if (new_ids_are_objects)
+            {
+                append_u32(args[i].o ? object_id_of(args[i].o) : 0);
+            }
+            else
+            {
+                append_u32(args[i].n);
+            }
+            i++;
+            break;
+        case 'a':
+            if (args[i].a)
+            {
+                append_sized(args[i].a->data, (uint32_t)args[i].a->size);
+            }
+            else
+            {
+                append_u32(0);
+            }
+            i++;
+            break;
+        default:
+            // Version numbers and '?' nullable markers
+            break;
+        }
+    }
+    finish_record();
+    pthread_mutex_unlock(&lock);
+}
+
+void shim_write_close(uint64_t connection, bool is_server)
+{
+    if (!shim_enabled())
+    {
+        return;
+    }
+    pthread_mutex_lock(&lock);
+    if (out_fd >= 0)
+    {
+        begin_record(SHIM_RECORD_CLOSE, is_server ? SHIM_FLAG_SERVER : 0, 0, connection, 0, 0);
+        finish_record();
+    }
+    pthread_mutex_unlock(&lock);
+}
@@ -0,0 +1,80 @@
+// Hooks into libwayland-server so messages on server connections are recorded
+// Uses the protocol logger API, which gets called from the same place WAYLAND_DEBUG output is generated
+
+#define _GNU_SOURCE
+#include <dlfcn.h>
+#include <stdlib.h>
+#include <wayland-server-core.h>
+
+#include "shim.h"
+
+typedef struct wl_display* (*create_func_t)(void);
+
+struct client_destroy_listener
+{
+    struct wl_listener listener;
+};
+
+static uint32_t resource_id(struct wl_object* object)
+{
+    // A wl_resource starts with it's wl_object
+    return wl_resource_get_id((struct wl_resource*)object);
+}
+
+static void logger(void* user_data, enum wl_protocol_logger_type type, const struct wl_protocol_logger_message* message)
+{
+    struct wl_resource* resource = message->resource;
+    shim_write_message(
+        (uint64_t)(uintptr_t)wl_resource_get_client(resource),
+        true,
+        type == WL_PROTOCOL_LOGGER_EVENT,
+        wl_resource_get_class(resource),
+        wl_resource_get_id(resource),
+        (uint32_t)message->message_opcode,
+        message->message,
+        message->arguments,
+        resource_id,
+        false);
+}
+
+static void client_destroyed(struct wl_listener* listener, void* data)
+{
+    struct wl_client* client = data;
+    struct client_destroy_listener* destroy_listener = wl_container_of(listener, destroy_listener, listener);
+    shim_write_close((uint64_t)(uintptr_t)client, true);
+    wl_list_remove(&listener->link);
+    free(destroy_listener);
+}
+
+static void client_created(struct wl_listener* listener, void* data)
+{
+    struct wl_client* client = data;
+    struct client_destroy_listener* destroy_listener = calloc(1, sizeof(struct client_destroy_listener));
+    if (!destroy_listener)
+    {
+        return;
+    }
+    destroy_listener->listener.notify = client_destroyed;
+    wl_client_add_destroy_listener(client, &destroy_listener->listener);
+}
+
+struct wl_display* wl_display_create(void)
+{
+    static create_func_t real = NULL;
+    if (!real)
+    {
+        real = (create_func_t)dlsym(RTLD_NEXT, "wl_display_create");
+    }
+    struct wl_display* display = real();
+    if (display && shim_enabled())
+    {
+        struct wl_listener* listener = calloc(1, sizeof(struct wl_listener));
+        if (listener)
+        {
+            listener->notify = client_created;
+            wl_display_add_client_created_listener(display, listener);
+        }
+        wl_display_add_protocol_logger(display, logger, NULL);
+    }
+    return display;
+}
@@ -0,0 +1,135 @@
+import unittest
+from unittest import mock
+import struct
+
+import interfaces
+from core import output
+from core.wl import Message, Arg, protocol
+from backends.preload_shim import decode
+
+def chunks(data, pid=100, chunk_size=4088):
+    '''Splits a record into chunks the way the shim does'''
+    result = b''
+    for i in range(0, len(data), chunk_size):
+        part = data[i:i + chunk_size]
+        flags = decode.CHUNK_LAST if i + chunk_size >= len(data) else 0
+        result += decode.chunk_header.pack(pid, len(part), flags) + part
+    return result
+
+def raw_record(kind, flags=0, interface_id=0, pid=100, object_id=0, timestamp_us=0, connection=0x1234, opcode=0, payload=b''):
+    size = decode.record_header.size + len(payload)
+    header = decode.record_header.pack(size, kind, flags, interface_id, pid, object_id, timestamp_us, connection, opcode, 0)
+    return header + payload
+
+def record(kind, pid=100, **kwargs):
+    return chunks(raw_record(kind, pid=pid, **kwargs), pid)
+
+def interface_record(interface_id, name, pid=100):
+    return record(decode.RECORD_INTERFACE, interface_id=interface_id, pid=pid, payload=name.encode('utf-8'))
+
+class TestRecordDecoder(unittest.TestCase):
+    def setUp(self):
+        protocol.load_all(output.Strict())
+        self.sink = mock.Mock(spec=interfaces.ConnectionIDSink)
+        self.decoder = decode.RecordDecoder(output.Strict(), self.sink)
+
+    def tearDown(self):
+        protocol.dump_all()
+
+    def get_registry_record(self, **kwargs):
+        return record(
+            decode.RECORD_MESSAGE,
+            flags=decode.FLAG_SENT,
+            interface_id=0,
+            object_id=1,
+            opcode=1,
+            payload=struct.pack('=I', 2),
+            **kwargs)
+
+    def test_header_size(self):
+        self.assertEqual(decode.record_header.size, 40)
+        self.assertEqual(decode.chunk_header.size, 8)
+
+    def test_client_message_opens_connection(self):
+        self.decoder.feed(interface_record(0, 'wl_display') + self.get_registry_record())
+        self.sink.open_connection.assert_called_once()
+        self.assertEqual(self.sink.open_connection.call_args[0][2], False)
+        self.sink.message.assert_called_once()
+        conn_id, message = self.sink.message.call_args[0]
+        self.assertIsInstance(message, Message)
+        self.assertEqual(message.name, 'get_registry')
+        self.assertEqual(message.obj.type, 'wl_display')
+        self.assertTrue(message.sent)
+        self.assertEqual(message.args[0].obj.id, 2)
+        self.assertEqual(message.args[0].obj.type, 'wl_registry')
+
+    def test_server_received_message_is_request(self):
+        self.decoder.feed(
+            interface_record(0, 'wl_display') +
+            record(decode.RECORD_MESSAGE, flags=decode.FLAG_SERVER, object_id=1, opcode=1, payload=struct.pack('=I', 2)))
+        self.assertEqual(self.sink.open_connection.call_args[0][2], True)
+        conn_id, message = self.sink.message.call_args[0]
+        self.assertEqual(message.name, 'get_registry')
+        self.assertFalse(message.sent)
+
+    def test_records_split_across_chunks(self):
+        data = interface_record(0, 'wl_display') + self.get_registry_record()
+        for i in range(len(data)):
+            self.decoder.feed(data[i:i + 1])
+        self.sink.message.assert_called_once()
+
+    def test_connections_are_separated_by_process(self):
+        data = (
+            interface_record(0, 'wl_display', pid=1) +
+            interface_record(0, 'wl_display', pid=2) +
+            self.get_registry_record(pid=1) +
+            self.get_registry_record(pid=2))
+        self.decoder.feed(data)
+        self.assertEqual(self.sink.open_connection.call_count, 2)
+        first = self.sink.message.call_args_list[0][0][0]
+        second = self.sink.message.call_args_list[1][0][0]
+        self.assertNotEqual(first, second)
+
+    def test_close_record_closes_connection(self):
+        self.decoder.feed(
+            interface_record(0, 'wl_display') +
+            self.get_registry_record() +
+            record(decode.RECORD_CLOSE, timestamp_us=5000000))
+        self.sink.close_connection.assert_called_once()
+        self.assertEqual(self.sink.close_connection.call_args[0][0], 5000000)
+
+    def test_cleanup_closes_open_connections(self):
+        self.decoder.feed(interface_record(0, 'wl_display') + self.get_registry_record())
+        self.decoder.cleanup()
+        self.sink.close_connection.assert_called_once()
+
+    def test_unknown_interface_id_is_an_error(self):
+        with self.assertRaises(RuntimeError):
+            self.decoder.feed(self.get_registry_record())
+
+    def test_chunks_of_different_processes_are_put_back_together(self):
+        # Big enough to be split into several chunks
+        name = 'a' * 10000
+        first = chunks(raw_record(decode.RECORD_MESSAGE, flags=decode.FLAG_SENT, pid=1, object_id=1, opcode=1, payload=(
+            struct.pack('=I', 2))), pid=1, chunk_size=16)
+        second = chunks(raw_record(decode.RECORD_MESSAGE, flags=decode.FLAG_SENT, pid=2, object_id=1, opcode=1, payload=(
+            struct.pack('=I', 3))), pid=2, chunk_size=16)
+        chunk_size = decode.chunk_header.size + 16
+        interleaved = b''
+        for i in range(0, max(len(first), len(second)), chunk_size):
+            interleaved += first[i:i + chunk_size] + second[i:i + chunk_size]
+        self.decoder.feed(
+            interface_record(0, 'wl_display', pid=1) +
+            interface_record(0, 'wl_display', pid=2) +
+            chunks(raw_record(decode.RECORD_INTERFACE, interface_id=1, pid=1, payload=name.encode('utf-8')), pid=1) +
+            interleaved)
+        self.assertEqual(self.decoder.interface_names[(1, 1)], name)
+        ids = [call[0][1].args[0].obj.id for call in self.sink.message.call_args_list]
+        self.assertEqual(ids, [2, 3])
+
+    def test_cleanup_discards_incomplete_record(self):
+        data = chunks(raw_record(decode.RECORD_INTERFACE, payload=b'wl_display'), chunk_size=16)
+        self.decoder.feed(data[:decode.chunk_header.size + 16])
+        with self.assertLogs(decode.logger, 'WARNING'):
+            self.decoder.cleanup()
+        self.assertEqual(self.decoder.partial_records, {})
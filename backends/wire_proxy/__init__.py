@@ -0,0 +1,7 @@
+'''
+Sits between a program and the Wayland compositor as a proxy and decodes the wire protocol directly
+This does not require WAYLAND_DEBUG or a libwayland with debug symbols, and works with any Wayland library
+'''
+from . import decode
+from . import proxy
+from .runner import run_program
@@ -0,0 +1,86 @@
+import struct
+import logging
+from collections import deque
+from typing import Deque, Dict, Iterator, List
+
+from interfaces import ConnectionIDSink
+from core import wl
+from core.wl import protocol, wire
+from core.output import Output
+
+logger = logging.getLogger(__name__)
+
+message_header = struct.Struct('=II')
+
+def _pop_all(fds: Deque[int]) -> Iterator[int]:
+    while fds:
+        yield fds.popleft()
+
+class _Stream:
+    '''Bytes and file descriptors going in one direction that have not yet been decoded'''
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+        self.fds: Deque[int] = deque()
+
+class ConnectionDecoder:
+    '''Decodes the Wayland wire protocol going both ways on a single connection
+    Keeps track of which interface each object ID has by watching new_id arguments and wl_display.delete_id
+    Messages are shown from the perspective of the client (requests are sent, events are received)
+    '''
+    def __init__(self, out: Output, sink: ConnectionIDSink, conn_id: str) -> None:
+        self.out = out
+        self.sink = sink
+        self.conn_id = conn_id
+        self.objects: Dict[int, str] = {1: 'wl_display'}
+        self.streams = {True: _Stream(), False: _Stream()}
+
+    def data(self, time: int, from_client: bool, data: bytes, fds: List[int]) -> None:
+        '''Process data sent through the proxy
+        time: when the data was received by the proxy
+        from_client: if the data is going from the client to the server (else server to client)
+        data: the raw bytes
+        fds: file descriptor numbers received with the data (only used for display)
+        '''
+        stream = self.streams[from_client]
+        stream.buffer += data
+        stream.fds.extend(fds)
+        offset = 0
+        while len(stream.buffer) - offset >= message_header.size:
+            obj_id, size_and_opcode = message_header.unpack_from(stream.buffer, offset)
+            size = size_and_opcode >> 16
+            opcode = size_and_opcode & 0xffff
+            if size < message_header.size:
+                raise RuntimeError('Invalid message size ' + str(size) + ' on connection ' + self.conn_id)
+            if len(stream.buffer) - offset < size:
+                break
+            body = bytes(stream.buffer[offset + message_header.size:offset + size])
+            offset += size
+            try:
+                self._message(time, from_client, obj_id, opcode, body, stream.fds)
+            except RuntimeError as e:
+                self.out.error('Failed to decode message on ' + self.conn_id + ': ' + str(e))
+        del stream.buffer[:offset]
+
+    def _message(self, time: int, from_client: bool, obj_id: int, opcode: int, body: bytes, fds: Deque[int]) -> None:
+        is_event = not from_client
+        interface_name = self.objects.get(obj_id)
+        if interface_name is None:
+            self.out.unprocessed(
+                ('request ' if from_client else 'event ') + str(opcode) + ' on unknown object ' + str(obj_id))
+            return
+        message = protocol.get_message_by_opcode(interface_name, is_event, opcode)
+        if message is None:
+            self.out.unprocessed(
+                'unknown ' + ('event ' if is_event else 'request ') + str(opcode) +
+                ' on ' + interface_name + '@' + str(obj_id))
+            return
+        args = wire.decode_args(message, body, 0, _pop_all(fds))
+        for arg in args:
+            if isinstance(arg, wl.Arg.Object) and arg.is_new and arg.obj.type is not None:
+                self.objects[arg.obj.id] = arg.obj.type
+        if interface_name == 'wl_display' and message.name == 'delete_id':
+            first_arg = args[0]
+            if isinstance(first_arg, wl.Arg.Int):
+                self.objects.pop(first_arg.value, None)
+        msg = wl.Message(time, wl.UnresolvedObject(obj_id, interface_name), from_client, message.name, args)
+        self.sink.message(self.conn_id, msg)
@@ -0,0 +1,237 @@
+import os
+import socket
+import selectors
+import threading
+import logging
+import array
+from collections import deque
+from typing import Deque, Dict, List, Optional, NamedTuple, Callable, Tuple
+
+from core.util import time_now
+
+logger = logging.getLogger(__name__)
+
+# Same as libwayland's limits
+max_fds_per_message = 28
+read_size = 1 << 16
+# Once this many bytes are waiting to be sent to one side, the proxy stops reading from the other side until they are
+max_pending_size = 1 << 20
+
+class ProxyEvent(NamedTuple):
+    '''Something that happened on a proxied connection
+    data is empty and fds is empty for open and close events
+    '''
+    time: int # Microseconds
+    connection: int
+    kind: str # 'open', 'data' or 'close'
+    from_client: bool
+    data: bytes
+    fds: List[int]
+
+def runtime_dir() -> str:
+    path = os.environ.get('XDG_RUNTIME_DIR')
+    if not path:
+        raise RuntimeError('XDG_RUNTIME_DIR not set')
+    return path
+
+def display_socket_path(display: Optional[str]) -> str:
+    '''The path libwayland would connect to for the given WAYLAND_DISPLAY'''
+    if not display:
+        display = 'wayland-0'
+    if os.path.isabs(display):
+        return display
+    return os.path.join(runtime_dir(), display)
+
+class _Outgoing:
+    '''Data and file descriptors received from one side that have not yet been sent to the other
+    File descriptors are sent with the first byte of the data they came with, and closed once they have been sent
+    '''
+    def __init__(self) -> None:
+        self.chunks: Deque[Tuple[memoryview, List[int]]] = deque()
+        self.size = 0
+
+    def add(self, data: bytes, fds: List[int]) -> None:
+        self.chunks.append((memoryview(data), fds))
+        self.size += len(data)
+
+    def send(self, sock: socket.socket) -> None:
+        '''Send as much as the socket takes without blocking, raises OSError if the socket fails'''
+        while self.chunks:
+            data, fds = self.chunks[0]
+            ancdata = []
+            if fds:
+                ancdata = [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array('i', fds).tobytes())]
+            try:
+                sent = sock.sendmsg([data], ancdata)
+            except BlockingIOError:
+                return
+            self.size -= sent
+            for fd in fds:
+                os.close(fd)
+            if sent < len(data):
+                self.chunks[0] = (data[sent:], [])
+                return
+            self.chunks.popleft()
+
+    def discard(self) -> None:
+        for _, fds in self.chunks:
+            for fd in fds:
+                os.close(fd)
+        self.chunks.clear()
+        self.size = 0
+
+class _Pair:
+    def __init__(self, number: int, client: socket.socket, server: socket.socket) -> None:
+        self.number = number
+        self.client = client
+        self.server = server
+        # By the socket the data is going to
+        self.outgoing = {client: _Outgoing(), server: _Outgoing()}
+        # Set once either side hangs up, the pair is closed once what that side sent has been forwarded
+        self.closing = False
+
+    def other(self, sock: socket.socket) -> socket.socket:
+        return self.server if sock is self.client else self.client
+
+class Proxy:
+    '''Listens on a Wayland socket and forwards each connection to the real compositor unchanged
+    Forwarding happens on a background thread, which also reports everything it sees to a callback
+    The callback is called on the forwarding thread, so it should do as little as possible
+    Sockets are non-blocking. What one side can't take yet is buffered until the selector says it is writable, so a
+    slow client or compositor never holds up the others. Once too much is buffered for one side, the proxy stops
+    reading from the other side until it catches up.
+    '''
+    def __init__(self, listen_path: str, server_path: str, callback: Callable[[ProxyEvent], None]) -> None:
+        self.listen_path = listen_path
+        self.server_path = server_path
+        self.callback = callback
+        self.selector = selectors.DefaultSelector()
+        self.pairs: Dict[socket.socket, _Pair] = {}
+        self.next_number = 0
+        self.stop_requested = threading.Event()
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if os.path.exists(listen_path):
+            os.remove(listen_path)
+        self.listener.bind(listen_path)
+        self.listener.listen()
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        self.thread = threading.Thread(name='wire proxy', target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        '''Close all connections and stop the forwarding thread'''
+        self.stop_requested.set()
+        self.thread.join()
+
+    def _run(self) -> None:
+        try:
+            while not self.stop_requested.is_set():
+                for key, events in self.selector.select(timeout=0.05):
+                    sock = key.fileobj
+                    assert isinstance(sock, socket.socket)
+                    if sock is self.listener:
+                        self._accept()
+                        continue
+                    if events & selectors.EVENT_WRITE and sock in self.pairs: # may have been closed earlier
+                        self._flush(self.pairs[sock], sock)
+                    if events & selectors.EVENT_READ and sock in self.pairs:
+                        self._forward(sock)
+        finally:
+            for pair in set(self.pairs.values()):
+                self._close(pair)
+            self.selector.unregister(self.listener)
+            self.listener.close()
+            if os.path.exists(self.listen_path):
+                os.remove(self.listen_path)
+
+    def _accept(self) -> None:
+        client, _ = self.listener.accept()
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            server.connect(self.server_path)
+        except OSError as e:
+            logger.error('Failed to connect to ' + self.server_path + ': ' + str(e))
+            client.close()
+            server.close()
+            return
+        client.setblocking(False)
+        server.setblocking(False)
+        pair = _Pair(self.next_number, client, server)
+        self.next_number += 1
+        self.pairs[client] = pair
+        self.pairs[server] = pair
+        self.selector.register(client, selectors.EVENT_READ)
+        self.selector.register(server, selectors.EVENT_READ)
+        self.callback(ProxyEvent(time_now(), pair.number, 'open', True, b'', []))
+
+    def _forward(self, sock: socket.socket) -> None:
+        pair = self.pairs[sock]
+        from_client = sock is pair.client
+        destination = pair.other(sock)
+        try:
+            data, ancdata, _, _ = sock.recvmsg(read_size, socket.CMSG_SPACE(max_fds_per_message * 4))
+        except BlockingIOError:
+            return
+        except OSError:
+            data, ancdata = b'', []
+        now = time_now()
+        fds: List[int] = []
+        for level, kind, cmsg_data in ancdata:
+            if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                fd_array = array.array('i')
+                fd_array.frombytes(cmsg_data[:len(cmsg_data) - (len(cmsg_data) % fd_array.itemsize)])
+                fds.extend(fd_array)
+        if not data:
+            for fd in fds:
+                os.close(fd)
+            # Nothing can be sent to the side that hung up, but what it sent before is still forwarded
+            pair.closing = True
+            pair.outgoing[sock].discard()
+            self._flush(pair, destination)
+            return
+        pair.outgoing[destination].add(data, fds)
+        self.callback(ProxyEvent(now, pair.number, 'data', from_client, data, fds))
+        self._flush(pair, destination)
+
+    def _flush(self, pair: _Pair, sock: socket.socket) -> None:
+        '''Send what is waiting for the socket, then update what the selector waits for on both sockets'''
+        outgoing = pair.outgoing[sock]
+        try:
+            outgoing.send(sock)
+        except OSError:
+            self._close(pair)
+            return
+        if pair.closing and not outgoing.chunks:
+            self._close(pair)
+            return
+        for side in (pair.client, pair.server):
+            events = 0
+            if not pair.closing and pair.outgoing[pair.other(side)].size < max_pending_size:
+                events |= selectors.EVENT_READ
+            if pair.outgoing[side].chunks:
+                events |= selectors.EVENT_WRITE
+            self._set_events(side, events)
+
+    def _set_events(self, sock: socket.socket, events: int) -> None:
+        try:
+            key = self.selector.get_key(sock)
+        except KeyError:
+            if events:
+                self.selector.register(sock, events)
+            return
+        if not events:
+            self.selector.unregister(sock)
+        elif events != key.events:
+            self.selector.modify(sock, events)
+
+    def _close(self, pair: _Pair) -> None:
+        if pair.client not in self.pairs:
+            return
+        for sock in (pair.client, pair.server):
+            del self.pairs[sock]
+            self._set_events(sock, 0)
+            pair.outgoing[sock].discard()
+            sock.close()
+        self.callback(ProxyEvent(time_now(), pair.number, 'close', True, b'', []))
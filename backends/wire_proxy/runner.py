@@ -0,0 +1,88 @@
+import subprocess
+import os
+import queue
+import threading
+import logging
+from typing import Callable, Dict, Optional
+
+from interfaces import UIState, ConnectionIDSink, CommandSink
+from frontends.tui import Arguments, TerminalUI
+from core.output import Output
+from .proxy import Proxy, ProxyEvent, runtime_dir, display_socket_path
+from .decode import ConnectionDecoder
+
+class _Decoder:
+    '''Turns proxy events into connections and messages (runs on the main thread)'''
+    def __init__(self, output: Output, sink: ConnectionIDSink) -> None:
+        self.output = output
+        self.sink = sink
+        self.connections: Dict[int, ConnectionDecoder] = {}
+        self.last_time = 0
+
+    def event(self, event: ProxyEvent) -> None:
+        self.last_time = event.time
+        conn_id = 'proxy:' + str(event.connection)
+        if event.kind == 'open':
+            self.sink.open_connection(event.time, conn_id, False)
+            self.connections[event.connection] = ConnectionDecoder(self.output, self.sink, conn_id)
+            return
+        connection = self.connections.get(event.connection)
+        if connection is None:
+            # Already closed, either by the proxy or because it sent garbage
+            return
+        if event.kind == 'data':
+            try:
+                connection.data(event.time, event.from_client, event.data, event.fds)
+            except RuntimeError as e:
+                self.output.error(str(e) + ', no longer decoding it')
+                del self.connections[event.connection]
+                self.sink.close_connection(event.time, conn_id)
+        elif event.kind == 'close':
+            del self.connections[event.connection]
+            self.sink.close_connection(event.time, conn_id)
+
+    def cleanup(self) -> None:
+        for number in self.connections:
+            self.sink.close_connection(self.last_time, 'proxy:' + str(number))
+        self.connections = {}
+
+def run_program(
+    output: Output,
+    args: Arguments,
+    connection_id_sink: ConnectionIDSink,
+    command_sink: CommandSink,
+    ui_state: UIState,
+    input_func: Callable[[str], str]
+) -> int:
+    ui = TerminalUI(command_sink, ui_state, input_func)
+    server_path = display_socket_path(os.environ.get('WAYLAND_DISPLAY'))
+    display_name = 'wayland-debug-proxy-' + str(os.getpid())
+    events: 'queue.SimpleQueue[Optional[ProxyEvent]]' = queue.SimpleQueue()
+    proxy = Proxy(os.path.join(runtime_dir(), display_name), server_path, events.put)
+    proxy.start()
+    env = os.environ.copy()
+    env['WAYLAND_DISPLAY'] = display_name
+    logging.info('Running ' + repr(args.command_args) + ' through a proxy to ' + server_path)
+    process = subprocess.Popen(args.command_args, env=env)
+
+    def wait_for_program() -> None:
+        process.wait()
+        proxy.stop()
+        events.put(None)
+    waiter = threading.Thread(name='program waiter', target=wait_for_program, daemon=True)
+    waiter.start()
+
+    decoder = _Decoder(output, connection_id_sink)
+    try:
+        while True:
+            event = events.get()
+            if event is None:
+                break
+            decoder.event(event)
+    except KeyboardInterrupt:
+        pass
+    decoder.cleanup()
+    returncode = process.wait()
+    logging.info('Program finished with exit code ' + str(returncode))
+    ui.run_until_stopped()
+    return returncode
@@ -0,0 +1,201 @@
+import unittest
+from unittest import mock
+import os
+import socket
+import struct
+import tempfile
+import queue
+import array
+import threading
+import time
+
+import interfaces
+from core import output
+from core.wl import Message, Arg, protocol
+from backends.wire_proxy import decode, proxy, runner
+
+def wire_message(obj_id, opcode, payload=b''):
+    return decode.message_header.pack(obj_id, ((8 + len(payload)) << 16) | opcode) + payload
+
+def wire_string(value):
+    encoded = value.encode('utf-8') + b'\0'
+    return struct.pack('=I', len(encoded)) + encoded + b'\0' * (-len(encoded) % 4)
+
+get_registry = wire_message(1, 1, struct.pack('=I', 2))
+
+class TestConnectionDecoder(unittest.TestCase):
+    def setUp(self):
+        protocol.load_all(output.Strict())
+        self.sink = mock.Mock(spec=interfaces.ConnectionIDSink)
+        self.decoder = decode.ConnectionDecoder(output.Strict(), self.sink, 'proxy:0')
+
+    def tearDown(self):
+        protocol.dump_all()
+
+    def messages(self):
+        return [call[0][1] for call in self.sink.message.call_args_list]
+
+    def test_request(self):
+        self.decoder.data(1000000, True, get_registry, [])
+        message = self.messages()[0]
+        self.assertIsInstance(message, Message)
+        self.assertEqual(message.name, 'get_registry')
+        self.assertTrue(message.sent)
+        self.assertEqual(message.obj.type, 'wl_display')
+        self.assertEqual(message.args[0].obj.type, 'wl_registry')
+
+    def test_event_on_new_object(self):
+        self.decoder.data(1000000, True, get_registry, [])
+        self.decoder.data(1100000, False, wire_message(2, 0, struct.pack('=I', 7) + wire_string('wl_seat') + struct.pack('=I', 5)), [])
+        message = self.messages()[1]
+        self.assertEqual(message.name, 'global')
+        self.assertFalse(message.sent)
+        self.assertEqual(message.obj.type, 'wl_registry')
+        self.assertEqual(message.args[1].value, 'wl_seat')
+
+    def test_split_message(self):
+        data = get_registry + wire_message(1, 0, struct.pack('=I', 3))
+        self.decoder.data(1000000, True, data[:5], [])
+        self.sink.message.assert_not_called()
+        self.decoder.data(1000000, True, data[5:14], [])
+        self.assertEqual(len(self.messages()), 1)
+        self.decoder.data(1000000, True, data[14:], [])
+        self.assertEqual([m.name for m in self.messages()], ['get_registry', 'sync'])
+
+    def test_bind_tracks_interface(self):
+        self.decoder.data(1000000, True, get_registry, [])
+        self.decoder.data(1000000, True, wire_message(2, 0, struct.pack('=I', 7) + wire_string('wl_seat') + struct.pack('=II', 5, 3)), [])
+        self.decoder.data(1000000, True, wire_message(3, 1, struct.pack('=I', 4)), [])
+        message = self.messages()[2]
+        self.assertEqual(message.obj.type, 'wl_seat')
+        self.assertEqual(message.name, 'get_keyboard')
+
+    def test_delete_id_forgets_object(self):
+        self.decoder.data(1000000, True, wire_message(1, 0, struct.pack('=I', 3)), [])
+        self.assertIn(3, self.decoder.objects)
+        self.decoder.data(1000000, False, wire_message(1, 1, struct.pack('=I', 3)), [])
+        self.assertNotIn(3, self.decoder.objects)
+
+    def test_fds_taken_in_order(self):
+        self.decoder.data(1000000, True, get_registry, [])
+        self.decoder.data(1000000, True, wire_message(2, 0, struct.pack('=I', 7) + wire_string('wl_seat') + struct.pack('=II', 5, 3)), [])
+        self.decoder.data(1000000, True, wire_message(3, 1, struct.pack('=I', 4)), [])
+        keymap = wire_message(4, 0, struct.pack('=II', 1, 4096))
+        self.decoder.data(1000000, False, keymap + keymap, [11, 12])
+        fds = [m.args[1].value for m in self.messages()[3:]]
+        self.assertEqual(fds, [11, 12])
+
+    def test_unknown_object_is_unprocessed(self):
+        out = mock.Mock(spec=output.Output)
+        decoder = decode.ConnectionDecoder(out, self.sink, 'proxy:0')
+        decoder.data(1000000, True, wire_message(9, 0), [])
+        out.unprocessed.assert_called_once()
+        self.sink.message.assert_not_called()
+
+    def test_invalid_size_raises(self):
+        with self.assertRaises(RuntimeError):
+            self.decoder.data(1000000, True, decode.message_header.pack(1, (4 << 16) | 1), [])
+
+class TestRunnerDecoder(unittest.TestCase):
+    def setUp(self):
+        protocol.load_all(output.Strict())
+        self.out = mock.Mock(spec=output.Output)
+        self.sink = mock.Mock(spec=interfaces.ConnectionIDSink)
+        self.decoder = runner._Decoder(self.out, self.sink)
+
+    def tearDown(self):
+        protocol.dump_all()
+
+    def event(self, kind, data=b''):
+        self.decoder.event(proxy.ProxyEvent(1000000, 0, kind, True, data, []))
+
+    def test_data_after_close_is_ignored(self):
+        self.event('open')
+        self.event('close')
+        self.event('data', get_registry)
+        self.sink.message.assert_not_called()
+
+    def test_invalid_size_drops_connection(self):
+        self.event('open')
+        self.event('data', decode.message_header.pack(1, (4 << 16) | 1))
+        self.out.error.assert_called_once()
+        self.sink.close_connection.assert_called_once_with(1000000, 'proxy:0')
+        self.event('data', get_registry)
+        self.event('close')
+        self.sink.message.assert_not_called()
+        self.sink.close_connection.assert_called_once()
+
+class TestProxy(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server_path = os.path.join(self.tmp.name, 'wayland-server')
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.server_path)
+        self.server.listen()
+        self.events = queue.SimpleQueue()
+        self.proxy = proxy.Proxy(os.path.join(self.tmp.name, 'wayland-proxy'), self.server_path, self.events.put)
+        self.proxy.start()
+
+    def tearDown(self):
+        self.proxy.stop()
+        self.server.close()
+        self.tmp.cleanup()
+
+    def test_display_socket_path(self):
+        self.assertEqual(proxy.display_socket_path('/tmp/foo'), '/tmp/foo')
+        with mock.patch.dict(os.environ, {'XDG_RUNTIME_DIR': '/run/user/5'}):
+            self.assertEqual(proxy.display_socket_path(None), '/run/user/5/wayland-0')
+            self.assertEqual(proxy.display_socket_path('wayland-1'), '/run/user/5/wayland-1')
+
+    def test_forwards_data_and_fds(self):
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(self.proxy.listen_path)
+        server_side, _ = self.server.accept()
+        read_end, write_end = os.pipe()
+        try:
+            client.sendmsg([get_registry], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array('i', [write_end]).tobytes())])
+            data, ancdata, _, _ = server_side.recvmsg(1024, socket.CMSG_SPACE(4))
+            self.assertEqual(data, get_registry)
+            self.assertEqual(len(ancdata), 1)
+            received_fd = array.array('i', ancdata[0][2])[0]
+            os.write(received_fd, b'x')
+            os.close(received_fd)
+            self.assertEqual(os.read(read_end, 1), b'x')
+            server_side.sendall(b'reply')
+            self.assertEqual(client.recv(1024), b'reply')
+        finally:
+            os.close(read_end)
+            os.close(write_end)
+        client.close()
+        server_side.close()
+        kinds = []
+        while not kinds or kinds[-1] != 'close':
+            event = self.events.get(timeout=5)
+            kinds.append(event.kind)
+            if event.kind == 'data' and event.from_client:
+                self.assertEqual(event.data, get_registry)
+                self.assertEqual(len(event.fds), 1)
+        self.assertEqual(kinds, ['open', 'data', 'data', 'close'])
+
+    def test_slow_server_does_not_hold_up_replies(self):
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(self.proxy.listen_path)
+        server_side, _ = self.server.accept()
+        # Much more than the socket buffers hold, so most of it waits in the proxy while the server isn't reading
+        data = bytes(range(256)) * (1 << 14)
+        sender = threading.Thread(target=client.sendall, args=(data,), daemon=True)
+        sender.start()
+        # Give the proxy time to fill up the server's socket
+        time.sleep(0.2)
+        server_side.sendall(b'reply')
+        client.settimeout(5)
+        self.assertEqual(client.recv(1024), b'reply')
+        received = bytearray()
+        server_side.settimeout(5)
+        while len(received) < len(data):
+            received += server_side.recv(1 << 16)
+        self.assertEqual(bytes(received), data)
+        sender.join(5)
+        self.assertFalse(sender.is_alive())
+        client.close()
+        server_side.close()
@@ -0,0 +1,4 @@
+'''
+Benchmarks for measuring wayland-debug's performance, each one is run with python3 -m benchmarks.<name> from the
+project root. These are not run as part of the test suite.
+'''
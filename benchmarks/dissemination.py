@@ -0,0 +1,56 @@
+'''
+Measures the overhead of relaying a message to connection listeners through a disseminator
+Each case is timed with the specialised instance methods and with the generic class method, which looks up the
+listener's method on every call like disseminators used to. Results are nanoseconds per call, written as JSON.
+'''
+import json
+import timeit
+import functools
+import argparse
+from typing import Any, Dict
+
+from interfaces import Connection
+from core.util import new_disseminator_of_type
+
+class _Listener(Connection.Listener):
+    def connection_str_changed(self, connection: Connection) -> None:
+        pass
+
+    def connection_app_id_set(self, connection: Connection, new_app_id: str) -> None:
+        pass
+
+    def connection_got_new_message(self, connection: Any, message: Any) -> None:
+        pass
+
+    def connection_got_new_messages(self, connection: Any, messages: Any) -> None:
+        pass
+
+    def connection_closed(self, connection: Connection) -> None:
+        pass
+
+def _time(func: Any, calls: int) -> float:
+    '''Returns the best nanoseconds per call of several runs'''
+    runs = timeit.repeat(lambda: func(None, None), number=calls, repeat=5)
+    return min(runs) / calls * 1e9
+
+def run(calls: int) -> Dict[str, Any]:
+    results: Dict[str, Any] = {'direct': _time(_Listener().connection_got_new_message, calls)}
+    for count in (0, 1, 3):
+        diss = new_disseminator_of_type(Connection.Listener)
+        for _ in range(count):
+            diss.add_listener(_Listener())
+        generic = type(diss).connection_got_new_message
+        results[str(count) + '_listeners'] = {
+            'specialised_ns': _time(diss.connection_got_new_message, calls),
+            'generic_ns': _time(functools.partial(generic, diss), calls),
+        }
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=200000, help='calls per timing run')
+    args = parser.parse_args()
+    print(json.dumps(run(args.calls), indent=2))
+
+if __name__ == '__main__':
+    main()
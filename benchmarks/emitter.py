@@ -0,0 +1,57 @@
+'''
+A synthetic Wayland program that writes WAYLAND_DEBUG=1 style lines to stderr as fast as it can
+Every write is timed, so it can report how long it was stalled waiting for whoever is reading the other end
+This file is run as a separate program, so it must not import anything from wayland-debug
+Usage: emitter.py LINE_COUNT REPORT_PATH
+'''
+import sys
+import os
+import time
+import json
+
+stall_threshold = 0.001
+
+setup = [
+    '[{:10.3f}]  -> wl_display@1.get_registry(new id wl_registry@2)\n',
+    '[{:10.3f}] wl_registry@2.global(1, "wl_compositor", 4)\n',
+    '[{:10.3f}]  -> wl_registry@2.bind(1, "wl_compositor", 4, new id [unknown]@3)\n',
+    '[{:10.3f}]  -> wl_compositor@3.create_surface(new id wl_surface@4)\n',
+]
+
+# One frame of a client that redraws as fast as it can
+frame = [
+    '[{:10.3f}]  -> wl_surface@4.attach(nil, 0, 0)\n',
+    '[{:10.3f}]  -> wl_surface@4.damage_buffer(0, 0, 2147483647, 2147483647)\n',
+    '[{:10.3f}]  -> wl_surface@4.frame(new id wl_callback@5)\n',
+    '[{:10.3f}]  -> wl_surface@4.commit()\n',
+    '[{:10.3f}] wl_callback@5.done(1337)\n',
+    '[{:10.3f}] wl_display@1.delete_id(5)\n',
+]
+
+def main() -> None:
+    count = int(sys.argv[1])
+    report_path = sys.argv[2]
+    write_times = []
+    start = time.perf_counter()
+    for i in range(count):
+        template = setup[i] if i < len(setup) else frame[(i - len(setup)) % len(frame)]
+        line = template.format((time.perf_counter() - start) * 1000).encode('utf-8')
+        before = time.perf_counter()
+        os.write(2, line)
+        write_times.append(time.perf_counter() - before)
+    total = time.perf_counter() - start
+    write_times.sort()
+    stalls = [t for t in write_times if t > stall_threshold]
+    with open(report_path, 'w') as f:
+        json.dump({
+            'lines': count,
+            'total_seconds': total,
+            'lines_per_second': count / total,
+            'max_stall_ms': write_times[-1] * 1000,
+            'p99_write_ms': write_times[int(len(write_times) * 0.99)] * 1000,
+            'stall_count': len(stalls),
+            'stalled_ms': sum(stalls) * 1000,
+        }, f)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+'''
+Generates large, realistic WAYLAND_DEBUG=1 logs for benchmarking
+Message signatures come from the loaded protocols, so argument formatting matches what libwayland prints
+'''
+import sys
+import random
+import argparse
+from typing import Any, Dict, IO, List, Optional
+
+from core.output import Output, stream
+from core.wl import protocol
+
+# First ID of objects created by the server
+server_id_base = 0xff000000
+
+class Options:
+    '''
+    messages: roughly how many lines to generate
+    connections: number of simultaneous client connections
+    churn: relative frequency of surfaces being created and destroyed
+    motion: relative frequency of pointer motion storms
+    server_ids: relative frequency of server created data offers
+    comma: if to use commas as the decimal separator (like some locales do)
+    seed: seed for the random number generator, the same seed always generates the same log
+    '''
+    def __init__(
+        self,
+        messages: int = 100000,
+        connections: int = 1,
+        churn: float = 1.0,
+        motion: float = 2.0,
+        server_ids: float = 0.5,
+        comma: bool = False,
+        seed: int = 0,
+    ) -> None:
+        self.messages = messages
+        self.connections = connections
+        self.churn = churn
+        self.motion = motion
+        self.server_ids = server_ids
+        self.comma = comma
+        self.seed = seed
+
+class _Log:
+    '''Lines written so far, and the current time all connections share'''
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+        self.time = 1000000.0 # In milliseconds, like libwayland
+
+class _Connection:
+    '''The state of one simulated client, which writes lines for the messages it sends and receives'''
+    def __init__(self, name: Optional[str], rng: random.Random, options: Options, log: _Log) -> None:
+        self.name = name
+        self.rng = rng
+        self.options = options
+        self.log = log
+        self.objects: Dict[int, str] = {1: 'wl_display'}
+        self.free_ids: List[int] = []
+        self.next_id = 2
+        self.next_server_id = server_id_base
+        self.surfaces: List[int] = []
+        self.offers: List[int] = []
+        self.pointer = 0
+        self.data_device = 0
+        self.compositor = 0
+
+    def _number(self, value: float, fmt: str = '{:f}') -> str:
+        text = fmt.format(value)
+        return text.replace('.', ',') if self.options.comma else text
+
+    def _new_id(self, server: bool) -> int:
+        if server:
+            self.next_server_id += 1
+            return self.next_server_id - 1
+        if self.free_ids:
+            return self.free_ids.pop()
+        self.next_id += 1
+        return self.next_id - 1
+
+    def _random_object(self, interface: Optional[str]) -> Optional[int]:
+        choices = [obj_id for obj_id, obj_type in self.objects.items() if interface is None or obj_type == interface]
+        return self.rng.choice(choices) if choices else None
+
+    def _format_arg(self, arg: protocol.Arg, value: Any, sent: bool) -> str:
+        '''value of None means make something up based on the argument type'''
+        if arg.type == 'int':
+            return str(value if value is not None else self.rng.randint(-100, 5000))
+        elif arg.type == 'uint':
+            return str(value if value is not None else self.rng.randint(0, 5000))
+        elif arg.type == 'fixed':
+            return self._number(value if value is not None else self.rng.randint(0, 256000) / 256)
+        elif arg.type == 'string':
+            return '"' + (value if value is not None else 'x' * self.rng.randint(1, 12)) + '"'
+        elif arg.type == 'object':
+            if value is None:
+                value = self._random_object(arg.interface)
+            if not value:
+                return 'nil'
+            return self.objects[value] + '@' + str(value)
+        elif arg.type == 'new_id':
+            interface, new_id = value if isinstance(value, tuple) else (arg.interface, value)
+            if new_id is None:
+                new_id = self._new_id(not sent)
+            self.objects[new_id] = interface
+            if arg.interface is None:
+                return 'new id [unknown]@' + str(new_id)
+            return 'new id ' + interface + '@' + str(new_id)
+        elif arg.type == 'fd':
+            return 'fd ' + str(value if value is not None else self.rng.randint(3, 40))
+        elif arg.type == 'array':
+            return 'array'
+        else:
+            raise RuntimeError('Invalid argument type ' + repr(arg.type))
+
+    def message(self, sent: bool, obj_id: int, name: str, *values: Any) -> None:
+        '''Write a line for a message, missing trailing values are made up'''
+        interface = self.objects[obj_id]
+        message = protocol.interfaces[interface].messages[name]
+        assert message.is_event != sent
+        args = []
+        for i, arg in enumerate(message.args.values()):
+            value = values[i] if i < len(values) else None
+            if arg.type == 'new_id' and arg.interface is None:
+                # Untyped new IDs are printed as interface name, version and ID
+                assert isinstance(value, tuple)
+                new_interface, version, new_id = value
+                args.append('"' + new_interface + '"')
+                args.append(str(version))
+                value = (new_interface, new_id)
+            args.append(self._format_arg(arg, value, sent))
+        self.log.time += self.rng.uniform(0.005, 0.5)
+        self.log.lines.append(
+            '[' + self._number(self.log.time, '{:10.3f}') + ']' +
+            (' <' + self.name + '>' if self.name else '') +
+            ('  -> ' if sent else ' ') +
+            interface + '@' + str(obj_id) + '.' + name + '(' + ', '.join(args) + ')')
+
+    def destroyed(self, obj_id: int) -> None:
+        '''Forget an object, and send delete_id if it's client created'''
+        del self.objects[obj_id]
+        if obj_id < server_id_base:
+            self.message(False, 1, 'delete_id', obj_id)
+            self.free_ids.append(obj_id)
+
+    def bind(self, registry: int, name: int, interface: str) -> int:
+        version = protocol.interfaces[interface].version
+        self.message(False, registry, 'global', name, interface, version)
+        obj_id = self._new_id(False)
+        self.message(True, registry, 'bind', name, (interface, version, obj_id))
+        return obj_id
+
+    def setup(self) -> None:
+        registry = self._new_id(False)
+        self.message(True, 1, 'get_registry', registry)
+        self.compositor = self.bind(registry, 1, 'wl_compositor')
+        seat = self.bind(registry, 2, 'wl_seat')
+        self.bind(registry, 3, 'wl_shm')
+        manager = self.bind(registry, 4, 'wl_data_device_manager')
+        self.message(False, seat, 'capabilities', 3)
+        self.pointer = self._new_id(False)
+        self.message(True, seat, 'get_pointer', self.pointer)
+        self.data_device = self._new_id(False)
+        self.message(True, manager, 'get_data_device', self.data_device, seat)
+        self.create_surface()
+
+    def create_surface(self) -> None:
+        surface = self._new_id(False)
+        self.message(True, self.compositor, 'create_surface', surface)
+        self.surfaces.append(surface)
+
+    def destroy_surface(self) -> None:
+        surface = self.surfaces.pop(self.rng.randrange(len(self.surfaces)))
+        self.message(True, surface, 'destroy')
+        self.destroyed(surface)
+
+    def frame(self) -> None:
+        surface = self.rng.choice(self.surfaces)
+        self.message(True, surface, 'attach', 0, 0, 0)
+        self.message(True, surface, 'damage_buffer', 0, 0, 2147483647, 2147483647)
+        callback = self._new_id(False)
+        self.message(True, surface, 'frame', callback)
+        self.message(True, surface, 'commit')
+        self.message(False, callback, 'done')
+        self.destroyed(callback)
+
+    def motion_storm(self) -> None:
+        surface = self.rng.choice(self.surfaces)
+        self.message(False, self.pointer, 'enter', None, surface)
+        for _ in range(self.rng.randint(10, 100)):
+            self.message(False, self.pointer, 'motion')
+            self.message(False, self.pointer, 'frame')
+        self.message(False, self.pointer, 'leave', None, surface)
+
+    def data_offer(self) -> None:
+        offer = self._new_id(True)
+        self.message(False, self.data_device, 'data_offer', offer)
+        for mime_type in ('text/plain', 'text/plain;charset=utf-8', 'UTF8_STRING'):
+            self.message(False, offer, 'offer', mime_type)
+        self.message(False, self.data_device, 'selection', offer)
+        self.offers.append(offer)
+        if len(self.offers) > 1:
+            old = self.offers.pop(0)
+            self.message(True, old, 'destroy')
+            self.destroyed(old)
+
+    def step(self) -> None:
+        '''Do one random thing'''
+        options = self.options
+        actions = [
+            (self.frame, 4.0),
+            (self.motion_storm, options.motion),
+            (self.data_offer, options.server_ids),
+            (self.create_surface, options.churn),
+            (self.destroy_surface, options.churn if len(self.surfaces) > 1 else 0.0),
+        ]
+        action = self.rng.choices([a for a, _ in actions], [w for _, w in actions])[0]
+        action()
+
+def generate(options: Options) -> List[str]:
+    '''Returns the lines of a log (without newlines), protocols must already be loaded'''
+    rng = random.Random(options.seed)
+    log = _Log()
+    connections = []
+    for i in range(options.connections):
+        name = 'conn' + str(i) if options.connections > 1 else None
+        connection = _Connection(name, rng, options, log)
+        connection.setup()
+        connections.append(connection)
+    while len(log.lines) < options.messages:
+        rng.choice(connections).step()
+    return log.lines
+
+def write(options: Options, output_file: IO[str]) -> None:
+    for line in generate(options):
+        output_file.write(line + '\n')
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('output', type=str, help='file to write the log to, or - for stdout')
+    parser.add_argument('--messages', type=int, default=100000, help='roughly how many messages to generate')
+    parser.add_argument('--connections', type=int, default=1, help='number of client connections')
+    parser.add_argument('--churn', type=float, default=1.0, help='relative frequency of surfaces being created and destroyed')
+    parser.add_argument('--motion', type=float, default=2.0, help='relative frequency of pointer motion storms')
+    parser.add_argument('--server-ids', type=float, default=0.5, help='relative frequency of server created data offers')
+    parser.add_argument('--comma', action='store_true', help='use commas as the decimal separator')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    args = parser.parse_args()
+    protocol.load_all(Output(False, False, stream.Null(), stream.Std(sys.stderr)))
+    options = Options(args.messages, args.connections, args.churn, args.motion, args.server_ids, args.comma, args.seed)
+    if args.output == '-':
+        write(options, sys.stdout)
+    else:
+        with open(args.output, 'w') as f:
+            write(options, f)
+
+if __name__ == '__main__':
+    main()
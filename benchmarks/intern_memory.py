@@ -0,0 +1,78 @@
+'''
+Measures how much memory interning object type and message names saves on a generated capture
+The capture is parsed into a connection manager (so every message is kept, like the TUI does) and the retained memory
+is measured with tracemalloc. Then each message name and object type is replaced with a private copy, which is what the
+parser kept before names were interned, and the extra memory is measured. The result is written as a JSON report.
+'''
+import sys
+import json
+import tracemalloc
+import argparse
+from typing import Any, Dict, List
+
+from core import ConnectionManager
+from core.output import Output, stream
+from core.wl import protocol
+from backends.libwayland_debug_output import parse
+from . import generate_log
+
+report_version = 1
+
+def _copy(text: str) -> str:
+    '''Returns an equal string that is not the same object'''
+    return (text + ' ')[:-1]
+
+def _distinct_objects(values: List[str]) -> int:
+    return len({id(value) for value in values})
+
+def run(lines: List[str]) -> Dict[str, Any]:
+    '''Parse the lines and return the memory report, protocols must already be loaded'''
+    manager = ConnectionManager()
+    tracemalloc.start()
+    parser = parse.Parser(Output(False, False, stream.Null(), stream.ErrorRaising()), manager)
+    for line in lines:
+        parser.handle_message(*parse.message(line))
+    parser.cleanup()
+    interned_bytes, _ = tracemalloc.get_traced_memory()
+    messages = [message for connection in manager.connections() for message in connection.messages()]
+    objects = list({id(obj): obj for message in messages for obj in message.used_objects()}.values())
+    names = [message.name for message in messages] + [obj.type for obj in objects if obj.type is not None]
+    distinct_before = _distinct_objects(names)
+    before_copy, _ = tracemalloc.get_traced_memory()
+    for message in messages:
+        message.name = _copy(message.name)
+    for obj in objects:
+        if obj.type is not None:
+            obj.type = _copy(obj.type)
+    after_copy, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    saved = after_copy - before_copy
+    return {
+        'version': report_version,
+        'messages': len(messages),
+        'objects': len(objects),
+        'names': {
+            'references': len(names),
+            'distinct_values': len(set(names)),
+            'distinct_objects': distinct_before,
+        },
+        'retained_bytes': interned_bytes,
+        'saved_bytes': saved,
+        'saved_bytes_per_message': saved / len(messages) if messages else None,
+        'saved_fraction': saved / (interned_bytes + saved) if interned_bytes + saved else None,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=200000, help='size of the generated capture')
+    parser.add_argument('--connections', type=int, default=2, help='connections in the generated capture')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for the generated capture')
+    args = parser.parse_args()
+    protocol.load_all(Output(False, False, stream.Null(), stream.Std(sys.stderr)))
+    options = generate_log.Options(messages=args.messages, connections=args.connections, seed=args.seed)
+    report = run(generate_log.generate(options))
+    report['generated'] = vars(options)
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
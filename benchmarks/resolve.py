@@ -0,0 +1,56 @@
+'''
+Measures how fast messages are resolved on a motion-heavy generated log
+Messages are parsed up front, then resolved into connections several times, and the best run is reported as JSON
+'''
+import sys
+import time
+import json
+import argparse
+from typing import Any, Dict, List, Tuple
+
+from core import ConnectionManager
+from core.output import Output, stream
+from core.wl import protocol, Message
+from backends.libwayland_debug_output import parse
+from . import generate_log
+
+report_version = 1
+
+def _resolve_once(lines: List[str]) -> float:
+    '''Parse the lines (untimed) and return how many seconds resolving them took'''
+    parsed: List[Tuple[str, Message]] = [parse.message(line) for line in lines]
+    parser = parse.Parser(Output(False, False, stream.Null(), stream.ErrorRaising()), ConnectionManager())
+    start = time.perf_counter()
+    for conn_id, message in parsed:
+        parser.handle_message(conn_id, message)
+    seconds = time.perf_counter() - start
+    parser.cleanup()
+    return seconds
+
+def run(lines: List[str], repeat: int) -> Dict[str, Any]:
+    '''Returns the report, protocols must already be loaded'''
+    times = [_resolve_once(lines) for _ in range(repeat)]
+    best = min(times)
+    return {
+        'version': report_version,
+        'messages': len(lines),
+        'runs': times,
+        'best_seconds': best,
+        'messages_per_second': len(lines) / best if best else None,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=100000, help='size of the generated log')
+    parser.add_argument('--motion', type=float, default=8.0, help='relative frequency of pointer motion storms')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for the generated log')
+    parser.add_argument('--repeat', type=int, default=3, help='how many times to resolve the log')
+    args = parser.parse_args()
+    protocol.load_all(Output(False, False, stream.Null(), stream.Std(sys.stderr)))
+    options = generate_log.Options(messages=args.messages, motion=args.motion, seed=args.seed)
+    report = run(generate_log.generate(options), args.repeat)
+    report['generated'] = vars(options)
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
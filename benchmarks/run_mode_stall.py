@@ -0,0 +1,44 @@
+'''
+Measures how long a chatty program is blocked on its WAYLAND_DEBUG output while run under wayland-debug
+The program is benchmarks/emitter.py, which times each of its writes to stderr
+'''
+import sys
+import os
+import json
+import tempfile
+import argparse
+
+from core import ConnectionManager
+from core.wl import protocol
+from core.output import stream, Output
+from frontends.tui import Controller, parse_args
+from backends.libwayland_debug_output import run_program
+
+def run(line_count: int, backpressure: str, queue_size: int) -> dict:
+    '''Returns the emitter's report'''
+    emitter_path = os.path.join(os.path.dirname(__file__), 'emitter.py')
+    with tempfile.TemporaryDirectory() as tmp:
+        report_path = os.path.join(tmp, 'report.json')
+        args = parse_args([
+            'wayland-debug', '-C', '--backpressure', backpressure, '--queue-size', str(queue_size),
+            '-r', sys.executable, emitter_path, str(line_count), report_path])
+        output = Output(False, False, stream.Null(), stream.Null())
+        protocol.load_all(output)
+        connection_list = ConnectionManager()
+        controller = Controller(output, connection_list, args.filter_matcher, args.stop_matcher)
+        run_program(output, args, connection_list, controller, controller, lambda prompt: 'q')
+        with open(report_path) as f:
+            return json.load(f)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lines', type=int, default=100000, help='number of lines the emitter writes')
+    parser.add_argument('--backpressure', type=str, default='block', help='backpressure policy to run with')
+    parser.add_argument('--queue-size', type=int, default=10000, help='size of the parsed message queue')
+    args = parser.parse_args()
+    report = run(args.lines, args.backpressure, args.queue_size)
+    for key, value in report.items():
+        print(key + ': ' + (('%.3f' % value) if isinstance(value, float) else str(value)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+'''
+Measures the throughput and peak memory of each stage wayland-debug puts messages through, and writes a JSON report
+Stages are parse (text to messages), resolve (messages to connections with object tracking), match (running filters)
+and render (messages to text). Each stage is run once for timing, and again with tracemalloc for memory.
+'''
+import sys
+import os
+import time
+import json
+import platform
+import tempfile
+import tracemalloc
+import argparse
+from typing import Any, Callable, Dict, List, Tuple
+
+from core import ConnectionManager, matcher
+from core.output import Output, stream
+from core.wl import protocol, Message
+from backends.libwayland_debug_output import parse
+from . import generate_log
+
+report_version = 1
+
+# Filters that exercise different parts of the matcher
+matchers = [
+    'wl_surface',
+    'wl_pointer.motion',
+    'xdg_*, wl_data_*',
+    '.commit ! 9',
+    '*(surface_x=)',
+    '.destroyed',
+]
+
+class _Stages:
+    '''Runs the stages in order, each one using the result of the previous'''
+    def __init__(self, lines: List[str]) -> None:
+        self.lines = lines
+        self.parsed: List[Tuple[str, Message]] = []
+        self.matchers = [matcher.parse(m).simplify() for m in matchers]
+
+    def parse(self) -> None:
+        self.parsed = [parse.message(line) for line in self.lines]
+
+    def resolve(self) -> None:
+        parser = parse.Parser(Output(False, False, stream.Null(), stream.ErrorRaising()), ConnectionManager())
+        for conn_id, message in self.parsed:
+            parser.handle_message(conn_id, message)
+        parser.cleanup()
+
+    def match(self) -> None:
+        for m in self.matchers:
+            for _, message in self.parsed:
+                m.matches(message)
+
+    def render(self) -> None:
+        for _, message in self.parsed:
+            str(message)
+
+def _run(lines: List[str]) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    stages = _Stages(lines)
+    items = {
+        'parse': len(lines),
+        'resolve': len(lines),
+        'match': len(lines) * len(matchers),
+        'render': len(lines),
+    }
+    steps: List[Tuple[str, Callable[[], None]]] = [
+        ('parse', stages.parse),
+        ('resolve', stages.resolve),
+        ('match', stages.match),
+        ('render', stages.render),
+    ]
+    for name, step in steps:
+        start = time.perf_counter()
+        step()
+        seconds = time.perf_counter() - start
+        results[name] = {
+            'seconds': seconds,
+            'items': items[name],
+            'items_per_second': items[name] / seconds if seconds else None,
+        }
+    stages = _Stages(lines)
+    for name, step in [(name, getattr(stages, name)) for name, _ in steps]:
+        tracemalloc.start()
+        step()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name]['peak_bytes'] = peak
+    return results
+
+def run(log_path: str) -> Dict[str, Any]:
+    '''Benchmark the given log, returns the report, protocols must already be loaded'''
+    with open(log_path) as f:
+        lines = f.read().splitlines()
+    return {
+        'version': report_version,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'log': {
+            'path': log_path,
+            'bytes': os.path.getsize(log_path),
+            'lines': len(lines),
+        },
+        'stages': _run(lines),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--log', type=str, help='log to benchmark (if not given one is generated)')
+    parser.add_argument('--messages', type=int, default=100000, help='size of the generated log')
+    parser.add_argument('--connections', type=int, default=2, help='connections in the generated log')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for the generated log')
+    parser.add_argument('-o', '--output', type=str, help='file to write the JSON report to (default stdout)')
+    args = parser.parse_args()
+    protocol.load_all(Output(False, False, stream.Null(), stream.Std(sys.stderr)))
+    if args.log:
+        report = run(args.log)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            log_path = os.path.join(tmp, 'generated.log')
+            options = generate_log.Options(messages=args.messages, connections=args.connections, seed=args.seed)
+            with open(log_path, 'w') as f:
+                generate_log.write(options, f)
+            report = run(log_path)
+            report['log']['path'] = None
+            report['log']['generated'] = vars(options)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+if __name__ == '__main__':
+    main()
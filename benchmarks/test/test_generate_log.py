@@ -0,0 +1,62 @@
+import unittest
+import os
+import tempfile
+from unittest import mock
+
+import interfaces
+from core import output, ConnectionManager
+from core.wl import protocol
+from backends.libwayland_debug_output import parse
+from benchmarks import generate_log, stages
+
+class TestGenerateLog(unittest.TestCase):
+    def setUp(self):
+        protocol.load_all(output.Strict())
+
+    def tearDown(self):
+        protocol.dump_all()
+
+    def parse_lines(self, lines):
+        out = mock.Mock(spec=output.Output)
+        manager = ConnectionManager()
+        parser = parse.Parser(out, manager)
+        for line in lines:
+            parser.parse_line(line)
+        parser.cleanup()
+        out.unprocessed.assert_not_called()
+        out.error.assert_not_called()
+        return manager
+
+    def test_generated_log_parses_and_resolves(self):
+        lines = generate_log.generate(generate_log.Options(messages=3000, connections=3))
+        self.assertGreaterEqual(len(lines), 3000)
+        manager = self.parse_lines(lines)
+        self.assertEqual(len(manager.connections()), 3)
+        for connection in manager.connections():
+            for message in connection.messages():
+                for obj in (message.obj,) + message.used_objects():
+                    self.assertTrue(obj.resolved(), str(message))
+
+    def test_comma_numbers(self):
+        lines = generate_log.generate(generate_log.Options(messages=1000, motion=10.0, comma=True))
+        self.assertIn(',', lines[0].split(']')[0])
+        self.parse_lines(lines)
+
+    def test_has_server_ids(self):
+        lines = generate_log.generate(generate_log.Options(messages=2000, server_ids=5.0))
+        self.assertTrue(any(str(generate_log.server_id_base) in line for line in lines))
+
+    def test_same_seed_same_log(self):
+        options = generate_log.Options(messages=500, seed=7)
+        self.assertEqual(generate_log.generate(options), generate_log.generate(options))
+
+    def test_stage_report(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'test.log')
+            with open(path, 'w') as f:
+                generate_log.write(generate_log.Options(messages=200), f)
+            report = stages.run(path)
+        self.assertEqual(set(report['stages']), {'parse', 'resolve', 'match', 'render'})
+        for stage in report['stages'].values():
+            self.assertGreater(stage['items'], 0)
+            self.assertIn('peak_bytes', stage)
@@ -0,0 +1,21 @@
+import unittest
+
+from core import output
+from core.wl import protocol
+from benchmarks import wildcard
+
+class TestWildcard(unittest.TestCase):
+    def setUp(self):
+        protocol.load_all(output.Strict())
+
+    def tearDown(self):
+        protocol.dump_all()
+
+    def test_report(self):
+        report = wildcard.run(wildcard.names(), 1)
+        self.assertEqual(set(report['patterns']), set(wildcard.patterns))
+        self.assertGreater(report['patterns']['wl_*']['matches'], 0)
+        for result in list(report['patterns'].values()) + [report['build']]:
+            for key, value in result.items():
+                if key.endswith('_ns'):
+                    self.assertGreater(value, 0)
@@ -0,0 +1,72 @@
+'''
+Measures wildcard matching with the wildcard patterns used in the matcher tests
+Each pattern is checked against every interface and message name of the loaded protocols, once with the specialised
+checks WildcardMatcher uses now and once with a compiled regex and findall() like it used before. Building a matcher
+is also timed, since str_matcher() used to compile a regex every time it was called. Results are nanoseconds per call,
+written as JSON.
+'''
+import re
+import sys
+import json
+import timeit
+import argparse
+import collections
+from typing import Any, Callable, Dict, List
+
+from core.matcher import str_matcher
+from core.output import Output, stream
+from core.wl import protocol
+
+# Wildcard patterns from core/test/test_matcher.py, core/test/test_object_store.py and core/test/test_connection_impl.py
+patterns = ('foo*', 'wl_*', 'set_*', '*OO', 'xdg_*', 'wl_*surface', 'wl*disp*', '*_surface', '*surf*')
+
+class _FindallMatcher:
+    '''How wildcards were matched before they were specialised'''
+    def __init__(self, pattern: str) -> None:
+        self.regex = re.compile(r'^' + re.escape(pattern).replace(r'\*', '.*') + r'$')
+
+    def matches(self, text: str) -> bool:
+        return len(self.regex.findall(text)) > 0
+
+def names() -> List[str]:
+    '''Every interface and message name, protocols must already be loaded'''
+    result = []
+    for interface in protocol.interfaces.values():
+        result.append(interface.name)
+        result.extend(interface.messages)
+    return result
+
+def _time(func: Callable[[Any], Any], args: List[Any]) -> float:
+    '''Returns the best nanoseconds per call of func over args in several runs'''
+    runs = timeit.repeat(lambda: collections.deque(map(func, args), maxlen=0), number=1, repeat=5)
+    return min(runs) / len(args) * 1e9
+
+def run(texts: List[str], repeat: int) -> Dict[str, Any]:
+    '''repeat: how many times each pattern is checked against all of texts in a timing run'''
+    results: Dict[str, Any] = {'texts': len(texts), 'patterns': {}}
+    repeated = texts * repeat
+    for pattern in patterns:
+        specialised = str_matcher(pattern).matches
+        findall = _FindallMatcher(pattern).matches
+        assert all(specialised(text) == findall(text) for text in texts), pattern
+        results['patterns'][pattern] = {
+            'matches': sum(1 for text in texts if specialised(text)),
+            'specialised_ns': _time(specialised, repeated),
+            'findall_ns': _time(findall, repeated),
+        }
+    builds = list(patterns) * repeat
+    results['build'] = {
+        'cached_ns': _time(str_matcher, builds),
+        'compiled_ns': _time(_FindallMatcher, builds),
+    }
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=20, help='times each pattern is checked against every name per run')
+    args = parser.parse_args()
+    protocol.load_all(Output(False, False, stream.Null(), stream.Std(sys.stderr)))
+    print(json.dumps(run(names(), args.repeat), indent=2))
+
+if __name__ == '__main__':
+    main()
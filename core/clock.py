@@ -0,0 +1,33 @@
+from typing import Optional
+
+# Times are kept as whole microseconds, so they are exact to subtract and compare and fit in 64 bits
+us_per_second = 1000000
+
+def to_seconds(time: int) -> float:
+    '''Only for showing times and turning durations into statistics, everything else stays in microseconds'''
+    return time / us_per_second
+
+def from_seconds(seconds: float) -> int:
+    return round(seconds * us_per_second)
+
+class Clock:
+    '''Turns the timestamps messages and connections arrive with into microseconds since the start of a session
+    Backends use whatever clock they have (log timestamps, time.perf_counter_ns()...) converted to microseconds, so the
+    start is the first time seen unless it has been set before then. Each session has its own clock, so sessions in the
+    same process (such as tests) don't affect each other.
+    '''
+    def __init__(self) -> None:
+        self.start: Optional[int] = None
+
+    def start_at(self, time: int) -> None:
+        '''Make time the start of the session, unless it has already started'''
+        if self.start is None:
+            self.start = time
+
+    def relative(self, time: int) -> int:
+        '''Returns how long after the start of the session time is'''
+        start = self.start
+        if start is None:
+            start = time
+            self.start = time
+        return time - start
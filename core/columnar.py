@@ -0,0 +1,314 @@
+'''
+A columnar copy of message history, so large captures can be searched with NumPy
+Each message becomes a row of integers (its timestamp, codes for its connection, object type and message name, its
+object ID and generation, and if it was sent). The common matchers then turn into comparisons over whole columns
+instead of a Python call per message, only argument matchers are still checked one message at a time. NumPy is
+optional, without it history is searched one message at a time.
+'''
+from array import array
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+from . import wl, matcher
+from .clock import us_per_second
+from .matcher import Matcher
+
+try:
+    import numpy # type: ignore
+except ImportError:
+    numpy = None # type: ignore
+
+# Below this many messages, checking each one is quick enough that building columns is not worth it
+min_rows = 1 << 14
+
+# A boolean NumPy array with an element for each row
+Mask = Any
+
+# What histograms can group messages by
+histogram_keys = ('name', 'type', 'connection', 'second')
+
+# A histogram group, seconds are whole seconds since the start of the session and everything else is a name
+Key = Union[str, int]
+
+def available() -> bool:
+    return numpy is not None
+
+def _label(value: Optional[str]) -> str:
+    return value if value is not None else '???'
+
+def _message_key(by: str) -> Callable[[wl.Message], Key]:
+    if by == 'name':
+        return lambda message: message.name
+    elif by == 'type':
+        return lambda message: _label(message.obj.type)
+    elif by == 'connection':
+        return lambda message: message.obj.connection.name() if message.obj.connection is not None else 'unknown'
+    elif by == 'second':
+        return lambda message: message.timestamp // us_per_second
+    else:
+        raise _unknown_key(by)
+
+def _unknown_key(by: str) -> RuntimeError:
+    return RuntimeError('Can not group messages by "' + by + '", expected one of ' + ', '.join(histogram_keys))
+
+def histogram(messages: Iterable[wl.Message], by: str) -> Dict[Key, int]:
+    '''How many of the messages there are for each key, the same as ColumnarHistory.histogram() without NumPy
+    by: one of histogram_keys
+    Raises: RuntimeError if by is not a known key
+    '''
+    key = _message_key(by)
+    result: Dict[Key, int] = {}
+    for message in messages:
+        group = key(message)
+        result[group] = result.get(group, 0) + 1
+    return result
+
+class _Codes:
+    '''Gives each distinct string a small integer code, the strings are matched once per code instead of once per row'''
+    def __init__(self) -> None:
+        self.codes: Dict[Optional[str], int] = {}
+        self.values: List[Optional[str]] = []
+
+    def code(self, value: Optional[str]) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def lookup(self, predicate: Callable[[Optional[str]], bool]) -> Mask:
+        '''Returns an array that is indexed by code'''
+        return numpy.array([predicate(value) for value in self.values], dtype=bool)
+
+class _Objects:
+    '''Columns that identify an object: its type code, ID and generation (0 if it doesn't have one, like matchers)'''
+    def __init__(self) -> None:
+        self.types = array('i')
+        self.ids = array('q')
+        self.generations = array('q')
+
+    def append(self, types: _Codes, obj: Optional[wl.ObjectBase]) -> None:
+        if obj is None:
+            self.types.append(types.code(None))
+            self.ids.append(0)
+            self.generations.append(0)
+        else:
+            self.types.append(types.code(obj.type))
+            self.ids.append(obj.id)
+            self.generations.append(obj.generation if obj.generation is not None else 0)
+
+class ColumnarHistory:
+    '''Rows for messages in the order they are appended
+    Rows are stored in compact arrays as they are added, NumPy views of them are only made when searching. Rows are a
+    snapshot of each message when it was added, messages are expected to be resolved by then.
+    '''
+    def __init__(self) -> None:
+        assert available(), 'NumPy is needed for columnar history'
+        self.messages: List[wl.Message] = []
+        self.connections = _Codes()
+        self.types = _Codes()
+        self.names = _Codes()
+        self.timestamps = array('q')
+        self.connection_codes = array('i')
+        self.name_codes = array('i')
+        self.sent = array('b')
+        self.objects = _Objects()
+        # The first object each message creates and how many it creates (up to 2), and the object it destroys if any
+        self.new_objects = _Objects()
+        self.new_counts = array('b')
+        self.destroyed_objects = _Objects()
+        self.destroys = array('b')
+        # NumPy views of the arrays by ID, arrays can't grow while they have views so they are dropped when rows are added
+        self._views: Dict[int, Mask] = {}
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def append(self, messages: List[wl.Message]) -> None:
+        self._views = {}
+        connections = self.connections
+        types = self.types
+        names = self.names
+        for message in messages:
+            conn = message.obj.connection
+            self.timestamps.append(message.timestamp)
+            self.connection_codes.append(connections.code(conn.name() if conn is not None else 'unknown'))
+            self.name_codes.append(names.code(message.name))
+            self.sent.append(message.sent)
+            self.objects.append(types, message.obj)
+            new_objects = [arg.obj for arg in message.args if isinstance(arg, wl.Arg.Object) and arg.is_new]
+            self.new_objects.append(types, new_objects[0] if new_objects else None)
+            self.new_counts.append(min(len(new_objects), 2))
+            self.destroyed_objects.append(types, message.destroyed_obj)
+            self.destroys.append(message.destroyed_obj is not None)
+        self.messages.extend(messages)
+
+    def update(self, messages: List[wl.Message]) -> None:
+        '''Append the messages that have been added to the end of messages since the last update'''
+        if len(messages) > len(self.messages):
+            self.append(messages[len(self.messages):])
+
+    def _column(self, column: array) -> Mask:
+        view = self._views.get(id(column))
+        if view is None:
+            view = numpy.frombuffer(column, dtype=column.typecode) if len(column) else numpy.zeros(0, column.typecode)
+            self._views[id(column)] = view
+        return view
+
+    def histogram(self, mask: Mask, by: str) -> Dict[Key, int]:
+        '''How many of the masked rows there are for each key, without looking at the messages themselves
+        by: one of histogram_keys
+        Raises: RuntimeError if by is not a known key
+        '''
+        if by == 'second':
+            seconds, counts = numpy.unique(self._column(self.timestamps)[mask] // us_per_second, return_counts=True)
+            return dict(zip(seconds.tolist(), counts.tolist()))
+        elif by == 'name':
+            codes, column = self.names, self.name_codes
+        elif by == 'type':
+            codes, column = self.types, self.objects.types
+        elif by == 'connection':
+            codes, column = self.connections, self.connection_codes
+        else:
+            raise _unknown_key(by)
+        counts = numpy.bincount(self._column(column)[mask], minlength=len(codes.values))
+        result: Dict[Key, int] = {}
+        for code in numpy.flatnonzero(counts).tolist():
+            label = _label(codes.values[code])
+            result[label] = result.get(label, 0) + int(counts[code])
+        return result
+
+    def connection_mask(self, connection_name: str) -> Mask:
+        '''Rows of messages on the connection with the given name'''
+        code = self.connections.codes.get(connection_name)
+        if code is None:
+            return numpy.zeros(len(self), dtype=bool)
+        return self._column(self.connection_codes) == code
+
+    def mask(self, message_matcher: matcher.MessageMatcher, within: Optional[Mask] = None) -> Mask:
+        '''Returns which rows match, the same as calling message_matcher.matches() on each message
+        within: if given, only these rows can match (and only these are checked one at a time when needed)
+        '''
+        if within is None:
+            within = self._const(True)
+        result = self._message_mask(message_matcher, within)
+        if result is None:
+            result = self._check_each(within, message_matcher.matches)
+        return result & within
+
+    def _check_each(self, rows: Mask, predicate: Callable[[wl.Message], bool]) -> Mask:
+        '''Falls back to checking the messages of the given rows one at a time'''
+        result = numpy.zeros(len(self), dtype=bool)
+        messages = self.messages
+        for i in numpy.flatnonzero(rows):
+            if predicate(messages[i]):
+                result[i] = True
+        return result
+
+    def _const(self, value: bool) -> Mask:
+        return numpy.full(len(self), value, dtype=bool)
+
+    def _message_mask(self, message_matcher: Matcher[wl.Message], within: Mask) -> Optional[Mask]:
+        '''Returns None if the matcher can't be turned into a mask'''
+        if isinstance(message_matcher, matcher.AlwaysMatcher):
+            return self._const(message_matcher.result)
+        elif isinstance(message_matcher, matcher.MatcherList):
+            return self._list_mask(message_matcher, self._message_mask, within)
+        elif isinstance(message_matcher, matcher.MessagePattern):
+            return self._pattern_mask(message_matcher, within)
+        else:
+            return None
+
+    def _list_mask(
+        self,
+        matcher_list: matcher.MatcherList,
+        sub_mask: Callable[[Any, Mask], Optional[Mask]],
+        within: Mask
+    ) -> Optional[Mask]:
+        result = self._const(False)
+        for positive in matcher_list.positive:
+            # Rows that already match don't need to be checked again
+            mask = sub_mask(positive, within & ~result)
+            if mask is None:
+                return None
+            result |= mask
+        for negative in matcher_list.negative:
+            mask = sub_mask(negative, result)
+            if mask is None:
+                return None
+            result &= ~mask
+        return result
+
+    def _pattern_mask(self, pattern: matcher.MessagePattern, within: Mask) -> Optional[Mask]:
+        conn = self._conn_mask(pattern.conn_matcher)
+        obj = self._obj_mask(pattern.obj_matcher, self.objects)
+        if conn is None or obj is None:
+            return None
+        conn &= within
+        names = self.names.lookup(lambda name: name is not None and pattern.name_matcher.matches(name))
+        result = conn & obj & names[self._column(self.name_codes)]
+        if pattern.args_matcher.always() is not True:
+            args_matches = pattern.args_matcher.matches
+            result = self._check_each(result, lambda message: args_matches(message.args))
+        if pattern.match_new:
+            new = self._obj_mask(pattern.obj_matcher, self.new_objects)
+            if new is None:
+                return None
+            counts = self._column(self.new_counts)
+            result |= conn & new & (counts == 1)
+            # Messages that create several objects are rare, and only the first is in the columns
+            several = conn & (counts > 1) & ~result
+            if several.any():
+                obj_matches = pattern.obj_matcher.matches
+                result |= self._check_each(several, lambda message: any(
+                    isinstance(arg, wl.Arg.Object) and arg.is_new and obj_matches(arg.obj) for arg in message.args))
+        if pattern.match_destroyed:
+            destroyed = self._obj_mask(pattern.obj_matcher, self.destroyed_objects)
+            if destroyed is None:
+                return None
+            result |= conn & destroyed & (self._column(self.destroys) != 0)
+        return result
+
+    def _conn_mask(self, conn_matcher: Matcher[Any]) -> Optional[Mask]:
+        if isinstance(conn_matcher, matcher.AlwaysMatcher):
+            return self._const(conn_matcher.result)
+        elif isinstance(conn_matcher, matcher.ConnectionMatcher):
+            wrapped = conn_matcher.wrapped
+            names = self.connections.lookup(lambda name: name is not None and wrapped.matches(name))
+            return names[self._column(self.connection_codes)]
+        else:
+            return None
+
+    def _obj_mask(self, obj_matcher: Matcher[wl.ObjectBase], objects: _Objects) -> Optional[Mask]:
+        '''objects: which object columns to match against'''
+        if isinstance(obj_matcher, matcher.AlwaysMatcher):
+            return self._const(obj_matcher.result)
+        elif isinstance(obj_matcher, matcher.MatcherList):
+            return self._list_mask(obj_matcher, lambda sub, within: self._obj_mask(sub, objects), self._const(True))
+        elif isinstance(obj_matcher, matcher.ObjectNameMatcher):
+            wrapped = obj_matcher.wrapped
+            types = self.types.lookup(lambda type_name: type_name is not None and wrapped.matches(type_name))
+            return types[self._column(objects.types)]
+        elif isinstance(obj_matcher, matcher.ObjectIdMatcher):
+            id_matcher = obj_matcher.wrapped
+            if isinstance(id_matcher, matcher.AlwaysMatcher):
+                return self._const(id_matcher.result)
+            elif isinstance(id_matcher, matcher.PairMatcher):
+                return (
+                    _int_mask(id_matcher.a, self._column(objects.ids)) &
+                    _int_mask(id_matcher.b, self._column(objects.generations)))
+        return None
+
+def _int_mask(int_matcher: Matcher[int], column: Mask) -> Mask:
+    if isinstance(int_matcher, matcher.AlwaysMatcher):
+        return numpy.full(len(column), int_matcher.result, dtype=bool)
+    elif isinstance(int_matcher, matcher.EqMatcher):
+        return column == int_matcher.expected
+    else:
+        # Anything else is checked once for each distinct value
+        values, inverse = numpy.unique(column, return_inverse=True)
+        return numpy.array([int_matcher.matches(int(value)) for value in values], dtype=bool)[inverse]
+
+def rows(mask: Mask) -> List[int]:
+    '''The indices of the rows a mask is true for, in order'''
+    return numpy.flatnonzero(mask).tolist()
@@ -1,19 +1,32 @@
 import logging
-from typing import Optional, List, Tuple
+from typing import Any, Dict, Optional, List, Tuple
 
 from interfaces import Connection
 from .util import *
 from . import wl
-from .matcher import str_matcher
+from .object_store import ObjectStore, type_matches
+from .lifetimes import ObjectLifetimes
 
 logger = logging.getLogger(__name__)
 
+# Requests that can change the name of a connection
+naming_messages = ('set_app_id', 'set_title', 'get_layer_surface')
+
 class ConnectionImpl(Connection.Sink, Connection):
-    def __init__(self, time: float, name: str, is_server: Optional[bool]) -> None:
+    def __init__(
+        self,
+        time: int,
+        name: str,
+        is_server: Optional[bool],
+        keep_history: bool = True,
+        session_lifetimes: Optional[ObjectLifetimes] = None
+    ) -> None:
         '''Create a new connection
-        time: when the connection was created
+        time: when the connection was created, in microseconds since the start of the session
         name: unique name of the connection, often A, B, C etc
         is_server: if we are on the server or client side of the connection (None if unknown)
+        keep_history: if to keep messages and replaced objects, if False listeners still get every message
+        session_lifetimes: counts the objects of all connections, updated along with this connection's
         '''
         self._name = name
         self._is_server = is_server
@@ -21,10 +34,13 @@ class ConnectionImpl(Connection.Sink, Connection):
         self._app_id: Optional[str] = None
         self.open_time = time
         self.open = True
-        # keys are ids, values are arrays of objects in the order they are created
+        self.keep_history = keep_history
         self.message_list: List[wl.Message] = []
-        self.display = wl.ResolvedObject(self, 0.0, None, 1, 0, 'wl_display')
-        self.db = {1: [self.display]}
+        self.display = wl.ResolvedObject(self, 0, None, 1, 0, 'wl_display')
+        self.objects = ObjectStore(keep_history)
+        self.objects.add(self.display)
+        self.lifetimes = ObjectLifetimes(session_lifetimes)
+        self.resolver = wl.Resolver(self)
         self.listener = new_disseminator_of_type(Connection.Listener)
 
     def message(self, message: wl.Message) -> None:
@@ -33,9 +49,86 @@ class ConnectionImpl(Connection.Sink, Connection):
             logger.warning(
                 'Connection ' + self._name + ' (' + str(self) + ')' +
                 ' got message ' + str(message) + ' after it had been closed')
-        self.message_list.append(message)
-        message.resolve(self)
+        if self.keep_history:
+            self.message_list.append(message)
+        self.resolver.resolve(message)
         self.listener.connection_got_new_message(self, message)
+        self._update_name(message)
+
+    def message_batch(self, messages: List[wl.Message]) -> None:
+        '''Overrides method in Connection.Sink'''
+        if not self.open:
+            logger.warning(
+                'Connection ' + self._name + ' (' + str(self) + ')' +
+                ' got ' + str(len(messages)) + ' messages after it had been closed')
+        if self.keep_history:
+            self.message_list.extend(messages)
+        resolved = []
+        errors = []
+        for message in messages:
+            try:
+                self.resolver.resolve(message)
+            except RuntimeError as e:
+                errors.append(str(e))
+            else:
+                resolved.append(message)
+        if resolved:
+            self.listener.connection_got_new_messages(self, resolved)
+        for message in resolved:
+            self._update_name(message)
+        if errors:
+            raise RuntimeError('\n'.join(errors))
+
+    def track(self, message: wl.Message) -> None:
+        '''Overrides method in Connection.Sink'''
+        self.resolver.resolve(message)
+        self._update_name(message)
+
+    def save_state(self) -> Dict[str, Any]:
+        '''Overrides method in Connection.Sink'''
+        objects = []
+        for obj in self.objects.latest.values():
+            if obj is self.display:
+                continue
+            parent = obj.parent if isinstance(obj, wl.ResolvedObject) else None
+            objects.append([
+                obj.id, obj.generation, obj.type, obj.create_time, obj.destroy_time,
+                parent.id if parent else None, parent.generation if parent else None,
+            ])
+        return {
+            'open_time': self.open_time,
+            'close_time': None if self.open else self.close_time,
+            'is_server': self._is_server,
+            'title': self.title,
+            'app_id': self._app_id,
+            'objects': objects,
+            'lifetimes': self.lifetimes.save_state(),
+            'roundtrips': self.resolver.roundtrips.save_state(),
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        '''Overrides method in Connection.Sink'''
+        restored = []
+        for obj_id, generation, type_name, create_time, destroy_time, _, _ in state['objects']:
+            obj = wl.ResolvedObject(self, create_time, None, obj_id, generation, type_name)
+            if destroy_time is not None:
+                obj.destroy_time = destroy_time
+                obj.alive = False
+            self.objects.restore(obj)
+            restored.append(obj)
+        # Parents are found once everything is restored, since they can have higher IDs than their children
+        for obj, (_, _, _, _, _, parent_id, parent_generation) in zip(restored, state['objects']):
+            parent = self.objects.latest.get(parent_id) if parent_id is not None else None
+            if parent is not None and parent.generation == parent_generation:
+                obj.parent = parent
+        self.lifetimes.load_state(state['lifetimes'])
+        self.resolver.roundtrips.load_state(state['roundtrips'], self)
+        if state['app_id']:
+            self._set_app_id(state['app_id'])
+        if state['title']:
+            self._set_title(state['title'])
+
+    def _update_name(self, message: wl.Message) -> None:
         try:
             if message.name == 'set_app_id':
                 assert isinstance(message.args[0], wl.Arg.String)
@@ -51,7 +144,7 @@ class ConnectionImpl(Connection.Sink, Connection):
         except Exception as e: # Connection name is a non-critical feature, so don't be mean if something goes wrong
             logger.error('Could not set connection name: ' + str(e))
 
-    def close(self, time: float) -> None:
+    def close(self, time: int) -> None:
         '''Overrides method in Connection.Sink'''
         self.open = False
         self.close_time = time
@@ -105,12 +198,12 @@ class ConnectionImpl(Connection.Sink, Connection):
         '''Overrides method in Connection'''
         self.listener.remove_listener(listener)
 
-    def create_object(self, time: float, parent: wl.ObjectBase, obj_id: int, type_name: str) -> wl.ObjectBase:
+    def create_object(self, time: int, parent: wl.ObjectBase, obj_id: int, type_name: str) -> wl.ObjectBase:
         '''Overrides method in Connection'''
         if obj_id <= 1:
             raise RuntimeError('Invalid object ID ' + str(obj_id))
-        if obj_id in self.db:
-            last_obj = self.db[obj_id][-1]
+        last_obj = self.objects.latest.get(obj_id)
+        if last_obj is not None:
             if last_obj.alive:
                 if type_name == 'wl_registry' and obj_id == 2:
                     msg = ('It looks like multiple Wayland connections were made, without a way to distinguish between them. '
@@ -124,30 +217,42 @@ class ConnectionImpl(Connection.Sink, Connection):
                     raise RuntimeError(
                         'Tried to create object of type '
                         + str(type_name) + ' with the same id as ' + str(last_obj))
-        else:
-            self.db[obj_id] = []
-        generation = len(self.db[obj_id])
+        generation = self.objects.generations(obj_id)
         obj = wl.ResolvedObject(self, time, parent, obj_id, generation, type_name)
-        self.db[obj_id].append(obj)
+        self.objects.add(obj)
+        self.lifetimes.created(obj)
         return obj
 
     def retrieve_object(self, id: int, generation: int, type_name: Optional[str]) -> wl.ObjectBase:
         '''Overrides method in Connection'''
-        try:
-            obj_list = self.db[id]
-        except KeyError as e:
-            raise RuntimeError('Id ' + str(id) + ' not in object database') from e
-        try:
-            obj = obj_list[generation]
-        except IndexError as e:
-            raise RuntimeError('Invalid generation ' + str(generation) + ' for id ' + str(id)) from e
+        obj = self.objects.get(id, generation)
         if ((type_name is not None) and
             (obj.type is not None) and
-            (not str_matcher(type_name).matches(obj.type))
+            (not type_matches(type_name, obj.type))
         ):
             raise RuntimeError(str(obj) + ' expected to be of type ' + type_name)
         return obj
 
+    def object_destroyed(self, obj: wl.ObjectBase) -> None:
+        '''Overrides method in Connection'''
+        self.lifetimes.destroyed(obj)
+
+    def object_lifetimes(self) -> ObjectLifetimes:
+        '''Overrides method in Connection'''
+        return self.lifetimes
+
+    def roundtrips(self) -> wl.Roundtrips:
+        '''Overrides method in Connection'''
+        return self.resolver.roundtrips
+
+    def resolve_message(self, message: wl.Message) -> None:
+        '''Overrides method in Connection'''
+        self.resolver.resolve(message)
+
+    def live_objects(self, type_pattern: Optional[str]) -> Tuple[wl.ObjectBase, ...]:
+        '''Overrides method in Connection'''
+        return self.objects.live(type_pattern)
+
     def wl_display(self) -> wl.ObjectBase:
         '''Overrides method in Connection'''
         return self.display
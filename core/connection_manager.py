@@ -1,34 +1,51 @@
-from typing import Optional, List, Dict, Tuple
+from typing import Any, Optional, List, Dict, Tuple
 from interfaces import ConnectionIDSink, ConnectionList, Connection
 from .connection_impl import ConnectionImpl
+from .clock import Clock
 from .letter_id_generator import LetterIdGenerator
+from .lifetimes import ObjectLifetimes
 from . import wl
 from .util import new_disseminator_of_type
 
 class ConnectionManager(ConnectionIDSink, ConnectionList):
-    '''The basic implementation of MessageSink and ConnectionList'''
+    '''The basic implementation of MessageSink and ConnectionList
+    Times and message timestamps are made relative to the start of the session by the manager's clock as they come in
+    '''
 
-    def __init__(self) -> None:
+    def __init__(self, keep_history: bool = True) -> None:
+        '''keep_history: if connections keep their messages, see ConnectionImpl'''
+        self.keep_history = keep_history
+        self.clock = Clock()
         self.connection_list: List[ConnectionImpl] = [] # List of all connections (open and closed) in the order they were created
+        self.connection_ids: List[str] = [] # The ID each connection in connection_list was opened with
         self.open_connections: Dict[str, ConnectionImpl] = {} # Maps open connection ids to connection objects
         self.connection_name_generator = LetterIdGenerator()
+        self.lifetimes = ObjectLifetimes()
         self.listener = new_disseminator_of_type(ConnectionList.Listener)
 
-    def open_connection(self, time: float, connection_id: str, is_server: Optional[bool]) -> Connection:
+    def open_connection(self, time: int, connection_id: str, is_server: Optional[bool]) -> Connection:
         '''Overries method in ConnectionIDSink'''
         assert connection_id
-        # TODO: replace the close_connection call with this
+        return self._open(self.clock.relative(time), connection_id, is_server)
+
+    def _open(self, time: int, connection_id: str, is_server: Optional[bool]) -> ConnectionImpl:
+        '''time: microseconds since the start of the session'''
+        # TODO: replace the _close call with this
         # assert connection_id not in self.open_connections
-        self.close_connection(time, connection_id)
+        self._close(time, connection_id)
         name = self.connection_name_generator.next()
-        connection = ConnectionImpl(time, name, is_server)
+        connection = ConnectionImpl(time, name, is_server, self.keep_history, self.lifetimes)
         self.open_connections[connection_id] = connection
         self.connection_list.append(connection)
+        self.connection_ids.append(connection_id)
         self.listener.connection_opened(self, connection)
         return connection
 
-    def close_connection(self, time: float, connection_id: str) -> None:
+    def close_connection(self, time: int, connection_id: str) -> None:
         '''Overries method in ConnectionIDSink'''
+        self._close(self.clock.relative(time), connection_id)
+
+    def _close(self, time: int, connection_id: str) -> None:
         connection = self.open_connections.get(connection_id)
         if connection:
             del self.open_connections[connection_id]
@@ -39,12 +56,64 @@ class ConnectionManager(ConnectionIDSink, ConnectionList):
         '''Overries method in ConnectionIDSink'''
         connection = self.open_connections.get(connection_id)
         assert connection, 'Message sent to connection with ID "' + connection_id + '" which has not been opened'
+        message.timestamp = self.clock.relative(message.timestamp)
         connection.message(message)
 
+    def messages(self, connection_id: str, batch: List[wl.Message]) -> None:
+        '''Overries method in ConnectionIDSink'''
+        connection = self.open_connections.get(connection_id)
+        assert connection, 'Messages sent to connection with ID "' + connection_id + '" which has not been opened'
+        relative = self.clock.relative
+        for message in batch:
+            message.timestamp = relative(message.timestamp)
+        connection.message_batch(batch)
+
+    def track(self, connection_id: str, message: wl.Message) -> None:
+        '''Overries method in ConnectionIDSink'''
+        connection = self.open_connections.get(connection_id)
+        assert connection, 'Message tracked on connection with ID "' + connection_id + '" which has not been opened'
+        message.timestamp = self.clock.relative(message.timestamp)
+        connection.track(message)
+
+    def save_state(self) -> Dict[str, Any]:
+        '''Overries method in ConnectionIDSink'''
+        return {
+            'connections': [
+                dict(connection.save_state(), connection_id=connection_id)
+                for connection_id, connection in zip(self.connection_ids, self.connection_list)],
+            'lifetimes': self.lifetimes.save_state(),
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        '''Overries method in ConnectionIDSink'''
+        for connection_state in state['connections']:
+            # Saved times are already relative to the start of the session
+            connection_id = connection_state['connection_id']
+            self._open(connection_state['open_time'], connection_id, connection_state['is_server']).load_state(connection_state)
+            if connection_state['close_time'] is not None:
+                self._close(connection_state['close_time'], connection_id)
+        if 'lifetimes' in state:
+            self.lifetimes.load_state(state['lifetimes'])
+
+    def set_start_time(self, time: int) -> None:
+        '''Overries method in ConnectionIDSink'''
+        self.clock.start_at(time)
+
+    def namespace(self, prefix: str, offset: int = 0) -> 'NamespacedSink':
+        '''Returns a sink for this manager in which connection IDs are prefixed with prefix
+        Used when messages come from several sources that each have their own connection IDs
+        offset: microseconds added to the times of the source, for sources whose clocks don't agree
+        '''
+        return NamespacedSink(self, prefix, offset)
+
     def connections(self) -> Tuple[Connection, ...]:
         '''Overries method in ConnectionList'''
         return tuple(self.connection_list)
 
+    def object_lifetimes(self) -> ObjectLifetimes:
+        '''Overries method in ConnectionList'''
+        return self.lifetimes
+
     def add_connection_list_listener(self, listener: ConnectionList.Listener, catch_up: bool) -> None:
         '''Overries method in ConnectionList'''
         if catch_up:
@@ -55,3 +124,59 @@ class ConnectionManager(ConnectionIDSink, ConnectionList):
     def remove_connection_list_listener(self, listener: ConnectionList.Listener) -> None:
         '''Overries method from ConnectionList'''
         self.listener.remove_listener(listener)
+
+class NamespacedSink(ConnectionIDSink):
+    '''Passes everything on to a ConnectionManager, with connection IDs prefixed so they are unique to this sink
+    The offset is added to every time and timestamp first
+    '''
+
+    def __init__(self, manager: ConnectionManager, prefix: str, offset: int = 0) -> None:
+        self.manager = manager
+        self.prefix = prefix
+        self.offset = offset
+        self.opened: List[Connection] = [] # Connections opened through this sink, in order
+
+    def open_connection(self, time: int, connection_id: str, is_server: Optional[bool]) -> Connection:
+        '''Overrides method in ConnectionIDSink'''
+        connection = self.manager.open_connection(time + self.offset, self.prefix + connection_id, is_server)
+        self.opened.append(connection)
+        return connection
+
+    def close_connection(self, time: int, connection_id: str) -> None:
+        '''Overrides method in ConnectionIDSink'''
+        self.manager.close_connection(time + self.offset, self.prefix + connection_id)
+
+    def message(self, connection_id: str, message: wl.Message) -> None:
+        '''Overrides method in ConnectionIDSink'''
+        message.timestamp += self.offset
+        self.manager.message(self.prefix + connection_id, message)
+
+    def messages(self, connection_id: str, batch: List[wl.Message]) -> None:
+        '''Overrides method in ConnectionIDSink'''
+        if self.offset:
+            for message in batch:
+                message.timestamp += self.offset
+        self.manager.messages(self.prefix + connection_id, batch)
+
+    def track(self, connection_id: str, message: wl.Message) -> None:
+        '''Overrides method in ConnectionIDSink'''
+        message.timestamp += self.offset
+        self.manager.track(self.prefix + connection_id, message)
+
+    def save_state(self) -> Dict[str, Any]:
+        '''Overrides method in ConnectionIDSink
+        The counts of objects across the whole session are left out, since they include other sinks' connections
+        '''
+        return {'connections': [
+            dict(state, connection_id=state['connection_id'][len(self.prefix):])
+            for state in self.manager.save_state()['connections']
+            if state['connection_id'].startswith(self.prefix)]}
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        '''Overrides method in ConnectionIDSink'''
+        self.manager.load_state({'connections': [
+            dict(i, connection_id=self.prefix + i['connection_id']) for i in state['connections']]})
+
+    def set_start_time(self, time: int) -> None:
+        '''Overrides method in ConnectionIDSink'''
+        self.manager.set_start_time(time + self.offset)
@@ -0,0 +1,85 @@
+import difflib
+from typing import Dict, List, Optional, Tuple
+
+from interfaces import Connection, ConnectionList
+from . import wl
+
+# How many messages from the start of each connection are compared
+signature_length = 64
+
+# How similar the messages of two connections must be for them to be the same connection, from 0 to 1
+min_similarity = 0.8
+
+# A message as seen from the client side: its object, name and if the client sent it
+_Signature = Tuple[Optional[str], int, str, bool]
+
+class Correlator(ConnectionList.Listener, Connection.Listener):
+    '''Finds the client and server sides of the same connection in logs captured separately
+    Both sides see the same messages on the same objects, but what one sends the other receives. The first messages of
+    each connection are kept and compared once loading is done. They are compared as sequences rather than one by one,
+    since requests and events that cross each other can be in a different order on each side.
+    '''
+    def __init__(self) -> None:
+        self.signatures: Dict[Connection, List[_Signature]] = {}
+
+    def connection_opened(self, connection_list: ConnectionList, connection: Connection) -> None:
+        '''Overrides method in ConnectionList.Listener'''
+        self.signatures[connection] = []
+        connection.add_connection_listener(self)
+
+    def connection_str_changed(self, connection: Connection) -> None:
+        '''Overrides method in Connection.Listener'''
+        pass
+
+    def connection_app_id_set(self, connection: Connection, new_app_id: str) -> None:
+        '''Overrides method in Connection.Listener'''
+        pass
+
+    def connection_got_new_message(self, connection: Connection, message: wl.Message) -> None:
+        '''Overrides method in Connection.Listener'''
+        self.connection_got_new_messages(connection, [message])
+
+    def connection_got_new_messages(self, connection: Connection, messages: List[wl.Message]) -> None:
+        '''Overrides method in Connection.Listener'''
+        signature = self.signatures[connection]
+        needed = signature_length - len(signature)
+        if needed <= 0:
+            return
+        # Servers receive what clients send
+        client_sent = not connection.is_server()
+        for message in messages[:needed]:
+            signature.append((message.obj.type, message.obj.id, message.name, message.sent == client_sent))
+
+    def connection_closed(self, connection: Connection) -> None:
+        '''Overrides method in Connection.Listener'''
+        pass
+
+    def similarity(self, a: Connection, b: Connection) -> float:
+        '''How alike the first messages of the two connections are, from 0 to 1'''
+        return difflib.SequenceMatcher(None, self.signatures[a], self.signatures[b], autojunk=False).ratio()
+
+    def matches(self, sources: Dict[Connection, str]) -> List[Tuple[Connection, Connection, float]]:
+        '''Pair up connections from different sources that are the same connection, as (client, server, similarity)
+        sources: which source (such as a log file) each connection came from, connections not in it are ignored
+        Each connection is in at most one pair, the most similar pairs are picked first
+        '''
+        candidates = []
+        for client, client_source in sources.items():
+            if client.is_server():
+                continue
+            for server, server_source in sources.items():
+                if server.is_server() is False or server is client or server_source == client_source:
+                    continue
+                similarity = self.similarity(client, server)
+                if similarity >= min_similarity:
+                    candidates.append((similarity, client, server))
+        candidates.sort(key=lambda candidate: -candidate[0])
+        used = set()
+        result = []
+        for similarity, client, server in candidates:
+            if client in used or server in used:
+                continue
+            used.add(client)
+            used.add(server)
+            result.append((client, server, similarity))
+        return result
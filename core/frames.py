@@ -0,0 +1,260 @@
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from interfaces import Connection, ConnectionList
+from . import wl
+from .clock import to_seconds, us_per_second
+from .histogram import LogHistogram
+from .letter_id_generator import number_to_letter_id
+from .lifetimes import format_seconds
+from .util import table_lines
+
+# How many of the most recent frames of each surface the rolling numbers are taken from
+recent_frames = 120
+
+# How many surfaces that have been destroyed are still reported (most recent first)
+retired_surfaces = 32
+
+# Configures of a surface that have not been acked, the oldest are forgotten past this
+max_pending_configures = 16
+
+# Identifies an object across connections, objects are not kept so memory doesn't depend on how many there have been
+_Key = Tuple[str, int, Optional[int]]
+
+def _key(connection_name: str, obj: wl.ObjectBase) -> _Key:
+    return (connection_name, obj.id, obj.generation)
+
+def _mean_change(values: List[int]) -> Optional[float]:
+    if len(values) < 2:
+        return None
+    return sum(abs(b - a) for a, b in zip(values, values[1:])) / (len(values) - 1)
+
+class SurfaceFrames:
+    '''Frame timing of one wl_surface
+    Jitter is the mean change between the intervals of consecutive commits, so a steady frame rate has none
+    Times are in microseconds, the histograms and what is reported in seconds
+    '''
+    def __init__(self, connection_name: str, surface: wl.ObjectBase) -> None:
+        self.name = (
+            connection_name + ' ' + (surface.type or '???') + '@' + str(surface.id) +
+            (number_to_letter_id(surface.generation, False) if surface.generation is not None else ''))
+        self.commits = 0
+        self.last_commit: Optional[int] = None
+        self.last_interval: Optional[int] = None
+        self.intervals = LogHistogram()
+        self.recent_intervals: Deque[int] = deque(maxlen=recent_frames)
+        self.jitter_total = 0
+        self.jitter_count = 0
+        # From wl_surface.frame to the callback's wl_callback.done
+        self.frame_done = LogHistogram()
+        self.recent_frame_done: Deque[int] = deque(maxlen=recent_frames)
+        # From xdg_surface.configure to xdg_surface.ack_configure, and from there to the next wl_surface.commit
+        self.configure_ack = LogHistogram()
+        self.ack_commit = LogHistogram()
+        self.configures: Dict[int, int] = {}
+        self.acked: Optional[int] = None
+
+    def committed(self, time: int) -> None:
+        self.commits += 1
+        if self.acked is not None:
+            self.ack_commit.add(to_seconds(time - self.acked))
+            self.acked = None
+        if self.last_commit is not None:
+            interval = time - self.last_commit
+            self.intervals.add(to_seconds(interval))
+            self.recent_intervals.append(interval)
+            if self.last_interval is not None:
+                self.jitter_total += abs(interval - self.last_interval)
+                self.jitter_count += 1
+            self.last_interval = interval
+        self.last_commit = time
+
+    def frame_callback_done(self, latency: int) -> None:
+        self.frame_done.add(to_seconds(latency))
+        self.recent_frame_done.append(latency)
+
+    def configured(self, serial: int, time: int) -> None:
+        if len(self.configures) >= max_pending_configures:
+            del self.configures[next(iter(self.configures))]
+        self.configures[serial] = time
+
+    def ack_configured(self, serial: int, time: int) -> None:
+        configure_time = self.configures.get(serial)
+        # Acking a configure skips any sent before it
+        self.configures.clear()
+        if configure_time is not None:
+            self.configure_ack.add(to_seconds(time - configure_time))
+            self.acked = time
+
+    def jitter(self) -> Optional[float]:
+        return to_seconds(self.jitter_total) / self.jitter_count if self.jitter_count else None
+
+    def recent_jitter(self) -> Optional[float]:
+        change = _mean_change(list(self.recent_intervals))
+        return change / us_per_second if change is not None else None
+
+    def recent_fps(self) -> Optional[float]:
+        total = sum(self.recent_intervals)
+        return len(self.recent_intervals) * us_per_second / total if total > 0 else None
+
+class FrameTiming(ConnectionList.Listener, Connection.Listener):
+    '''Pairs up frame callbacks, commits and configures of each surface as messages arrive
+    Work per message doesn't depend on how many messages there have been, so it can be kept up to date while running
+    Surfaces are forgotten when they are destroyed or their connection closes (apart from the last few, which are still
+    reported), so memory doesn't grow with how many there have been either
+    '''
+    def __init__(self) -> None:
+        self.surfaces: Dict[_Key, SurfaceFrames] = {}
+        # Surfaces that have been destroyed, and the name of their connection
+        self.retired: Deque[Tuple[str, SurfaceFrames]] = deque(maxlen=retired_surfaces)
+        # Frame callbacks that are not done yet, and the surface and time they were requested on
+        self.pending_callbacks: Dict[_Key, Tuple[SurfaceFrames, int]] = {}
+        self.xdg_surfaces: Dict[_Key, SurfaceFrames] = {}
+        self.handlers: Dict[Tuple[str, str], Callable[[str, wl.Message], None]] = {
+            ('wl_surface', 'commit'): self._commit,
+            ('wl_surface', 'frame'): self._frame,
+            ('wl_callback', 'done'): self._done,
+            ('xdg_wm_base', 'get_xdg_surface'): self._get_xdg_surface,
+            ('xdg_surface', 'configure'): self._configure,
+            ('xdg_surface', 'ack_configure'): self._ack_configure,
+            ('wl_display', 'delete_id'): self._delete_id,
+        }
+
+    def connection_opened(self, connection_list: ConnectionList, connection: Connection) -> None:
+        '''Overrides method in ConnectionList.Listener'''
+        connection.add_connection_listener(self)
+
+    def connection_str_changed(self, connection: Connection) -> None:
+        '''Overrides method in Connection.Listener'''
+        pass
+
+    def connection_app_id_set(self, connection: Connection, new_app_id: str) -> None:
+        '''Overrides method in Connection.Listener'''
+        pass
+
+    def connection_got_new_message(self, connection: Connection, message: wl.Message) -> None:
+        '''Overrides method in Connection.Listener'''
+        self.connection_got_new_messages(connection, [message])
+
+    def connection_got_new_messages(self, connection: Connection, messages: List[wl.Message]) -> None:
+        '''Overrides method in Connection.Listener'''
+        handlers = self.handlers
+        name = connection.name()
+        for message in messages:
+            if message.obj.type is None:
+                continue
+            handler = handlers.get((message.obj.type, message.name))
+            if handler is not None:
+                handler(name, message)
+
+    def connection_closed(self, connection: Connection) -> None:
+        '''Overrides method in Connection.Listener'''
+        name = connection.name()
+        for key in [key for key in self.surfaces if key[0] == name]:
+            self._retire(key)
+        for key in [key for key in self.xdg_surfaces if key[0] == name]:
+            del self.xdg_surfaces[key]
+        for key in [key for key in self.pending_callbacks if key[0] == name]:
+            del self.pending_callbacks[key]
+
+    def _retire(self, key: _Key) -> None:
+        frames = self.surfaces.pop(key)
+        if frames.commits:
+            self.retired.append((key[0], frames))
+        for callback_key in [i for i, (pending, _) in self.pending_callbacks.items() if pending is frames]:
+            del self.pending_callbacks[callback_key]
+        for xdg_key in [i for i, xdg_frames in self.xdg_surfaces.items() if xdg_frames is frames]:
+            del self.xdg_surfaces[xdg_key]
+
+    def _surface(self, connection_name: str, surface: wl.ObjectBase) -> SurfaceFrames:
+        key = _key(connection_name, surface)
+        frames = self.surfaces.get(key)
+        if frames is None:
+            frames = SurfaceFrames(connection_name, surface)
+            self.surfaces[key] = frames
+        return frames
+
+    def _commit(self, connection_name: str, message: wl.Message) -> None:
+        self._surface(connection_name, message.obj).committed(message.timestamp)
+
+    def _frame(self, connection_name: str, message: wl.Message) -> None:
+        callback = _new_object(message)
+        if callback is not None:
+            self.pending_callbacks[_key(connection_name, callback)] = (
+                self._surface(connection_name, message.obj), message.timestamp)
+
+    def _done(self, connection_name: str, message: wl.Message) -> None:
+        pending = self.pending_callbacks.pop(_key(connection_name, message.obj), None)
+        if pending is not None:
+            frames, time = pending
+            frames.frame_callback_done(message.timestamp - time)
+
+    def _get_xdg_surface(self, connection_name: str, message: wl.Message) -> None:
+        xdg_surface = _new_object(message)
+        for arg in message.args:
+            if isinstance(arg, wl.Arg.Object) and not arg.is_new and xdg_surface is not None:
+                self.xdg_surfaces[_key(connection_name, xdg_surface)] = self._surface(connection_name, arg.obj)
+
+    def _configure(self, connection_name: str, message: wl.Message) -> None:
+        frames = self.xdg_surfaces.get(_key(connection_name, message.obj))
+        serial = _int_arg(message)
+        if frames is not None and serial is not None:
+            frames.configured(serial, message.timestamp)
+
+    def _ack_configure(self, connection_name: str, message: wl.Message) -> None:
+        frames = self.xdg_surfaces.get(_key(connection_name, message.obj))
+        serial = _int_arg(message)
+        if frames is not None and serial is not None:
+            frames.ack_configured(serial, message.timestamp)
+
+    def _delete_id(self, connection_name: str, message: wl.Message) -> None:
+        obj = message.destroyed_obj
+        if obj is None:
+            return
+        key = _key(connection_name, obj)
+        if key in self.surfaces:
+            self._retire(key)
+        self.pending_callbacks.pop(key, None)
+        self.xdg_surfaces.pop(key, None)
+
+    def report(self, connection_name: Optional[str] = None) -> List[str]:
+        '''Lines of a table of the surfaces that have been committed, most commits first
+        Percentiles and jitter cover every frame, recent numbers only the last recent_frames
+        Only the last retired_surfaces surfaces that have been destroyed are included
+        '''
+        rows: List[Tuple[str, ...]] = [(
+            'surface', 'commits', 'recent fps', 'interval p50', 'p99', 'jitter', 'recent jitter',
+            'frame done p50', 'p99', 'configure ack p50', 'ack commit p50')]
+        surfaces = [
+            frames for name, frames in [(key[0], frames) for key, frames in self.surfaces.items()] + list(self.retired)
+            if frames.commits and (connection_name is None or name == connection_name)]
+        for frames in sorted(surfaces, key=lambda frames: (-frames.commits, frames.name)):
+            fps = frames.recent_fps()
+            rows.append((
+                frames.name,
+                str(frames.commits),
+                '-' if fps is None else '{:0.1f}'.format(fps),
+                format_seconds(frames.intervals.percentile(50)),
+                format_seconds(frames.intervals.percentile(99)),
+                format_seconds(frames.jitter()),
+                format_seconds(frames.recent_jitter()),
+                format_seconds(frames.frame_done.percentile(50)),
+                format_seconds(frames.frame_done.percentile(99)),
+                format_seconds(frames.configure_ack.percentile(50)),
+                format_seconds(frames.ack_commit.percentile(50)),
+            ))
+        if len(rows) == 1:
+            return []
+        return table_lines(rows)
+
+def _new_object(message: wl.Message) -> Optional[wl.ObjectBase]:
+    for arg in message.args:
+        if isinstance(arg, wl.Arg.Object) and arg.is_new:
+            return arg.obj
+    return None
+
+def _int_arg(message: wl.Message) -> Optional[int]:
+    for arg in message.args:
+        if isinstance(arg, wl.Arg.Int):
+            return arg.value
+    return None
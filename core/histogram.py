@@ -0,0 +1,101 @@
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+class LogHistogram:
+    '''Counts positive values in logarithmic buckets, so percentiles can be estimated in constant memory
+    Each doubling of value is split into buckets_per_doubling equal width buckets, so estimates are accurate to within
+    a fraction of the value (25% with the default of 4)
+    Values less than or equal to 0 are counted in their own bucket
+    '''
+    def __init__(self, buckets_per_doubling: int = 4) -> None:
+        self.buckets_per_doubling = buckets_per_doubling
+        self.buckets: Dict[int, int] = {}
+        self.non_positive = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        # This is called a lot when profiling, so it's kept simple
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if value > 0:
+            mantissa, exponent = math.frexp(value) # value = mantissa * 2**exponent, 0.5 <= mantissa < 1
+            index = exponent * self.buckets_per_doubling + int((mantissa - 0.5) * 2 * self.buckets_per_doubling)
+            buckets = self.buckets
+            buckets[index] = buckets.get(index, 0) + 1
+        else:
+            self.non_positive += 1
+
+    def copy(self) -> 'LogHistogram':
+        result = LogHistogram(self.buckets_per_doubling)
+        result.buckets = dict(self.buckets)
+        result.non_positive = self.non_positive
+        result.count = self.count
+        result.total = self.total
+        result.min = self.min
+        result.max = self.max
+        return result
+
+    def save_state(self) -> Dict[str, Any]:
+        '''Returns everything counted so far, which can be turned into JSON'''
+        return {
+            'buckets_per_doubling': self.buckets_per_doubling,
+            'buckets': sorted(self.buckets.items()),
+            'non_positive': self.non_positive,
+            'count': self.count,
+            'total': self.total,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+        }
+
+    @staticmethod
+    def from_state(state: Dict[str, Any]) -> 'LogHistogram':
+        '''Returns a histogram with the counts returned by save_state()'''
+        result = LogHistogram(state['buckets_per_doubling'])
+        result.buckets = {index: count for index, count in state['buckets']}
+        result.non_positive = state['non_positive']
+        result.count = state['count']
+        result.total = state['total']
+        if result.count:
+            result.min = state['min']
+            result.max = state['max']
+        return result
+
+    def bucket_bounds(self, index: int) -> Tuple[float, float]:
+        '''The range of values counted in the bucket with the given index'''
+        exponent, sub_bucket = divmod(index, self.buckets_per_doubling)
+        base = 2.0 ** (exponent - 1)
+        return (
+            base * (1 + sub_bucket / self.buckets_per_doubling),
+            base * (1 + (sub_bucket + 1) / self.buckets_per_doubling))
+
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percent: float) -> Optional[float]:
+        '''Estimate the value below which the given percent of values fall, or None if empty'''
+        if not self.count:
+            return None
+        rank = percent / 100 * self.count
+        if rank >= self.count:
+            return self.max
+        seen = self.non_positive
+        if rank <= seen:
+            return min(self.min, 0.0)
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                low, high = self.bucket_bounds(index)
+                # Middle of the bucket, clamped to what was actually seen
+                return min(max((low + high) / 2, self.min), self.max)
+        return self.max
+
+    def counts(self) -> List[Tuple[float, float, int]]:
+        '''Returns (low, high, count) of every non-empty bucket in order, not including values <= 0'''
+        return [self.bucket_bounds(index) + (self.buckets[index],) for index in sorted(self.buckets)]
@@ -0,0 +1,161 @@
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import wl
+from .clock import from_seconds, to_seconds
+from .histogram import LogHistogram
+
+# Width in seconds of the periods the peak live count of each interface is kept for
+timeline_resolution = 1.0
+
+class InterfaceLifetimes:
+    '''Counts of the objects of one interface, updated as they are created and destroyed'''
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.created = 0
+        self.destroyed = 0
+        self.live = 0
+        self.peak_live = 0
+        self.lifetimes = LogHistogram()
+        # The highest live count in each period, by period index (time divided by timeline_resolution)
+        self.timeline: Dict[int, int] = {}
+
+    def _live_changed(self, time: int) -> None:
+        period = time // from_seconds(timeline_resolution)
+        if self.live > self.timeline.get(period, -1):
+            self.timeline[period] = self.live
+
+    def save_state(self) -> Dict[str, Any]:
+        return {
+            'created': self.created,
+            'destroyed': self.destroyed,
+            'live': self.live,
+            'peak_live': self.peak_live,
+            'lifetimes': self.lifetimes.save_state(),
+            'timeline': sorted(self.timeline.items()),
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        self.created = state['created']
+        self.destroyed = state['destroyed']
+        self.live = state['live']
+        self.peak_live = state['peak_live']
+        self.lifetimes = LogHistogram.from_state(state['lifetimes'])
+        self.timeline = {period: count for period, count in state['timeline']}
+
+    def live_over_time(self, periods: int) -> List[Tuple[float, float, int]]:
+        '''Returns the peak live count in each of at most the given number of equal periods, as (start, end, count)
+        The count carries over into periods without any changes
+        '''
+        if not self.timeline:
+            return []
+        first = min(self.timeline)
+        last = max(self.timeline)
+        per_row = max(1, math.ceil((last - first + 1) / periods))
+        result = []
+        live = 0
+        for start in range(first, last + 1, per_row):
+            # What was live at the end of the last period carries over
+            peak = live
+            for period in range(start, min(start + per_row, last + 1)):
+                count = self.timeline.get(period)
+                if count is not None:
+                    peak = max(peak, count)
+                    live = count
+            result.append((start * timeline_resolution, (start + per_row) * timeline_resolution, peak))
+        return result
+
+class ObjectLifetimes:
+    '''Lifetime counts of the objects on a connection by interface
+    Updated when each object is created or destroyed, so reports cost O(interfaces) no matter how many messages or
+    objects there have been
+    '''
+    def __init__(self, session: Optional['ObjectLifetimes'] = None) -> None:
+        '''session: also told about every object, so it counts the objects of all connections together (and its peaks
+        are of how many were alive at the same time across connections)
+        '''
+        self.session = session
+        self.interfaces: Dict[str, InterfaceLifetimes] = {}
+        # Of all interfaces
+        self.live = 0
+        self.peak_live = 0
+
+    def _get(self, obj: wl.ObjectBase) -> InterfaceLifetimes:
+        return self._get_by_name(obj.type if obj.type else '???')
+
+    def _get_by_name(self, name: str) -> InterfaceLifetimes:
+        interface = self.interfaces.get(name)
+        if interface is None:
+            interface = InterfaceLifetimes(name)
+            self.interfaces[name] = interface
+        return interface
+
+    def created(self, obj: wl.ObjectBase) -> None:
+        interface = self._get(obj)
+        interface.created += 1
+        interface.live += 1
+        if interface.live > interface.peak_live:
+            interface.peak_live = interface.live
+        self.live += 1
+        if self.live > self.peak_live:
+            self.peak_live = self.live
+        interface._live_changed(obj.create_time or 0)
+        if self.session is not None:
+            self.session.created(obj)
+
+    def destroyed(self, obj: wl.ObjectBase) -> None:
+        interface = self._get(obj)
+        interface.destroyed += 1
+        interface.live -= 1
+        self.live -= 1
+        lifespan = obj.lifespan()
+        if lifespan is not None:
+            interface.lifetimes.add(to_seconds(lifespan))
+        interface._live_changed(obj.destroy_time or 0)
+        if self.session is not None:
+            self.session.destroyed(obj)
+
+    def save_state(self) -> Dict[str, Any]:
+        '''Returns the counts of every interface, which can be turned into JSON'''
+        return {
+            'live': self.live,
+            'peak_live': self.peak_live,
+            'interfaces': {name: interface.save_state() for name, interface in self.interfaces.items()},
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        '''Replace the counts with those returned by save_state()'''
+        self.live = state['live']
+        self.peak_live = state['peak_live']
+        self.interfaces = {}
+        for name, interface_state in state['interfaces'].items():
+            self._get_by_name(name).load_state(interface_state)
+
+    def live_counts(self) -> Dict[str, int]:
+        '''Returns how many objects of each interface are alive, interfaces without any are left out'''
+        return {name: interface.live for name, interface in self.interfaces.items() if interface.live}
+
+    def report(self) -> List[Tuple[str, ...]]:
+        '''Rows of a table with counts and lifetime percentiles for each interface, most live first'''
+        rows: List[Tuple[str, ...]] = [
+            ('interface', 'created', 'destroyed', 'live', 'peak', 'lifetime p50', 'p90', 'p99')]
+        for interface in sorted(self.interfaces.values(), key=lambda i: (-i.live, -i.created, i.name)):
+            hist = interface.lifetimes
+            rows.append((
+                interface.name,
+                str(interface.created),
+                str(interface.destroyed),
+                str(interface.live),
+                str(interface.peak_live),
+                format_seconds(hist.percentile(50)),
+                format_seconds(hist.percentile(90)),
+                format_seconds(hist.percentile(99)),
+            ))
+        return rows
+
+def format_seconds(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return '-'
+    if seconds < 1:
+        return '{:0.1f}ms'.format(seconds * 1e3)
+    return '{:0.2f}s'.format(seconds)
@@ -1,4 +1,6 @@
 import re
+import sys
+import functools
 from typing import List, Set, Optional, Tuple, Generic, TypeVar, Any, Callable, cast
 
 from core.util import *
@@ -66,14 +68,42 @@ class AlwaysMatcher(Matcher[Any]):
         else:
             return '<never>'
 
+# How many distinct wildcard patterns are kept compiled
+wildcard_cache_size = 1 << 10
+
+def _always_true(text: str) -> bool:
+    return True
+
+@functools.lru_cache(maxsize=wildcard_cache_size)
+def wildcard_check(pattern: str) -> Callable[[str], bool]:
+    '''Returns a function that checks if a string matches pattern, in which * matches any number of characters
+    Patterns with only one piece of text (exact, prefix*, *suffix and *contains*) are checked with a string method, only
+    patterns with several pieces need a regular expression. Checks are cached, so patterns are only compiled once.
+    '''
+    pieces = [piece for piece in pattern.split('*') if piece]
+    if not pieces:
+        return _always_true
+    if len(pieces) > 1:
+        fullmatch = re.compile(re.escape(pattern).replace(r'\*', '.*'), re.DOTALL).fullmatch
+        return lambda text: fullmatch(text) is not None
+    piece = sys.intern(pieces[0])
+    if pattern == piece:
+        return piece.__eq__ # type: ignore
+    elif pattern.startswith('*') and pattern.endswith('*'):
+        return lambda text: piece in text
+    elif pattern.startswith('*'):
+        return lambda text: text.endswith(piece)
+    else:
+        return lambda text: text.startswith(piece)
+
 class WildcardMatcher(Matcher[str]):
     def __init__(self, pattern: str) -> None:
         self.pattern = pattern
-        re_pattern = r'^' + re.escape(pattern).replace(r'\*', '.*') + r'$'
-        self.regex = re.compile(re_pattern)
+        # Replace the method with the specialised check, which saves a call for each match
+        setattr(self, 'matches', wildcard_check(pattern))
 
     def matches(self, text: str) -> bool:
-        return len(self.regex.findall(text)) > 0
+        return bool(wildcard_check(self.pattern)(text))
 
     def __str__(self) -> str:
         return self.pattern
@@ -90,7 +120,8 @@ class EqMatcher(Matcher[T]):
             self.text = text
 
     def matches(self, value: T) -> bool:
-        return self.expected == value
+        # Names are interned, so most matches are the same object and don't need a full comparison
+        return value is self.expected or self.expected == value
 
     def __str__(self) -> str:
         return self.text
@@ -399,7 +430,7 @@ def str_matcher(pattern: str) -> Matcher[str]:
     elif '*' in pattern:
         return WildcardMatcher(pattern)
     else:
-        return EqMatcher(pattern)
+        return EqMatcher(sys.intern(pattern))
 
 identifier_re = re.compile(r'^[\*\-_A-Za-z0-9]*$')
 
@@ -0,0 +1,101 @@
+from typing import Dict, List, Optional, Tuple
+
+from . import wl
+from .matcher import wildcard_check
+
+def type_matches(pattern: str, type_name: str) -> bool:
+    '''If the object type type_name matches pattern, which may contain wildcards'''
+    if pattern is type_name or pattern == type_name:
+        return True
+    if '*' not in pattern:
+        return False
+    return wildcard_check(pattern)(type_name)
+
+class ObjectStore:
+    '''All the objects ever created on a connection
+    The newest object for each ID is kept in a dict so it can be looked up directly. Older objects with the same ID have
+    all been replaced, and are only kept in lists for the IDs that have actually been reused. Objects that are alive are
+    indexed by type, dead ones are removed from the index when it's next queried.
+    '''
+    def __init__(self, keep_replaced: bool = True) -> None:
+        '''keep_replaced: if False objects that have been replaced are only counted, so memory use doesn't grow as IDs
+        are reused'''
+        self.keep_replaced = keep_replaced
+        self.latest: Dict[int, wl.ObjectBase] = {}
+        self.previous: Dict[int, List[wl.ObjectBase]] = {}
+        self.by_type: Dict[Optional[str], Dict[int, wl.ObjectBase]] = {}
+        # How many objects each ID had that are not kept, from before a saved state or replaced with keep_replaced off
+        self.forgotten: Dict[int, int] = {}
+
+    def add(self, obj: wl.ObjectBase) -> None:
+        '''Add an object, which replaces any previous object with the same ID'''
+        old = self.latest.get(obj.id)
+        if old is not None:
+            if self.keep_replaced:
+                self.previous.setdefault(obj.id, []).append(old)
+            else:
+                self.forgotten[obj.id] = self.forgotten.get(obj.id, 0) + 1
+            same_type = self.by_type.get(old.type)
+            if same_type is not None and same_type.get(old.id) is old:
+                del same_type[old.id]
+        self.latest[obj.id] = obj
+        self.by_type.setdefault(obj.type, {})[obj.id] = obj
+
+    def restore(self, obj: wl.ObjectBase) -> None:
+        '''Add an object from a saved state, earlier objects with the same ID are counted but not kept'''
+        assert obj.id not in self.latest and obj.generation is not None
+        self.forgotten[obj.id] = obj.generation
+        self.add(obj)
+
+    def generations(self, obj_id: int) -> int:
+        '''Returns how many objects have been created with the given ID'''
+        if obj_id not in self.latest:
+            return 0
+        return self.forgotten.get(obj_id, 0) + len(self.previous.get(obj_id, ())) + 1
+
+    def get(self, obj_id: int, generation: int) -> wl.ObjectBase:
+        '''Get an object by ID and generation (which can be negative to count back from the newest)
+        Raises: RuntimeError if there is no such object
+        '''
+        try:
+            obj = self.latest[obj_id]
+        except KeyError as e:
+            raise RuntimeError('Id ' + str(obj_id) + ' not in object database') from e
+        if generation == -1:
+            return obj
+        index = generation
+        if generation >= 0:
+            index -= self.forgotten.get(obj_id, 0)
+            if index < 0:
+                raise RuntimeError('Generation ' + str(generation) + ' of id ' + str(obj_id) + ' is not kept')
+        try:
+            return (self.previous.get(obj_id, []) + [obj])[index]
+        except IndexError as e:
+            raise RuntimeError('Invalid generation ' + str(generation) + ' for id ' + str(obj_id)) from e
+
+    def _live_index(self, type_name: Optional[str]) -> Dict[int, wl.ObjectBase]:
+        objs = self.by_type[type_name]
+        dead = [obj_id for obj_id, obj in objs.items() if not obj.alive]
+        for obj_id in dead:
+            del objs[obj_id]
+        return objs
+
+    def live(self, type_pattern: Optional[str] = None) -> Tuple[wl.ObjectBase, ...]:
+        '''Returns the objects that are alive, ordered by ID
+        type_pattern: if set only objects with matching types are returned, wildcards allowed
+        '''
+        result: List[wl.ObjectBase] = []
+        for type_name in list(self.by_type):
+            if type_pattern is None or (type_name is not None and type_matches(type_pattern, type_name)):
+                result.extend(self._live_index(type_name).values())
+        result.sort(key=lambda obj: obj.id)
+        return tuple(result)
+
+    def live_counts(self) -> Dict[Optional[str], int]:
+        '''Returns the number of objects alive of each type, types with none alive are left out'''
+        counts = {}
+        for type_name in list(self.by_type):
+            count = len(self._live_index(type_name))
+            if count:
+                counts[type_name] = count
+        return counts
@@ -0,0 +1,144 @@
+import time
+import threading
+import functools
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .histogram import LogHistogram
+from .util import table_lines
+
+# Only one in this many calls is added to the duration histograms, which keeps profiling cheap (must be a power of 2)
+duration_sample_rate = 8
+duration_sample_mask = duration_sample_rate - 1
+
+class Stage:
+    '''Timing of all calls to the instrumented functions of one stage
+    total_ns: time spent in the stage, including any instrumented stages it called
+    self_ns: time spent in the stage, not counting other instrumented stages it called
+    durations: histogram of the time a sample of calls took in nanoseconds (used for percentiles)
+    '''
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.calls = 0
+        self.total_ns = 0
+        self.self_ns = 0
+        self.durations = LogHistogram()
+
+    def record(self, total_ns: int, self_ns: int) -> None:
+        self.calls += 1
+        self.total_ns += total_ns
+        self.self_ns += self_ns
+        if not self.calls & duration_sample_mask:
+            self.durations.add(total_ns)
+
+class Profiler:
+    '''Counts calls and accumulates time per stage
+    Functions are instrumented by replacing them with timed wrappers, so nothing is slowed down unless a profiler
+    is created and instrument() is called
+    '''
+    def __init__(self) -> None:
+        self.stages: Dict[str, Stage] = {}
+        self.start_ns = time.perf_counter_ns()
+        self.last_ns = self.start_ns # When the last instrumented call finished
+        self._local = threading.local()
+        self._originals: List[Tuple[Any, str, Any]] = []
+
+    def instrument(self, owner: Any, attr: str, stage_name: str, counts_as_work: bool = True) -> None:
+        '''Time all calls to owner.attr (owner can be a class or a module) as part of the named stage
+        counts_as_work: if calls extend elapsed(), should be False for stages that also run while idle (such as
+        showing the output of commands)
+        '''
+        original = getattr(owner, attr)
+        stage = self.stages.get(stage_name)
+        if stage is None:
+            stage = Stage(stage_name)
+            self.stages[stage_name] = stage
+        local = self._local
+        profiler = self if counts_as_work else None
+        perf_counter_ns = time.perf_counter_ns
+
+        durations = stage.durations
+
+        @functools.wraps(original)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            try:
+                stack = local.stack
+            except AttributeError:
+                stack = []
+                local.stack = stack
+            # Instrumented functions called from this one add their time to this entry
+            stack.append(0)
+            start = perf_counter_ns()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                end = perf_counter_ns()
+                elapsed = end - start
+                children = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                if profiler is not None:
+                    profiler.last_ns = end
+                # Same as stage.record(), but inlined because this is hot
+                calls = stage.calls + 1
+                stage.calls = calls
+                stage.total_ns += elapsed
+                stage.self_ns += elapsed - children
+                if not calls & duration_sample_mask:
+                    durations.add(elapsed)
+
+        self._originals.append((owner, attr, original))
+        setattr(owner, attr, wrapper)
+
+    def restore(self) -> None:
+        '''Remove all instrumentation'''
+        for owner, attr, original in reversed(self._originals):
+            setattr(owner, attr, original)
+        self._originals = []
+
+    def elapsed(self) -> float:
+        '''Seconds from when the profiler was created until the last call that counts as work finished
+        Time spent idle afterwards (such as waiting for user input) is not counted
+        '''
+        return (self.last_ns - self.start_ns) / 1e9
+
+    def summary(self, message_stage: Optional[str] = None) -> List[str]:
+        '''Lines of a human readable summary
+        message_stage: the stage that is called once per message, used to calculate the message rate
+        '''
+        elapsed = self.elapsed()
+        lines = []
+        if message_stage is not None and message_stage in self.stages:
+            count = self.stages[message_stage].calls
+            lines.append(
+                str(count) + ' messages in ' + '{:0.2f}s'.format(elapsed) +
+                ' (' + '{:0.0f}'.format(count / elapsed if elapsed else 0) + ' messages/s)')
+        else:
+            lines.append('{:0.2f}s elapsed'.format(elapsed))
+        header = ('stage', 'calls', 'total', 'self', 'self %', 'mean', 'p50', 'p90', 'p99')
+        rows = [header]
+        for stage in self.stages.values():
+            hist = stage.durations
+            rows.append((
+                stage.name,
+                str(stage.calls),
+                _format_ns(stage.total_ns),
+                _format_ns(stage.self_ns),
+                '{:0.1f}%'.format(stage.self_ns / 1e7 / elapsed if elapsed else 0),
+                _format_ns(hist.mean()),
+                _format_ns(hist.percentile(50)),
+                _format_ns(hist.percentile(90)),
+                _format_ns(hist.percentile(99)),
+            ))
+        lines.extend(table_lines(rows))
+        return lines
+
+def _format_ns(ns: Optional[float]) -> str:
+    if ns is None:
+        return '-'
+    if ns < 1e3:
+        return '{:0.0f}ns'.format(ns)
+    if ns < 1e6:
+        return '{:0.1f}us'.format(ns / 1e3)
+    if ns < 1e9:
+        return '{:0.1f}ms'.format(ns / 1e6)
+    return '{:0.2f}s'.format(ns / 1e9)
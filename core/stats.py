@@ -0,0 +1,194 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from interfaces import Connection, ConnectionList
+from . import wl
+from .clock import to_seconds, us_per_second
+from .histogram import LogHistogram
+from .lifetimes import ObjectLifetimes, format_seconds
+from .util import table_lines
+
+class MessageStats(ConnectionList.Listener, Connection.Listener):
+    '''Aggregates counts of messages as they arrive, without keeping the messages
+    Object counts come from the object lifetimes the connection list already tracks for all connections together, so
+    they agree with the leaks command and peaks are of how many objects were alive at the same time
+    Memory use depends on how many interfaces, message types and connections there are, not how many messages
+    '''
+    def __init__(self) -> None:
+        self.messages = 0
+        self.by_message: Dict[Tuple[str, str], int] = {}
+        self.by_connection: Dict[str, int] = {}
+        self.first_time: Optional[int] = None
+        self.last_time: Optional[int] = None
+        # Messages in each second, added when the second is over
+        self.per_second = LogHistogram()
+        self.current_second: Optional[int] = None
+        self.current_second_count = 0
+        self.connection_list: Optional[ConnectionList] = None
+        # Latencies of wl_display.sync roundtrips, in seconds
+        self.roundtrips = LogHistogram()
+
+    def connection_opened(self, connection_list: ConnectionList, connection: Connection) -> None:
+        '''Overrides method in ConnectionList.Listener'''
+        self.by_connection.setdefault(connection.name(), 0)
+        self.connection_list = connection_list
+        connection.add_connection_listener(self)
+
+    def connection_str_changed(self, connection: Connection) -> None:
+        '''Overrides method in Connection.Listener'''
+        pass
+
+    def connection_app_id_set(self, connection: Connection, new_app_id: str) -> None:
+        '''Overrides method in Connection.Listener'''
+        pass
+
+    def connection_got_new_message(self, connection: Connection, message: wl.Message) -> None:
+        '''Overrides method in Connection.Listener'''
+        self.connection_got_new_messages(connection, [message])
+
+    def connection_got_new_messages(self, connection: Connection, messages: List[wl.Message]) -> None:
+        '''Overrides method in Connection.Listener'''
+        self.messages += len(messages)
+        name = connection.name()
+        self.by_connection[name] = self.by_connection.get(name, 0) + len(messages)
+        by_message = self.by_message
+        for message in messages:
+            key = (_type_name(message.obj), message.name)
+            by_message[key] = by_message.get(key, 0) + 1
+            self._count_time(message.timestamp)
+            if message.roundtrip is not None:
+                self.roundtrips.add(to_seconds(message.roundtrip))
+
+    def connection_closed(self, connection: Connection) -> None:
+        '''Overrides method in Connection.Listener'''
+        pass
+
+    def _count_time(self, timestamp: int) -> None:
+        if self.first_time is None:
+            self.first_time = timestamp
+        self.last_time = timestamp
+        second = timestamp // us_per_second
+        if self.current_second is None:
+            self.current_second = second
+        elif second > self.current_second:
+            self.per_second.add(self.current_second_count)
+            # Seconds without any messages
+            for _ in range(second - self.current_second - 1):
+                self.per_second.add(0)
+            self.current_second = second
+            self.current_second_count = 0
+        # Messages from different connections can be slightly out of order, they count towards the current second
+        self.current_second_count += 1
+
+    def object_lifetimes(self) -> ObjectLifetimes:
+        '''The object lifetimes of all connections together'''
+        if self.connection_list is None:
+            return ObjectLifetimes()
+        return self.connection_list.object_lifetimes()
+
+    def _per_second(self) -> LogHistogram:
+        '''Includes the second in progress'''
+        result = self.per_second.copy()
+        if self.current_second is not None:
+            result.add(self.current_second_count)
+        return result
+
+    def duration(self) -> float:
+        if self.first_time is None or self.last_time is None:
+            return 0.0
+        return to_seconds(self.last_time - self.first_time)
+
+    def to_json(self) -> Dict[str, Any]:
+        '''Returns the stats as something that can be turned into JSON'''
+        per_second = self._per_second()
+        object_lifetimes = self.object_lifetimes()
+        interfaces: Dict[str, Any] = {}
+        for type_name in sorted(object_lifetimes.interfaces):
+            interface = object_lifetimes.interfaces[type_name]
+            lifetimes = interface.lifetimes
+            interfaces[type_name] = {
+                'created': interface.created,
+                'destroyed': interface.destroyed,
+                'live': interface.live,
+                'peak_live': interface.peak_live,
+                'lifetime_seconds': None if not lifetimes.count else {
+                    'mean': lifetimes.mean(),
+                    'p50': lifetimes.percentile(50),
+                    'p90': lifetimes.percentile(90),
+                    'p99': lifetimes.percentile(99),
+                    'max': lifetimes.max,
+                },
+            }
+        return {
+            'messages': self.messages,
+            'duration_seconds': self.duration(),
+            'messages_per_second': {
+                'mean': per_second.mean(),
+                'p50': per_second.percentile(50),
+                'p99': per_second.percentile(99),
+                'peak': per_second.max if per_second.count else None,
+            },
+            'by_connection': dict(self.by_connection),
+            'by_message': {interface + '.' + name: count for (interface, name), count in sorted(self.by_message.items())},
+            'peak_live_objects': object_lifetimes.peak_live,
+            'roundtrips': self.roundtrips.count,
+            'roundtrip_seconds': None if not self.roundtrips.count else {
+                'mean': self.roundtrips.mean(),
+                'p50': self.roundtrips.percentile(50),
+                'p90': self.roundtrips.percentile(90),
+                'p99': self.roundtrips.percentile(99),
+                'max': self.roundtrips.max,
+            },
+            'interfaces': interfaces,
+        }
+
+    def summary(self) -> List[str]:
+        '''Lines of a human readable summary'''
+        per_second = self._per_second()
+        object_lifetimes = self.object_lifetimes()
+        lines = [
+            str(self.messages) + ' messages over ' + '{:0.2f}s'.format(self.duration()) + ' on ' +
+            str(len(self.by_connection)) + ' connection' + ('' if len(self.by_connection) == 1 else 's'),
+        ]
+        if per_second.count:
+            lines.append(
+                'Messages per second: ' + '{:0.0f}'.format(per_second.mean() or 0) + ' mean, ' +
+                _format_count(per_second.percentile(99)) + ' p99, ' + _format_count(per_second.max) + ' peak')
+        lines.append('Peak live objects: ' + str(object_lifetimes.peak_live))
+        if self.roundtrips.count:
+            lines.append(
+                'Roundtrips: ' + str(self.roundtrips.count) + ', ' +
+                format_seconds(self.roundtrips.percentile(50)) + ' p50, ' +
+                format_seconds(self.roundtrips.percentile(99)) + ' p99, ' +
+                format_seconds(self.roundtrips.max) + ' max')
+        if self.by_connection:
+            rows: List[Tuple[str, ...]] = [('connection', 'messages')]
+            for name, count in self.by_connection.items():
+                rows.append((name, str(count)))
+            lines.extend(table_lines(rows))
+        if self.by_message:
+            rows = [('message', 'count')]
+            for (interface, name), count in sorted(self.by_message.items(), key=lambda item: (-item[1], item[0])):
+                rows.append((interface + '.' + name, str(count)))
+            lines.extend(table_lines(rows))
+        if object_lifetimes.interfaces:
+            rows = [('interface', 'created', 'destroyed', 'live', 'peak', 'lifetime p50', 'p90', 'max')]
+            for counts in sorted(object_lifetimes.interfaces.values(), key=lambda i: (-i.created, i.name)):
+                lifetimes = counts.lifetimes
+                rows.append((
+                    counts.name,
+                    str(counts.created),
+                    str(counts.destroyed),
+                    str(counts.live),
+                    str(counts.peak_live),
+                    format_seconds(lifetimes.percentile(50)),
+                    format_seconds(lifetimes.percentile(90)),
+                    format_seconds(lifetimes.max if lifetimes.count else None),
+                ))
+            lines.extend(table_lines(rows))
+        return lines
+
+def _type_name(obj: wl.ObjectBase) -> str:
+    return obj.type if obj.type else '???'
+
+def _format_count(count: Optional[float]) -> str:
+    return '-' if count is None else '{:0.0f}'.format(count)
@@ -0,0 +1,33 @@
+from unittest import TestCase
+
+from core.clock import Clock, to_seconds, from_seconds
+
+class TestClock(TestCase):
+    def setUp(self):
+        self.clock = Clock()
+
+    def test_starts_at_first_time(self):
+        self.assertEqual(self.clock.relative(4000000), 0)
+        self.assertEqual(self.clock.relative(6500000), 2500000)
+
+    def test_start_can_be_set(self):
+        self.clock.start_at(1000000)
+        self.assertEqual(self.clock.relative(4000000), 3000000)
+
+    def test_start_can_not_be_changed_once_started(self):
+        self.clock.relative(4000000)
+        self.clock.start_at(1000000)
+        self.assertEqual(self.clock.relative(4000000), 0)
+
+    def test_clocks_are_independent(self):
+        self.clock.relative(4000000)
+        self.assertEqual(Clock().relative(10000000), 0)
+
+    def test_relative_times_are_exact(self):
+        self.clock.start_at(770203519000)
+        self.assertEqual(self.clock.relative(770203519100), 100)
+
+    def test_seconds_conversion(self):
+        self.assertEqual(to_seconds(2500000), 2.5)
+        self.assertEqual(from_seconds(2.5), 2500000)
+        self.assertEqual(from_seconds(0.1 + 0.2), 300000)
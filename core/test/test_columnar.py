@@ -0,0 +1,116 @@
+from unittest import TestCase, skipUnless
+
+from core import ConnectionManager, output, matcher, columnar
+from core.wl import Arg, Message, UnresolvedObject, protocol
+
+def message(time, type_name, obj_id, name, args, sent=True):
+    return Message(time, UnresolvedObject(obj_id, type_name), sent, name, tuple(args))
+
+def new(type_name, obj_id):
+    return Arg.Object(UnresolvedObject(obj_id, type_name), True)
+
+def client_messages(start):
+    return [
+        message(start, 'wl_display', 1, 'get_registry', [new('wl_registry', 2)]),
+        message(start + 1, 'wl_registry', 2, 'bind', [Arg.Int(1), Arg.String('wl_compositor'), Arg.Int(4), new(None, 3)]),
+        message(start + 2, 'wl_compositor', 3, 'create_surface', [new('wl_surface', 4)]),
+        message(start + 3, 'wl_surface', 4, 'attach', [Arg.Null('wl_buffer'), Arg.Int(0), Arg.Int(0)]),
+        message(start + 4, 'wl_surface', 4, 'frame', [new('wl_callback', 5)]),
+        message(start + 5, 'wl_surface', 4, 'commit', []),
+        message(start + 6, 'wl_callback', 5, 'done', [Arg.Int(16)], sent=False),
+        message(start + 7, 'wl_display', 1, 'delete_id', [Arg.Int(5)], sent=False),
+        message(start + 8, 'wl_surface', 4, 'frame', [new('wl_callback', 5)]),
+        message(start + 9, 'wl_surface', 4, 'commit', []),
+        message(start + 10, 'wl_surface', 4, 'damage', [Arg.Int(0), Arg.Int(0), Arg.Int(10), Arg.Int(20)]),
+    ]
+
+@skipUnless(columnar.available(), 'NumPy not installed')
+class TestColumnarHistory(TestCase):
+    def setUp(self):
+        protocol.load_all(output.Strict())
+        manager = ConnectionManager()
+        self.messages = []
+        for connection_id in ('a', 'b'):
+            manager.open_connection(0, connection_id, False)
+            batch = client_messages(len(self.messages))
+            manager.messages(connection_id, batch)
+            self.messages += batch
+        self.history = columnar.ColumnarHistory()
+        self.history.append(self.messages)
+
+    def tearDown(self):
+        protocol.dump_all()
+
+    def assertSameAsMatcher(self, text):
+        m = matcher.parse(text).simplify()
+        expected = [i for i, message in enumerate(self.messages) if m.matches(message)]
+        self.assertEqual(columnar.rows(self.history.mask(m)), expected, text)
+        return expected
+
+    def test_object_types(self):
+        self.assertEqual(len(self.assertSameAsMatcher('wl_surface')), 14)
+        self.assertSameAsMatcher('wl_surface.commit')
+        self.assertSameAsMatcher('wl_*.c*')
+        self.assertSameAsMatcher('*_callback')
+
+    def test_connections(self):
+        self.assertEqual(len(self.assertSameAsMatcher('B:wl_surface.commit')), 2)
+        self.assertSameAsMatcher('[A, B]:*.frame')
+        self.assertSameAsMatcher('C:*')
+
+    def test_object_ids(self):
+        self.assertSameAsMatcher('4.*')
+        self.assertSameAsMatcher('@5b.done')
+        self.assertSameAsMatcher('1.get_registry')
+        self.assertSameAsMatcher('5')
+
+    def test_lists_and_negation(self):
+        self.assertSameAsMatcher('wl_surface ! commit, frame')
+        self.assertSameAsMatcher('[wl_surface, wl_callback].*')
+        self.assertSameAsMatcher('* ! wl_surface.*')
+
+    def test_new_and_destroyed(self):
+        self.assertEqual(len(self.assertSameAsMatcher('wl_callback.new')), 4)
+        self.assertEqual(len(self.assertSameAsMatcher('wl_callback.destroyed')), 2)
+        self.assertSameAsMatcher('wl_compositor.new')
+
+    def test_falls_back_for_arguments(self):
+        self.assertEqual(len(self.assertSameAsMatcher('*.done(16)')), 2)
+        self.assertSameAsMatcher('*.bind(name="wl_compositor")')
+        self.assertSameAsMatcher('wl_surface.*(wl_buffer)')
+        self.assertSameAsMatcher('*.damage(height=20) ! A:*')
+
+    def test_connection_mask(self):
+        self.assertEqual(columnar.rows(self.history.connection_mask('A')), list(range(11)))
+        self.assertEqual(columnar.rows(self.history.connection_mask('C')), [])
+
+    def test_update_only_adds_new_messages(self):
+        history = columnar.ColumnarHistory()
+        history.update(self.messages[:5])
+        history.mask(matcher.parse('*'))
+        history.update(self.messages)
+        self.assertEqual(len(history), len(self.messages))
+        self.assertEqual(columnar.rows(history.mask(matcher.parse('wl_surface.commit'))), [5, 9, 16, 20])
+
+    def test_histogram_by_each_key(self):
+        m = matcher.parse('wl_surface.*, *.done').simplify()
+        mask = self.history.mask(m)
+        matching = [message for message in self.messages if m.matches(message)]
+        for by in columnar.histogram_keys:
+            self.assertEqual(self.history.histogram(mask, by), columnar.histogram(matching, by), by)
+        # Creating a surface matches too, since wl_surface matches new surfaces
+        self.assertEqual(
+            self.history.histogram(mask, 'name'),
+            {'create_surface': 2, 'attach': 2, 'frame': 4, 'commit': 4, 'damage': 2, 'done': 2})
+        self.assertEqual(self.history.histogram(mask, 'connection'), {'A': 8, 'B': 8})
+
+    def test_histogram_by_second(self):
+        history = columnar.ColumnarHistory()
+        history.append([message(time * 400000, 'wl_surface', 4, 'commit', []) for time in range(6)])
+        self.assertEqual(history.histogram(history.mask(matcher.parse('*')), 'second'), {0: 3, 1: 2, 2: 1})
+
+    def test_histogram_of_unknown_key_fails(self):
+        with self.assertRaises(RuntimeError):
+            self.history.histogram(self.history.mask(matcher.parse('*')), 'size')
+        with self.assertRaises(RuntimeError):
+            columnar.histogram(self.messages, 'size')
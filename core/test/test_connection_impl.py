@@ -9,7 +9,7 @@ class TestConnectionImpl(TestCase):
     def setUp(self):
         self.name = 'FOO'
         self.out = output.Strict()
-        self.c = ConnectionImpl(0.0, self.name, False)
+        self.c = ConnectionImpl(0, self.name, False)
         self.l = mock.Mock(spec=interfaces.Connection.Listener)
 
     def test_connection_impl_is_ConnectionImpl(self):
@@ -22,15 +22,15 @@ class TestConnectionImpl(TestCase):
         self.assertTrue(self.c.is_open())
 
     def test_can_create_client_ConnectionImpl(self):
-        c = ConnectionImpl(0.0, self.name, False)
+        c = ConnectionImpl(0, self.name, False)
         self.assertEqual(c.is_server(), False)
 
     def test_can_create_server_ConnectionImpl(self):
-        c = ConnectionImpl(0.0, self.name, True)
+        c = ConnectionImpl(0, self.name, True)
         self.assertEqual(c.is_server(), True)
 
     def test_can_create_connection_of_unknown_type(self):
-        c = ConnectionImpl(0.0, self.name, None)
+        c = ConnectionImpl(0, self.name, None)
         self.assertEqual(c.is_server(), None)
 
     def test_by_default_has_no_messages(self):
@@ -60,14 +60,24 @@ class TestConnectionImpl(TestCase):
         self.c.message(m1)
         self.assertEqual(self.c.messages(), (m0, m1))
 
+    def test_messages_not_stored_without_history(self):
+        c = ConnectionImpl(0, self.name, False, keep_history=False)
+        c.add_connection_listener(self.l)
+        m = MockMessage()
+        c.message(m)
+        c.message_batch([MockMessage()])
+        self.assertEqual(c.messages(), ())
+        self.l.connection_got_new_message.assert_called_once_with(c, m)
+        self.l.connection_got_new_messages.assert_called_once()
+
     def test_connection_can_be_closed(self):
         self.assertTrue(self.c.is_open())
-        self.c.close(1.0)
+        self.c.close(1000000)
         self.assertFalse(self.c.is_open())
 
     @skip('We need to use the standard logging system for this to work')
     def test_warning_on_message_after_close(self):
-        self.c.close(0.0)
+        self.c.close(0)
         m = MockMessage()
         self.c.message(m)
         # TODO: assert that this logs a warning
@@ -88,9 +98,21 @@ class TestConnectionImpl(TestCase):
         self.c.message(m)
         self.l.connection_app_id_set.assert_called_once_with(self.c, app_id)
 
+    def test_tracked_messages_are_not_stored(self):
+        self.c.add_connection_listener(self.l)
+        self.c.track(MockMessage())
+        self.assertEqual(self.c.messages(), ())
+        self.l.connection_got_new_message.assert_not_called()
+        self.l.connection_got_new_messages.assert_not_called()
+
+    def test_detects_app_id_from_tracked_message(self):
+        app_id = 'some.app.id'
+        self.c.track(MockMessage(name='set_app_id', args=[Arg.String(app_id)]))
+        self.assertEqual(self.c.app_id(), app_id)
+
     def test_description_changed_when_closed(self):
         before = str(self.c)
-        self.c.close(1.0)
+        self.c.close(1000000)
         self.assertNotEqual(before, str(self.c))
 
     def test_description_includes_title_from_message(self):
@@ -142,7 +164,7 @@ class TestConnectionImpl(TestCase):
 
     def test_listener_notified_of_closed_description_change(self):
         self.c.add_connection_listener(self.l)
-        self.c.close(1.0)
+        self.c.close(1000000)
         self.l.connection_str_changed.assert_called_once_with(self.c)
 
     def test_listener_not_notified_on_no_description_change(self):
@@ -157,6 +179,25 @@ class TestConnectionImpl(TestCase):
         self.c.message(m)
         self.l.connection_got_new_message.assert_called_once_with(self.c, m)
 
+    def test_listener_notified_of_message_batch(self):
+        self.c.add_connection_listener(self.l)
+        batch = [MockMessage(), MockMessage()]
+        self.c.message_batch(batch)
+        self.l.connection_got_new_messages.assert_called_once_with(self.c, batch)
+        self.l.connection_got_new_message.assert_not_called()
+        self.assertEqual(self.c.messages(), tuple(batch))
+
+    def test_message_batch_processes_rest_before_raising(self):
+        self.c.add_connection_listener(self.l)
+        good = MockMessage()
+        bad = Message(0, self.c.wl_display(), False, 'not_a_message', (Arg.Int(1),))
+        title = MockMessage(name='set_title', args=[Arg.String('some_app_title')])
+        with mock.patch('core.wl.protocol.interfaces', {'wl_display': mock.Mock(messages={})}):
+            with self.assertRaises(RuntimeError):
+                self.c.message_batch([good, bad, title])
+        self.l.connection_got_new_messages.assert_called_once_with(self.c, [good, title])
+        self.assertIn('some_app_title', str(self.c))
+
     def test_remove_listener(self):
         self.c.add_connection_listener(self.l)
         self.c.remove_connection_listener(self.l)
@@ -166,40 +207,40 @@ class TestConnectionImpl(TestCase):
 
     def test_listener_notified_of_close(self):
         self.c.add_connection_listener(self.l)
-        self.c.close(1.0)
+        self.c.close(1000000)
         self.l.connection_got_new_message.connection_closed(self.c)
 
     def test_can_create_registry(self):
-        self.c.create_object(0.0, self.c.wl_display(), 2, 'wl_registry')
+        self.c.create_object(0, self.c.wl_display(), 2, 'wl_registry')
 
     def test_can_not_create_2nd_display(self):
         with self.assertRaises(RuntimeError):
-            self.c.create_object(0.0, self.c.wl_display(), 1, 'wl_display')
+            self.c.create_object(0, self.c.wl_display(), 1, 'wl_display')
 
     @skip('Prints warning to stdout instead of just raising exception')
     def test_can_not_create_2nd_registry(self):
-        self.c.create_object(0.0, self.c.wl_display(), 2, 'wl_registry')
+        self.c.create_object(0, self.c.wl_display(), 2, 'wl_registry')
         with self.assertRaises(RuntimeError):
-            self.c.create_object(0.0, self.c.wl_display(), 2, 'wl_registry')
+            self.c.create_object(0, self.c.wl_display(), 2, 'wl_registry')
 
     def test_can_not_create_2nd_object_with_different_type_and_same_id(self):
-        self.c.create_object(0.0, self.c.wl_display(), 3, 'first_thing')
+        self.c.create_object(0, self.c.wl_display(), 3, 'first_thing')
         with self.assertRaises(RuntimeError):
-            self.c.create_object(0.0, self.c.wl_display(), 3, 'second_thing')
+            self.c.create_object(0, self.c.wl_display(), 3, 'second_thing')
 
     def test_destroyes_server_owned_object_when_new_one_is_created_with_same_id(self):
         # Since we don't get .delete_id events for server-owned objects we have to assume they were deleted
         # Objects with large IDs are server-owned
         # See https://wayland.freedesktop.org/docs/html/ch04.html#sect-Protocol-Creating-Objects
         id = 4278190081
-        self.c.create_object(0.0, self.c.wl_display(), id, 'first_thing')
-        self.c.create_object(1.0, self.c.wl_display(), id, 'second_thing')
+        self.c.create_object(0, self.c.wl_display(), id, 'first_thing')
+        self.c.create_object(1000000, self.c.wl_display(), id, 'second_thing')
         first = self.c.retrieve_object(id, 0, None)
         second = self.c.retrieve_object(id, 1, None)
         self.assertEqual(first.type, 'first_thing')
         self.assertEqual(second.type, 'second_thing')
         self.assertFalse(first.alive)
-        self.assertEqual(first.destroy_time, 1.0)
+        self.assertEqual(first.destroy_time, 1000000)
 
     def test_retrieve_object_raises_on_invalid_id(self):
         with self.assertRaises(RuntimeError):
@@ -225,5 +266,73 @@ class TestConnectionImpl(TestCase):
         self.assertEqual(self.c.wl_display().id, 1)
         self.assertEqual(self.c.wl_display().generation, 0)
 
+    def test_live_objects(self):
+        surface = self.c.create_object(0, self.c.wl_display(), 3, 'wl_surface')
+        callback = self.c.create_object(0, surface, 4, 'wl_callback')
+        self.assertEqual(self.c.live_objects(None), (self.c.wl_display(), surface, callback))
+        self.assertEqual(self.c.live_objects('wl_surface'), (surface,))
+        callback.destroy(1000000)
+        self.assertEqual(self.c.live_objects('wl_callback'), ())
+
+    def test_lifetimes_counted_on_create_and_destroy(self):
+        surface = self.c.create_object(1000000, self.c.wl_display(), 3, 'wl_surface')
+        self.c.create_object(1000000, self.c.wl_display(), 4, 'wl_surface')
+        surface.destroy(3000000)
+        surface.destroy(4000000)
+        counts = self.c.object_lifetimes().interfaces['wl_surface']
+        self.assertEqual((counts.created, counts.destroyed, counts.live), (2, 1, 1))
+        self.assertEqual(counts.lifetimes.max, 2.0)
+
+    def test_lifetimes_count_live_objects_from_saved_state(self):
+        surface = self.c.create_object(1000000, self.c.wl_display(), 3, 'wl_surface')
+        surface.destroy(2000000)
+        self.c.create_object(3000000, self.c.wl_display(), 3, 'wl_surface')
+        c = ConnectionImpl(0, self.name, False)
+        c.load_state(self.c.save_state())
+        self.assertEqual(c.object_lifetimes().live_counts(), {'wl_surface': 1})
+
+    def test_message_resolve_uses_connection_resolver(self):
+        sync = Message(1000000, UnresolvedObject(1, 'wl_display'), True, 'sync', (Arg.Object(UnresolvedObject(3, 'wl_callback'), True),))
+        sync.resolve(self.c)
+        done = Message(1500000, UnresolvedObject(3, 'wl_callback'), False, 'done', (Arg.Int(0),))
+        done.resolve(self.c)
+        self.assertEqual(done.roundtrip, 500000)
+        self.assertEqual(self.c.roundtrips().latencies.count, 1)
+
+    def test_lifetimes_and_roundtrips_are_in_saved_state(self):
+        surface = self.c.create_object(1000000, self.c.wl_display(), 3, 'wl_surface')
+        surface.destroy(2000000)
+        answered = self.c.create_object(3000000, self.c.wl_display(), 4, 'wl_callback')
+        waiting = self.c.create_object(3000000, self.c.wl_display(), 5, 'wl_callback')
+        roundtrips = self.c.roundtrips()
+        roundtrips.pending[answered] = 3000000
+        roundtrips.pending[waiting] = 3500000
+        roundtrips.answered(MockMessage(timestamp=4000000), answered)
+        c = ConnectionImpl(0, self.name, False)
+        c.load_state(self.c.save_state())
+        counts = c.object_lifetimes().interfaces['wl_surface']
+        self.assertEqual((counts.created, counts.destroyed, counts.live), (1, 1, 0))
+        self.assertEqual(counts.lifetimes.max, 1.0)
+        self.assertEqual(c.object_lifetimes().live_counts(), {'wl_callback': 2})
+        self.assertEqual(c.roundtrips().latencies.count, 1)
+        self.assertEqual(c.roundtrips().latencies.max, 1.0)
+        self.assertEqual(c.roundtrips().pending, {c.retrieve_object(5, -1, 'wl_callback'): 3500000})
+
+    def test_saved_state_can_be_loaded(self):
+        surface = self.c.create_object(1000000, self.c.wl_display(), 3, 'wl_surface')
+        surface.destroy(2000000)
+        surface = self.c.create_object(3000000, self.c.wl_display(), 3, 'wl_surface')
+        callback = self.c.create_object(4000000, surface, 4, 'wl_callback')
+        self.c.track(MockMessage(name='set_app_id', args=[Arg.String('some.app.id')]))
+        c = ConnectionImpl(0, self.name, False)
+        c.load_state(self.c.save_state())
+        self.assertEqual(c.app_id(), 'some.app.id')
+        self.assertEqual([str(obj) for obj in c.live_objects(None)], [str(obj) for obj in self.c.live_objects(None)])
+        restored = c.retrieve_object(4, -1, 'wl_callback')
+        self.assertEqual(restored.create_time, 4000000)
+        self.assertIs(restored.parent, c.retrieve_object(3, -1, None))
+        restored.destroy(5000000)
+        self.assertEqual(c.create_object(6000000, c.wl_display(), 4, 'wl_callback').generation, 1)
+
     def test_wl_display_in_db(self):
         self.assertEqual(self.c.retrieve_object(1, -1, None), self.c.wl_display())
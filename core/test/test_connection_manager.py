@@ -16,36 +16,36 @@ class TestConnectionManager(TestCase):
 
     def test_does_not_allow_empty_connection_id(self):
         with self.assertRaises(AssertionError):
-            self.cm.open_connection(0.0, '', True)
+            self.cm.open_connection(0, '', True)
 
     def test_client_connection(self):
-        self.cm.open_connection(0.0, 'foo', False)
+        self.cm.open_connection(0, 'foo', False)
         self.cm.message('foo', MockMessage())
-        self.cm.close_connection(0.0, 'foo')
+        self.cm.close_connection(0, 'foo')
 
     def test_server_connection(self):
-        self.cm.open_connection(0.0, 'foo', True)
+        self.cm.open_connection(0, 'foo', True)
         self.cm.message('foo', MockMessage())
-        self.cm.close_connection(0.0, 'foo')
+        self.cm.close_connection(0, 'foo')
 
     def test_connection_of_unknown_type(self):
-        self.cm.open_connection(0.0, 'foo', None)
+        self.cm.open_connection(0, 'foo', None)
         self.cm.message('foo', MockMessage())
-        self.cm.close_connection(0.0, 'foo')
+        self.cm.close_connection(0, 'foo')
 
     # TODO: replace test_open_connection_returns_connection with this
     # def test_open_connection_returns_none(self):
-    #     self.assertIs(self.cm.open_connection(0.0, 'foo', False), None)
+    #     self.assertIs(self.cm.open_connection(0, 'foo', False), None)
 
     # TODO: remove
     def test_open_connection_returns_connection(self):
-        self.assertIsInstance(self.cm.open_connection(0.0, 'foo', False), interfaces.Connection)
+        self.assertIsInstance(self.cm.open_connection(0, 'foo', False), interfaces.Connection)
 
     def test_keep_track_of_multiple_sessions(self):
-        self.cm.open_connection(0.0, 'foo', True)
-        self.cm.open_connection(0.5, 'bar', False)
-        self.cm.close_connection(1.0, 'bar')
-        self.cm.open_connection(1.5, 'baz', None)
+        self.cm.open_connection(0, 'foo', True)
+        self.cm.open_connection(500000, 'bar', False)
+        self.cm.close_connection(1000000, 'bar')
+        self.cm.open_connection(1500000, 'baz', None)
         self.assertEqual(len(self.cm.open_connections), 2)
         self.assertEqual(len(self.cm.connection_list), 3)
         self.assertIn('foo', self.cm.open_connections)
@@ -53,27 +53,27 @@ class TestConnectionManager(TestCase):
         self.assertNotIn('bar', self.cm.open_connections)
 
     def test_close_actually_closes_connection(self):
-        self.cm.open_connection(0.0, 'foo', False)
+        self.cm.open_connection(0, 'foo', False)
         conn = self.cm.connection_list[-1]
         self.assertTrue(conn.open)
-        self.cm.close_connection(1.0, 'foo')
+        self.cm.close_connection(1000000, 'foo')
         self.assertFalse(conn.open)
 
     def test_can_close_nonexistent_connection(self):
-        self.cm.close_connection(1.0, 'bar')
-        self.cm.close_connection(1.0, 'bar')
+        self.cm.close_connection(1000000, 'bar')
+        self.cm.close_connection(1000000, 'bar')
 
     # TODO: replace test_opening_duplicate_connections_closes_previous with this
     # def test_can_not_open_duplicate_connection(self):
-    #     self.cm.open_connection(0.0, 'foo', True)
+    #     self.cm.open_connection(0, 'foo', True)
     #     with self.assertRaises(AssertionError):
-    #         self.cm.open_connection(0.0, 'foo', True)
+    #         self.cm.open_connection(0, 'foo', True)
 
     # TODO: remove
     def test_opening_duplicate_connections_closes_previous(self):
-        self.cm.open_connection(0.0, 'foo', False)
+        self.cm.open_connection(0, 'foo', False)
         conn0 = self.cm.connection_list[-1]
-        self.cm.open_connection(0.0, 'foo', False)
+        self.cm.open_connection(0, 'foo', False)
         conn1 = self.cm.connection_list[-1]
         self.assertFalse(conn0.open)
         self.assertTrue(conn1.open)
@@ -83,47 +83,130 @@ class TestConnectionManager(TestCase):
             self.cm.message('foo', MockMessage())
 
     def test_can_not_send_message_to_closed_connection(self):
-        self.cm.open_connection(0.0, 'foo', True)
-        self.cm.close_connection(1.0, 'foo')
+        self.cm.open_connection(0, 'foo', True)
+        self.cm.close_connection(1000000, 'foo')
         with self.assertRaises(AssertionError):
             self.cm.message('foo', MockMessage())
 
+    def test_messages_go_to_connection(self):
+        connection = self.cm.open_connection(0, 'foo', True)
+        batch = [MockMessage(), MockMessage()]
+        self.cm.messages('foo', batch)
+        self.assertEqual(connection.messages(), tuple(batch))
+
+    def test_can_not_send_messages_to_nonexistent_connection(self):
+        with self.assertRaises(AssertionError):
+            self.cm.messages('foo', [MockMessage()])
+
     def test_connections_returns_tuple(self):
         self.assertIsInstance(self.cm.connections(), tuple)
 
     def test_connections_returns_all_connections(self):
-        self.cm.open_connection(0.0, 'foo', False)
+        self.cm.open_connection(0, 'foo', False)
         conn0 = self.cm.connection_list[-1]
-        self.cm.open_connection(0.0, 'bar', True)
+        self.cm.open_connection(0, 'bar', True)
         conn1 = self.cm.connection_list[-1]
-        self.cm.close_connection(1.0, 'foo')
+        self.cm.close_connection(1000000, 'foo')
         self.assertEqual(self.cm.connections(), (conn0, conn1))
 
     def test_add_connection_list_listener(self):
         listener = mock_listener()
         self.cm.add_connection_list_listener(listener, False)
-        self.cm.open_connection(0.0, 'foo', False)
+        self.cm.open_connection(0, 'foo', False)
         listener.connection_opened.assert_called_once()
 
     def test_remove_connection_list_listener(self):
         listener = mock_listener()
         self.cm.add_connection_list_listener(listener, False)
         self.cm.remove_connection_list_listener(listener)
-        self.cm.open_connection(0.0, 'foo', False)
+        self.cm.open_connection(0, 'foo', False)
         listener.connection_opened.assert_not_called()
 
     def test_connection_list_listener_dont_catch_up(self):
-        self.cm.open_connection(0.0, 'foo', False)
-        self.cm.open_connection(0.0, 'bar', False)
-        self.cm.close_connection(0.0, 'foo')
+        self.cm.open_connection(0, 'foo', False)
+        self.cm.open_connection(0, 'bar', False)
+        self.cm.close_connection(0, 'foo')
         listener = mock_listener()
         self.cm.add_connection_list_listener(listener, False)
         listener.connection_opened.assert_not_called()
 
     def test_connection_list_listener_catch_up(self):
-        self.cm.open_connection(0.0, 'foo', False)
-        self.cm.open_connection(0.0, 'bar', False)
-        self.cm.close_connection(0.0, 'foo')
+        self.cm.open_connection(0, 'foo', False)
+        self.cm.open_connection(0, 'bar', False)
+        self.cm.close_connection(0, 'foo')
         listener = mock_listener()
         self.cm.add_connection_list_listener(listener, True)
         self.assertEqual(len(listener.connection_opened.call_args_list), 2)
+
+    def test_namespaces_keep_connection_ids_apart(self):
+        first = self.cm.namespace('1/')
+        second = self.cm.namespace('2/')
+        a = first.open_connection(0, 'foo', False)
+        b = second.open_connection(0, 'foo', True)
+        self.assertIsNot(a, b)
+        self.assertEqual(first.opened, [a])
+        second.close_connection(1000000, 'foo')
+        self.assertTrue(a.is_open())
+        self.assertFalse(b.is_open())
+
+    def test_namespace_state_only_has_its_connections(self):
+        self.cm.namespace('1/').open_connection(0, 'foo', False)
+        self.cm.namespace('2/').open_connection(0, 'bar', False)
+        self.assertEqual([i['connection_id'] for i in self.cm.namespace('1/').save_state()['connections']], ['foo'])
+
+    def test_object_lifetimes_of_all_connections(self):
+        a = self.cm.open_connection(0, 'foo', False)
+        b = self.cm.open_connection(0, 'bar', False)
+        surface = a.create_object(1000000, a.wl_display(), 3, 'wl_surface')
+        surface.destroy(2000000)
+        b.create_object(3000000, b.wl_display(), 3, 'wl_surface')
+        lifetimes = self.cm.object_lifetimes()
+        self.assertEqual((lifetimes.live, lifetimes.peak_live), (1, 1))
+        other = ConnectionManager()
+        other.load_state(self.cm.save_state())
+        self.assertEqual((other.object_lifetimes().live, other.object_lifetimes().peak_live), (1, 1))
+        other.connections()[0].create_object(4000000, other.connections()[0].wl_display(), 3, 'wl_surface')
+        self.assertEqual(other.object_lifetimes().peak_live, 2)
+
+    def test_saved_state_includes_closed_connections_in_order(self):
+        self.cm.open_connection(0, 'foo', False)
+        self.cm.close_connection(1000000, 'foo')
+        self.cm.open_connection(2000000, 'foo', False)
+        self.cm.open_connection(3000000, 'bar', True)
+        other = ConnectionManager()
+        other.load_state(self.cm.save_state())
+        self.assertEqual(
+            [(c.name(), c.is_open(), c.open_time) for c in other.connections()],
+            [('A', False, 0), ('B', True, 2000000), ('C', True, 3000000)])
+        self.assertEqual(other.connections()[0].close_time, 1000000)
+        self.assertEqual(set(other.open_connections), {'foo', 'bar'})
+
+    def test_timestamps_relative_to_first_time(self):
+        self.cm.open_connection(100000000, 'foo', False)
+        message = MockMessage(timestamp=102500000)
+        self.cm.message('foo', message)
+        self.assertEqual(message.timestamp, 2500000)
+        self.assertEqual(self.cm.connections()[0].open_time, 0)
+
+    def test_timestamps_relative_to_start_time(self):
+        self.cm.set_start_time(90000000)
+        self.cm.open_connection(100000000, 'foo', False)
+        batch = [MockMessage(timestamp=100000000), MockMessage(timestamp=101000000)]
+        self.cm.messages('foo', batch)
+        self.assertEqual([message.timestamp for message in batch], [10000000, 11000000])
+
+    def test_sessions_have_their_own_clocks(self):
+        self.cm.open_connection(100000000, 'foo', False)
+        other = ConnectionManager()
+        other.open_connection(5000000, 'foo', False)
+        message = MockMessage(timestamp=6000000)
+        other.message('foo', message)
+        self.assertEqual(message.timestamp, 1000000)
+
+    def test_namespace_offset(self):
+        self.cm.set_start_time(0)
+        sink = self.cm.namespace('1/', 5000000)
+        sink.open_connection(1000000, 'foo', False)
+        message = MockMessage(timestamp=2000000)
+        sink.message('foo', message)
+        self.assertEqual(message.timestamp, 7000000)
@@ -0,0 +1,52 @@
+from unittest import TestCase, mock
+
+import interfaces
+from core.correlate import Correlator
+from core.wl.message import MockMessage
+from core.wl.object import MockObject
+
+def messages(sent, count):
+    '''Alternating requests and events, as sent (or received if sent is False) by the client'''
+    return [MockMessage(obj=MockObject(id=i), sent=(i % 2 == 0) == sent, name='m' + str(i)) for i in range(count)]
+
+class TestCorrelator(TestCase):
+    def setUp(self):
+        self.correlator = Correlator()
+        self.connection_list = mock.Mock(spec=interfaces.ConnectionList)
+
+    def connection(self, name, is_server, sent_messages):
+        connection = mock.Mock(spec=interfaces.Connection)
+        connection.name.return_value = name
+        connection.is_server.return_value = is_server
+        self.correlator.connection_opened(self.connection_list, connection)
+        self.correlator.connection_got_new_messages(connection, sent_messages)
+        return connection
+
+    def test_matches_client_and_server_of_same_connection(self):
+        client = self.connection('A', False, messages(True, 10))
+        # What the client sent, the server received
+        server = self.connection('B', True, messages(False, 10))
+        self.assertEqual(self.correlator.similarity(client, server), 1.0)
+        self.assertEqual(self.correlator.matches({client: 'client', server: 'server'}), [(client, server, 1.0)])
+
+    def test_ignores_connections_from_same_source(self):
+        client = self.connection('A', False, messages(True, 10))
+        server = self.connection('B', True, messages(False, 10))
+        self.assertEqual(self.correlator.matches({client: 'log', server: 'log'}), [])
+
+    def test_different_messages_do_not_match(self):
+        client = self.connection('A', False, messages(True, 10))
+        server = self.connection('B', True, messages(True, 10))
+        self.assertEqual(self.correlator.matches({client: 'client', server: 'server'}), [])
+
+    def test_each_connection_matched_once(self):
+        client = self.connection('A', False, messages(True, 10))
+        close = self.connection('B', True, messages(False, 9))
+        exact = self.connection('C', True, messages(False, 10))
+        matches = self.correlator.matches({client: 'client', close: 'server', exact: 'server'})
+        self.assertEqual([(a, b) for a, b, _ in matches], [(client, exact)])
+
+    def test_only_first_messages_kept(self):
+        client = self.connection('A', False, messages(True, 100))
+        self.correlator.connection_got_new_message(client, MockMessage())
+        self.assertEqual(len(self.correlator.signatures[client]), 64)
@@ -121,3 +121,15 @@ class TestDisseminator(unittest.TestCase):
         diss = new_disseminator_of_type(Listener, 'abc', bar=4)
         self.assertEqual(diss.foo, 'abc')
         self.assertEqual(diss.bar, 4)
+
+    def test_single_listener_is_called_directly(self):
+        self.add_listener()
+        self.assertEqual(self.diss.method_a, self.l.method_a)
+
+    def test_nested_disseminator_sees_listeners_added_later(self):
+        inner = type(self).Listener.Disseminator()
+        self.diss.add_listener(inner)
+        l = type(self).Listener()
+        inner.add_listener(l)
+        self.diss.method_a()
+        self.assertEqual(l.a, 1)
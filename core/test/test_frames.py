@@ -0,0 +1,128 @@
+from unittest import TestCase, mock
+
+import interfaces
+from core import frames
+from core.frames import FrameTiming
+from core.clock import from_seconds
+from core.wl import Arg
+from core.wl.message import MockMessage
+from core.wl.object import MockObject
+
+class TestFrameTiming(TestCase):
+    def setUp(self):
+        self.timing = FrameTiming()
+        self.connection = mock.Mock(spec=interfaces.Connection)
+        self.connection.name.return_value = 'A'
+        self.surface = MockObject(id=3, type='wl_surface')
+        self.xdg_surface = MockObject(id=4, type='xdg_surface')
+
+    def send(self, *messages):
+        self.timing.connection_got_new_messages(self.connection, list(messages))
+
+    def commit(self, seconds):
+        return MockMessage(timestamp=from_seconds(seconds), obj=self.surface, name='commit')
+
+    def frames(self):
+        return self.timing.surfaces[('A', 3, 0)]
+
+    def test_listens_to_opened_connections(self):
+        connection_list = mock.Mock(spec=interfaces.ConnectionList)
+        self.timing.connection_opened(connection_list, self.connection)
+        self.connection.add_connection_listener.assert_called_once_with(self.timing)
+
+    def test_commit_intervals(self):
+        self.send(*[self.commit(i / 64) for i in range(65)])
+        result = self.frames()
+        self.assertEqual(result.commits, 65)
+        self.assertAlmostEqual(result.intervals.percentile(50), 1 / 64, delta=0.003)
+        self.assertAlmostEqual(result.recent_fps(), 64)
+        self.assertEqual(result.jitter(), 0)
+
+    def test_jitter(self):
+        # Intervals of 10ms, 30ms, 10ms
+        self.send(self.commit(0.0), self.commit(0.01), self.commit(0.04), self.commit(0.05))
+        self.assertAlmostEqual(self.frames().jitter(), 0.02)
+        self.assertAlmostEqual(self.frames().recent_jitter(), 0.02)
+
+    def test_recent_only_covers_last_frames(self):
+        with mock.patch.object(frames, 'recent_frames', 2):
+            self.timing = FrameTiming()
+            self.send(self.commit(0.0), self.commit(1.0), self.commit(1.1), self.commit(1.2))
+        self.assertAlmostEqual(self.frames().recent_fps(), 10)
+        self.assertEqual(self.frames().intervals.count, 3)
+
+    def test_frame_callback_latency(self):
+        callback = MockObject(id=5, type='wl_callback')
+        self.send(
+            MockMessage(timestamp=from_seconds(1.0), obj=self.surface, name='frame', args=(Arg.Object(callback, True),)),
+            MockMessage(timestamp=from_seconds(1.016), obj=callback, name='done', args=(Arg.Int(0),)))
+        self.assertAlmostEqual(self.frames().frame_done.max, 0.016)
+        self.assertEqual(self.timing.pending_callbacks, {})
+
+    def test_configure_ack_and_commit(self):
+        xdg_wm_base = MockObject(id=6, type='xdg_wm_base')
+        self.send(
+            MockMessage(timestamp=from_seconds(0.0), obj=xdg_wm_base, name='get_xdg_surface', args=(
+                Arg.Object(self.xdg_surface, True), Arg.Object(self.surface, False))),
+            MockMessage(timestamp=from_seconds(1.0), obj=self.xdg_surface, name='configure', args=(Arg.Int(7),)),
+            MockMessage(timestamp=from_seconds(1.5), obj=self.xdg_surface, name='configure', args=(Arg.Int(8),)),
+            MockMessage(timestamp=from_seconds(2.0), obj=self.xdg_surface, name='ack_configure', args=(Arg.Int(8),)),
+            self.commit(2.25))
+        result = self.frames()
+        self.assertEqual(result.configure_ack.max, 0.5)
+        self.assertEqual(result.ack_commit.max, 0.25)
+        self.assertEqual(result.configures, {})
+
+    def test_report(self):
+        self.assertEqual(self.timing.report(), [])
+        self.send(self.commit(0.0), self.commit(0.5))
+        report = self.timing.report()
+        self.assertEqual(len(report), 2)
+        self.assertIn('A wl_surface@3', report[1])
+        self.assertEqual(self.timing.report('B'), [])
+
+    def delete(self, seconds, obj):
+        display = MockObject(id=1, type='wl_display')
+        return MockMessage(timestamp=from_seconds(seconds), obj=display, name='delete_id', destroyed_obj=obj)
+
+    def test_destroyed_surface_is_forgotten_but_reported(self):
+        callback = MockObject(id=5, type='wl_callback')
+        self.send(
+            self.commit(0.0), self.commit(0.5),
+            MockMessage(timestamp=from_seconds(1.0), obj=self.surface, name='frame', args=(Arg.Object(callback, True),)),
+            self.delete(1.5, self.surface))
+        self.assertEqual(self.timing.surfaces, {})
+        self.assertEqual(self.timing.pending_callbacks, {})
+        self.assertIn('A wl_surface@3', self.timing.report()[1])
+
+    def test_retired_surfaces_are_limited(self):
+        with mock.patch.object(frames, 'retired_surfaces', 2):
+            self.timing = FrameTiming()
+            for i in range(5):
+                self.surface = MockObject(id=3, type='wl_surface', generation=i)
+                self.send(self.commit(i), self.delete(i + 0.5, self.surface))
+        self.assertEqual(len(self.timing.retired), 2)
+        self.assertEqual(len(self.timing.report()), 3)
+
+    def test_closed_connection_is_forgotten(self):
+        xdg_wm_base = MockObject(id=6, type='xdg_wm_base')
+        callback = MockObject(id=5, type='wl_callback')
+        self.send(
+            MockMessage(timestamp=from_seconds(0.0), obj=xdg_wm_base, name='get_xdg_surface', args=(
+                Arg.Object(self.xdg_surface, True), Arg.Object(self.surface, False))),
+            MockMessage(timestamp=from_seconds(1.0), obj=self.surface, name='frame', args=(Arg.Object(callback, True),)),
+            self.commit(1.0))
+        self.timing.connection_closed(self.connection)
+        self.assertEqual((self.timing.surfaces, self.timing.xdg_surfaces, self.timing.pending_callbacks), ({}, {}, {}))
+        self.assertEqual(len(self.timing.report('A')), 2)
+
+    def test_unacked_configures_are_limited(self):
+        xdg_wm_base = MockObject(id=6, type='xdg_wm_base')
+        self.send(MockMessage(timestamp=0, obj=xdg_wm_base, name='get_xdg_surface', args=(
+            Arg.Object(self.xdg_surface, True), Arg.Object(self.surface, False))))
+        self.send(*[
+            MockMessage(timestamp=from_seconds(i), obj=self.xdg_surface, name='configure', args=(Arg.Int(i),))
+            for i in range(frames.max_pending_configures * 2)])
+        configures = self.frames().configures
+        self.assertEqual(len(configures), frames.max_pending_configures)
+        self.assertIn(frames.max_pending_configures * 2 - 1, configures)
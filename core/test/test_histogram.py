@@ -0,0 +1,57 @@
+import json
+import math
+from unittest import TestCase
+from core.histogram import LogHistogram
+
+class TestLogHistogram(TestCase):
+    def test_empty(self):
+        h = LogHistogram()
+        self.assertEqual(h.count, 0)
+        self.assertIsNone(h.mean())
+        self.assertIsNone(h.percentile(50))
+        self.assertEqual(h.counts(), [])
+
+    def test_values_fall_in_their_bucket(self):
+        for value in [0.001, 0.3, 1, 2, 3, 7, 8, 100, 12345, 10 ** 9]:
+            h = LogHistogram()
+            h.add(value)
+            (low, high, count), = h.counts()
+            self.assertLessEqual(low, value)
+            self.assertLess(value, high)
+            self.assertEqual(count, 1)
+
+    def test_mean_min_max(self):
+        h = LogHistogram()
+        for value in [2, 4, 9]:
+            h.add(value)
+        self.assertEqual(h.mean(), 5)
+        self.assertEqual(h.min, 2)
+        self.assertEqual(h.max, 9)
+
+    def test_percentiles_are_close(self):
+        h = LogHistogram()
+        for value in range(1, 1001):
+            h.add(value)
+        for percent in [10, 50, 90, 99]:
+            estimate = h.percentile(percent)
+            self.assertAlmostEqual(estimate, percent * 10, delta=percent * 10 * 0.25)
+        self.assertEqual(h.percentile(100), 1000)
+
+    def test_non_positive_values(self):
+        h = LogHistogram()
+        h.add(0)
+        h.add(-3)
+        h.add(5)
+        self.assertEqual(h.non_positive, 2)
+        self.assertEqual(h.percentile(50), -3)
+        self.assertEqual(sum(count for _, _, count in h.counts()), 1)
+
+    def test_saved_state(self):
+        h = LogHistogram()
+        h.add(0)
+        h.add(3)
+        h.add(300)
+        restored = LogHistogram.from_state(json.loads(json.dumps(h.save_state())))
+        self.assertEqual(restored.counts(), h.counts())
+        self.assertEqual((restored.count, restored.min, restored.max, restored.percentile(50)), (3, 0, 300, h.percentile(50)))
+        self.assertEqual(LogHistogram.from_state(LogHistogram().save_state()).max, -math.inf)
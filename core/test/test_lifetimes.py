@@ -0,0 +1,89 @@
+from unittest import TestCase
+
+from core.clock import from_seconds
+from core.lifetimes import ObjectLifetimes, format_seconds
+from core.wl.object import MockObject
+
+class TestObjectLifetimes(TestCase):
+    def setUp(self):
+        self.lifetimes = ObjectLifetimes()
+
+    def create(self, seconds, type='wl_surface'):
+        obj = MockObject(type=type, create_time=from_seconds(seconds))
+        self.lifetimes.created(obj)
+        return obj
+
+    def destroy(self, obj, seconds):
+        obj.destroy_time = from_seconds(seconds)
+        self.lifetimes.destroyed(obj)
+
+    def test_counts(self):
+        first = self.create(0.0)
+        self.create(1.0)
+        self.create(1.0, 'wl_callback')
+        self.destroy(first, 2.0)
+        surface = self.lifetimes.interfaces['wl_surface']
+        self.assertEqual((surface.created, surface.destroyed, surface.live, surface.peak_live), (2, 1, 1, 2))
+        self.assertEqual(self.lifetimes.live_counts(), {'wl_surface': 1, 'wl_callback': 1})
+
+    def test_total_peak(self):
+        first = self.create(0.0)
+        self.create(0.0, 'wl_callback')
+        self.destroy(first, 1.0)
+        self.create(2.0)
+        self.assertEqual((self.lifetimes.live, self.lifetimes.peak_live), (2, 2))
+
+    def test_session_counts_every_connection(self):
+        session = ObjectLifetimes()
+        first = ObjectLifetimes(session)
+        second = ObjectLifetimes(session)
+        obj = MockObject(type='wl_surface', create_time=0)
+        first.created(obj)
+        obj.destroy_time = from_seconds(1.0)
+        first.destroyed(obj)
+        second.created(MockObject(type='wl_surface', create_time=from_seconds(2.0)))
+        surface = session.interfaces['wl_surface']
+        self.assertEqual((surface.created, surface.destroyed, surface.live, surface.peak_live), (2, 1, 1, 1))
+        self.assertEqual((session.live, session.peak_live), (1, 1))
+        self.assertEqual(surface.lifetimes.count, 1)
+
+    def test_destroyed_interfaces_not_in_live_counts(self):
+        self.destroy(self.create(0.0), 1.0)
+        self.assertEqual(self.lifetimes.live_counts(), {})
+
+    def test_lifetime_percentiles(self):
+        for i in range(100):
+            self.destroy(self.create(0.0), (i + 1) / 100)
+        hist = self.lifetimes.interfaces['wl_surface'].lifetimes
+        # Percentiles of a LogHistogram are approximate
+        self.assertAlmostEqual(hist.percentile(50), 0.5, delta=0.1)
+        self.assertAlmostEqual(hist.percentile(99), 0.99, delta=0.15)
+
+    def test_live_over_time(self):
+        objects = [self.create(0.5) for _ in range(3)]
+        self.destroy(objects[0], 1.5)
+        self.destroy(objects[1], 4.5)
+        # Each period's peak includes what was live at its start, so the drops show in the period after them
+        result = self.lifetimes.interfaces['wl_surface'].live_over_time(10)
+        self.assertEqual([count for _, _, count in result], [3, 3, 2, 2, 2])
+        self.assertEqual(result[0][:2], (0.0, 1.0))
+
+    def test_live_over_time_combines_periods(self):
+        self.create(0.0)
+        obj = self.create(5.0)
+        self.destroy(obj, 9.0)
+        result = self.lifetimes.interfaces['wl_surface'].live_over_time(2)
+        self.assertEqual(result, [(0.0, 5.0, 1), (5.0, 10.0, 2)])
+
+    def test_report_puts_most_live_first(self):
+        self.destroy(self.create(0.0, 'wl_callback'), 0.001)
+        self.create(0.0)
+        rows = self.lifetimes.report()
+        self.assertEqual(rows[0][0], 'interface')
+        self.assertEqual([row[0] for row in rows[1:]], ['wl_surface', 'wl_callback'])
+        self.assertEqual(rows[1][5], '-')
+
+    def test_format_seconds(self):
+        self.assertEqual(format_seconds(None), '-')
+        self.assertEqual(format_seconds(0.0015), '1.5ms')
+        self.assertEqual(format_seconds(2.5), '2.50s')
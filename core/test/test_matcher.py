@@ -30,6 +30,10 @@ class TestStrMatcher(TestCase):
         self.assertFalse(m.matches('barfoo'))
         self.assertFalse(m.matches('foo '))
 
+    def test_plain_string_matches_equal_string_that_is_not_interned(self):
+        m = str_matcher('foo')
+        self.assertTrue(m.matches(''.join(['f', 'oo'])))
+
     def test_with_wildcard(self):
         m = str_matcher('foo*')
         self.assertTrue(m.matches('foo'))
@@ -48,6 +52,44 @@ class TestStrMatcher(TestCase):
         self.assertTrue(m.matches(''))
         self.assertTrue(m.matches('barfoo'))
 
+    def test_with_suffix_wildcard(self):
+        m = str_matcher('*bar')
+        self.assertTrue(m.matches('bar'))
+        self.assertTrue(m.matches('foobar'))
+        self.assertFalse(m.matches('barfoo'))
+        self.assertFalse(m.matches('ba'))
+
+    def test_with_wildcards_around(self):
+        m = str_matcher('*oob*')
+        self.assertTrue(m.matches('oob'))
+        self.assertTrue(m.matches('foobar'))
+        self.assertFalse(m.matches('foo'))
+        self.assertFalse(m.matches('obo'))
+
+    def test_with_several_wildcards(self):
+        m = str_matcher('f*o*b')
+        self.assertTrue(m.matches('fob'))
+        self.assertTrue(m.matches('foob'))
+        self.assertTrue(m.matches('f_o_b'))
+        self.assertFalse(m.matches('fobar'))
+        self.assertFalse(m.matches('ffb'))
+        self.assertIs(m.matches('foo\nb'), True)
+        self.assertIs(m.matches('foo'), False)
+
+    def test_with_repeated_wildcards(self):
+        self.assertTrue(str_matcher('**').matches(''))
+        self.assertTrue(str_matcher('foo**').matches('foobar'))
+        self.assertFalse(str_matcher('foo**').matches('barfoo'))
+
+    def test_wildcard_without_wildcard_matches_exactly(self):
+        m = WildcardMatcher('foo')
+        self.assertTrue(m.matches(''.join(['f', 'oo'])))
+        self.assertFalse(m.matches('foobar'))
+
+    def test_wildcard_patterns_are_only_compiled_once(self):
+        self.assertIs(wildcard_check('wl_*_v1'), wildcard_check('wl_*_v1'))
+        self.assertIs(str_matcher('wl_*').matches, str_matcher('wl_*').matches)
+
 class TestParsedMessageMatcher(TestCase):
     def test_obj_type(self):
         m = parse('wl_pointer')
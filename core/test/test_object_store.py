@@ -0,0 +1,89 @@
+from unittest import TestCase
+from core.object_store import ObjectStore, type_matches
+from core.wl.object import MockObject
+
+class TestTypeMatches(TestCase):
+    def test_exact(self):
+        self.assertTrue(type_matches('wl_surface', 'wl_surface'))
+        self.assertFalse(type_matches('wl_surface', 'wl_subsurface'))
+
+    def test_wildcard(self):
+        self.assertTrue(type_matches('wl_*surface', 'wl_subsurface'))
+        self.assertTrue(type_matches('wl_*surface', 'wl_surface'))
+        self.assertFalse(type_matches('xdg_*', 'wl_surface'))
+
+class TestObjectStore(TestCase):
+    def setUp(self):
+        self.store = ObjectStore()
+
+    def obj(self, id, generation=0, type='wl_surface'):
+        obj = MockObject(id=id, generation=generation, type=type)
+        self.store.add(obj)
+        return obj
+
+    def test_get_latest(self):
+        self.obj(3)
+        second = self.obj(3, 1)
+        self.assertIs(self.store.get(3, -1), second)
+
+    def test_get_by_generation(self):
+        first = self.obj(3)
+        second = self.obj(3, 1)
+        third = self.obj(3, 2)
+        self.assertIs(self.store.get(3, 0), first)
+        self.assertIs(self.store.get(3, 1), second)
+        self.assertIs(self.store.get(3, -3), first)
+        self.assertEqual(self.store.generations(3), 3)
+
+    def test_generations_of_unknown_id(self):
+        self.assertEqual(self.store.generations(3), 0)
+
+    def test_get_raises_on_unknown_id(self):
+        with self.assertRaises(RuntimeError):
+            self.store.get(3, -1)
+
+    def test_get_raises_on_invalid_generation(self):
+        self.obj(3)
+        with self.assertRaises(RuntimeError):
+            self.store.get(3, 1)
+
+    def test_live_leaves_out_destroyed_and_replaced_objects(self):
+        a = self.obj(3)
+        b = self.obj(4)
+        c = self.obj(5, type='wl_buffer')
+        b.destroy(1.0)
+        a.destroy(1.0)
+        d = self.obj(3, 1, type='wl_callback')
+        self.assertEqual(self.store.live(), (d, c))
+        self.assertEqual(self.store.live('wl_surface'), ())
+        self.assertEqual(self.store.live('wl_*'), (d, c))
+
+    def test_live_counts(self):
+        self.obj(3)
+        self.obj(4)
+        self.obj(5, type='wl_buffer').destroy(1.0)
+        self.assertEqual(self.store.live_counts(), {'wl_surface': 2})
+
+    def test_restored_object_keeps_generation(self):
+        restored = MockObject(id=3, generation=4, type='wl_surface')
+        self.store.restore(restored)
+        self.assertEqual(self.store.generations(3), 5)
+        self.assertIs(self.store.get(3, 4), restored)
+        newer = self.obj(3, 5)
+        self.assertIs(self.store.get(3, 5), newer)
+        self.assertIs(self.store.get(3, 4), restored)
+
+    def test_generation_before_restored_raises(self):
+        self.store.restore(MockObject(id=3, generation=4, type='wl_surface'))
+        with self.assertRaises(RuntimeError):
+            self.store.get(3, 2)
+
+    def test_replaced_objects_not_kept(self):
+        self.store = ObjectStore(keep_replaced=False)
+        self.obj(3)
+        latest = self.obj(3, 1)
+        self.assertEqual(self.store.generations(3), 2)
+        self.assertIs(self.store.get(3, 1), latest)
+        self.assertEqual(self.store.previous, {})
+        with self.assertRaises(RuntimeError):
+            self.store.get(3, 0)
@@ -0,0 +1,76 @@
+from unittest import TestCase
+import types
+
+from core import profiling
+
+class TestProfiler(TestCase):
+    def setUp(self):
+        self.module = types.SimpleNamespace()
+        def inner(x):
+            return x * 2
+        def outer(x):
+            return self.module.inner(x) + 1
+        self.module.inner = inner
+        self.module.outer = outer
+        self.original_inner = inner
+        self.profiler = profiling.Profiler()
+        self.profiler.instrument(self.module, 'inner', 'inner')
+        self.profiler.instrument(self.module, 'outer', 'outer')
+
+    def test_instrumented_functions_still_work(self):
+        self.assertEqual(self.module.outer(3), 7)
+
+    def test_counts_calls(self):
+        for i in range(5):
+            self.module.outer(i)
+        self.module.inner(1)
+        self.assertEqual(self.profiler.stages['outer'].calls, 5)
+        self.assertEqual(self.profiler.stages['inner'].calls, 6)
+
+    def test_self_time_excludes_nested_stages(self):
+        for i in range(100):
+            self.module.outer(i)
+        outer = self.profiler.stages['outer']
+        inner = self.profiler.stages['inner']
+        self.assertGreater(outer.total_ns, 0)
+        self.assertLess(outer.self_ns, outer.total_ns)
+        self.assertAlmostEqual(outer.total_ns - outer.self_ns, inner.total_ns, delta=1)
+        self.assertEqual(inner.self_ns, inner.total_ns)
+
+    def test_durations_are_sampled(self):
+        for i in range(80):
+            self.module.inner(i)
+        self.assertEqual(self.profiler.stages['inner'].durations.count, 80 // profiling.duration_sample_rate)
+
+    def test_exceptions_are_recorded_and_propagated(self):
+        def fail():
+            raise ValueError()
+        self.module.fail = fail
+        self.profiler.instrument(self.module, 'fail', 'fail')
+        with self.assertRaises(ValueError):
+            self.module.fail()
+        self.assertEqual(self.profiler.stages['fail'].calls, 1)
+        self.module.inner(1)
+        self.assertEqual(self.profiler.stages['inner'].self_ns, self.profiler.stages['inner'].total_ns)
+
+    def test_idle_stages_do_not_extend_elapsed(self):
+        self.module.show = lambda: None
+        self.profiler.instrument(self.module, 'show', 'show', counts_as_work=False)
+        self.module.inner(1)
+        last_ns = self.profiler.last_ns
+        self.module.show()
+        self.assertEqual(self.profiler.last_ns, last_ns)
+        self.assertEqual(self.profiler.stages['show'].calls, 1)
+
+    def test_restore(self):
+        self.profiler.restore()
+        self.assertIs(self.module.inner, self.original_inner)
+
+    def test_summary(self):
+        for i in range(10):
+            self.module.outer(i)
+        lines = self.profiler.summary('outer')
+        self.assertTrue(lines[0].startswith('10 messages in '))
+        self.assertIn('p99', lines[1])
+        self.assertTrue(lines[2].startswith('inner'))
+        self.assertTrue(lines[3].startswith('outer'))
@@ -0,0 +1,107 @@
+import json
+from unittest import TestCase, mock
+
+import interfaces
+from core.clock import from_seconds
+from core.lifetimes import ObjectLifetimes
+from core.stats import MessageStats
+from core.wl import Arg
+from core.wl.message import MockMessage
+from core.wl.object import MockObject
+
+class TestMessageStats(TestCase):
+    def setUp(self):
+        self.stats = MessageStats()
+        self.connection = mock.Mock(spec=interfaces.Connection)
+        self.connection.name.return_value = 'A'
+        self.session = ObjectLifetimes()
+        self.lifetimes = ObjectLifetimes(self.session)
+        self.connection.object_lifetimes.return_value = self.lifetimes
+        self.connection_list = mock.Mock(spec=interfaces.ConnectionList)
+        self.connection_list.object_lifetimes.return_value = self.session
+        self.stats.connection_opened(self.connection_list, self.connection)
+
+    def send(self, *messages):
+        self.stats.connection_got_new_messages(self.connection, list(messages))
+
+    def create(self, seconds, obj, lifetimes=None):
+        # The connection updates its lifetimes when it resolves the message
+        (lifetimes or self.lifetimes).created(obj)
+        return MockMessage(timestamp=from_seconds(seconds), name='create', args=(Arg.Object(obj, True),))
+
+    def destroy(self, seconds, obj, lifetimes=None):
+        obj.destroy(from_seconds(seconds))
+        (lifetimes or self.lifetimes).destroyed(obj)
+        return MockMessage(timestamp=from_seconds(seconds), name='delete_id', destroyed_obj=obj)
+
+    def test_listens_to_opened_connections(self):
+        self.connection.add_connection_listener.assert_called_once_with(self.stats)
+        self.assertEqual(self.stats.by_connection, {'A': 0})
+
+    def test_counts_messages(self):
+        self.send(MockMessage(name='foo'), MockMessage(name='foo'))
+        self.stats.connection_got_new_message(self.connection, MockMessage(name='bar'))
+        self.assertEqual(self.stats.messages, 3)
+        self.assertEqual(self.stats.by_connection, {'A': 3})
+        self.assertEqual(self.stats.by_message, {('mock_type', 'foo'): 2, ('mock_type', 'bar'): 1})
+
+    def test_messages_per_second(self):
+        self.send(*[MockMessage(timestamp=100000) for _ in range(4)])
+        self.send(*[MockMessage(timestamp=2500000) for _ in range(2)])
+        result = self.stats.to_json()
+        self.assertEqual(result['duration_seconds'], 2.4)
+        # Seconds 0, 1 (which had no messages) and 2
+        self.assertEqual(result['messages_per_second']['peak'], 4)
+        self.assertEqual(result['messages_per_second']['mean'], 2)
+
+    def test_live_objects_and_lifetimes(self):
+        first = MockObject(id=3, type='wl_callback', create_time=1000000)
+        second = MockObject(id=4, type='wl_callback', create_time=1500000)
+        self.send(self.create(1.0, first), self.create(1.5, second), self.destroy(3.0, first))
+        result = self.stats.to_json()
+        callbacks = result['interfaces']['wl_callback']
+        self.assertEqual(
+            (callbacks['created'], callbacks['destroyed'], callbacks['live'], callbacks['peak_live']), (2, 1, 1, 2))
+        self.assertEqual(result['peak_live_objects'], 2)
+        self.assertEqual(callbacks['lifetime_seconds']['max'], 2.0)
+
+    def test_peaks_are_across_connections_at_the_same_time(self):
+        other = mock.Mock(spec=interfaces.Connection)
+        other.name.return_value = 'B'
+        other_lifetimes = ObjectLifetimes(self.session)
+        other.object_lifetimes.return_value = other_lifetimes
+        self.stats.connection_opened(self.connection_list, other)
+        first = MockObject(id=3, type='wl_surface', create_time=0)
+        self.send(self.create(0.0, first), self.destroy(1.0, first))
+        self.stats.connection_got_new_messages(other, [
+            self.create(2.0, MockObject(id=3, type='wl_surface', create_time=from_seconds(2.0)), other_lifetimes)])
+        result = self.stats.to_json()
+        surfaces = result['interfaces']['wl_surface']
+        self.assertEqual((surfaces['created'], surfaces['live'], surfaces['peak_live']), (2, 1, 1))
+        self.assertEqual(result['peak_live_objects'], 1)
+        # Each connection peaked at 1, but never at the same time
+        self.assertEqual((self.lifetimes.peak_live, other_lifetimes.peak_live), (1, 1))
+
+    def test_summary_and_json(self):
+        obj = MockObject(id=3, type='wl_surface', create_time=0)
+        self.send(self.create(0.0, obj), self.destroy(0.5, obj))
+        summary = '\n'.join(self.stats.summary())
+        self.assertIn('2 messages', summary)
+        self.assertIn('wl_surface', summary)
+        result = json.loads(json.dumps(self.stats.to_json()))
+        self.assertEqual(result['interfaces']['wl_surface']['created'], 1)
+        self.assertEqual(result['by_message'], {'mock_type.create': 1, 'mock_type.delete_id': 1})
+
+    def test_roundtrips(self):
+        done = MockMessage(timestamp=1000000, name='done')
+        done.roundtrip = 500000
+        self.send(done, MockMessage(timestamp=1000000, name='done'))
+        self.assertEqual(self.stats.roundtrips.count, 1)
+        result = self.stats.to_json()
+        self.assertEqual(result['roundtrips'], 1)
+        self.assertEqual(result['roundtrip_seconds']['max'], 0.5)
+        self.assertIn('Roundtrips: 1', '\n'.join(self.stats.summary()))
+
+    def test_empty(self):
+        self.assertTrue(self.stats.summary())
+        self.assertEqual(self.stats.to_json()['messages'], 0)
@@ -4,7 +4,7 @@ import os
 import types
 import logging
 import time
-from typing import Any, Optional
+from typing import Any, List, Optional, Sequence
 
 def check_gdb() -> bool:
     '''Check if the gdb module is available, and thus if we are inside a running instance of GDB'''
@@ -58,6 +58,12 @@ def color(color: Optional[str], string: str) -> str:
 def no_color(string: str) -> str:
     return re.sub(r'\x1b\[[\d;]*m', '', string)
 
+def table_lines(rows: Sequence[Sequence[str]]) -> List[str]:
+    '''Lay out rows of cells in aligned columns, the first column is left aligned and the rest are right aligned'''
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return ['  '.join(
+        cell.ljust(widths[i]) if i == 0 else cell.rjust(widths[i]) for i, cell in enumerate(row)) for row in rows]
+
 def set_verbose(new_verbose: bool) -> None:
     global verbose
     verbose = new_verbose
@@ -70,14 +76,24 @@ def project_root() -> str:
         cached_project_root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
     return cached_project_root
 
+def _ignore(*args, **kwargs) -> None:
+    pass
+
 def generate_disseminator(Listener: type) -> type:
+    '''Generates a Disseminator class for the given listener interface, and sets it as Listener.Disseminator
+    Each method of a disseminator instance is replaced with the fastest way to call its current listeners: a no-op
+    when there are none, the listener's own bound method when there is one, and a loop over bound methods otherwise.
+    Bound methods are looked up when listeners are added, so listener methods should not be replaced after that.
+    '''
     assert isinstance(Listener, type)
     assert not hasattr(Listener, 'Disseminator')
 
     class_name = Listener.__name__ + 'Disseminator'
     class_dict = {}
+    method_names = []
 
-    # Must wrap disseminate in a function as so because the name varibale can only have one value per stack frame
+    # Used only before the instance's methods have been set up, must be generated per name as the name variable can
+    # only have one value per stack frame
     def generate_method(name):
         def disseminate(self, *args, **kwargs):
             for listener in self.listeners:
@@ -87,24 +103,53 @@ def generate_disseminator(Listener: type) -> type:
     for name, value in Listener.__dict__.items():
         if isinstance(value, types.FunctionType) and not name.startswith('_'):
             class_dict[name] = generate_method(name)
+            method_names.append(name)
+
+    def bound_method(listener, name):
+        if getattr(listener, '_is_disseminator', False):
+            # A nested disseminator's instance methods change as its listeners do, so use the class method
+            return getattr(type(listener), name).__get__(listener)
+        return getattr(listener, name)
+
+    def update(self, name):
+        methods = [bound_method(listener, name) for listener in self.listeners]
+        if not methods:
+            setattr(self, name, _ignore)
+        elif len(methods) == 1:
+            setattr(self, name, methods[0])
+        else:
+            methods_tuple = tuple(methods)
+            def disseminate(*args, **kwargs):
+                for method in methods_tuple:
+                    method(*args, **kwargs)
+            setattr(self, name, disseminate)
+
+    def update_all(self):
+        for name in method_names:
+            update(self, name)
 
     def add_listener(self, listener):
         assert isinstance(listener, Listener)
         for l in self.listeners:
             assert listener != l
         self.listeners.append(listener)
+        update_all(self)
     class_dict['add_listener'] = add_listener
 
     def remove_listener(self, listener):
         self.listeners.remove(listener)
+        update_all(self)
     class_dict['remove_listener'] = remove_listener
 
+    class_dict['_is_disseminator'] = True
+
     diss_class = type(class_name, (Listener,), class_dict)
     setattr(Listener, 'Disseminator', diss_class)
 
     def init(self, *args, **kwargs):
         super(diss_class, self).__init__(*args, **kwargs)
         self.listeners = []
+        update_all(self)
     setattr(diss_class, '__init__', init)
 
     return Listener
@@ -118,8 +163,9 @@ def new_disseminator_of_type(Listener: type, *args, **kwargs) -> Any:
         generate_disseminator(Listener)
     return getattr(Listener, 'Disseminator')(*args, **kwargs)
 
-def time_now() -> float:
-    return time.perf_counter()
+def time_now() -> int:
+    '''In whole microseconds, which is what backends give times to a ConnectionIDSink in'''
+    return time.perf_counter_ns() // 1000
 
 if __name__ == '__main__':
     print('File meant to be imported, not run')
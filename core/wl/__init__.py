@@ -5,3 +5,4 @@ from . import object
 from .object import ObjectBase, ResolvedObject, UnresolvedObject
 from .message import Message
 from .arg import Arg
+from .resolver import Resolver, Roundtrips
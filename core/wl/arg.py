@@ -1,3 +1,4 @@
+import sys
 import logging
 from typing import TYPE_CHECKING, List
 
@@ -13,9 +14,18 @@ class Arg:
         def __init__(self) -> None:
             self.name: Optional[str] = None
 
-        def resolve(self, conn: 'Connection', message: 'Message', index: int) -> None:
-            if self.name is None and message.obj.type is not None:
-                self.name = protocol.get_arg_name(message.obj.type, message.name, index)
+        def resolve(
+            self,
+            conn: 'Connection',
+            message: 'Message',
+            spec: Optional[protocol.Arg],
+            enum: Optional[protocol.Enum]
+        ) -> None:
+            '''spec: the protocol description of this argument, or None if unknown
+            enum: the enum this argument uses, or None
+            '''
+            if self.name is None and spec is not None:
+                self.name = spec.name
 
         def value_to_str(self) -> str:
             raise NotImplementedError()
@@ -34,12 +44,16 @@ class Arg:
         def __init__(self, value: int) -> None:
             super().__init__()
             self.value = value
-        def resolve(self, conn: 'Connection', message: 'Message', index: int) -> None:
-            super().resolve(conn, message, index)
-            if message.obj.type is not None:
-                labels = protocol.look_up_enum(message.obj.type, message.name, index, self.value)
-                if labels:
-                    self.labels = labels
+        def resolve(
+            self,
+            conn: 'Connection',
+            message: 'Message',
+            spec: Optional[protocol.Arg],
+            enum: Optional[protocol.Enum]
+        ) -> None:
+            super().resolve(conn, message, spec, enum)
+            if enum is not None:
+                self.labels = protocol.enum_labels(enum, self.value)
         def value_to_str(self) -> str:
             if hasattr(self, 'labels'):
                 return (color(int_color, str(self.value)) +
@@ -67,10 +81,16 @@ class Arg:
         def __init__(self, type_: Optional[str] = None) -> None:
             super().__init__()
             self.type = type_
-        def resolve(self, conn: 'Connection', message: 'Message', index: int) -> None:
-            super().resolve(conn, message, index)
-            if self.type is None and message.obj.type is not None:
-                self.type = protocol.look_up_interface(message.obj.type, message.name, index)
+        def resolve(
+            self,
+            conn: 'Connection',
+            message: 'Message',
+            spec: Optional[protocol.Arg],
+            enum: Optional[protocol.Enum]
+        ) -> None:
+            super().resolve(conn, message, spec, enum)
+            if self.type is None and spec is not None:
+                self.type = spec.interface
 
         def value_to_str(self) -> str:
             return color(null_color, 'null ' + (self.type if self.type else '??'))
@@ -83,11 +103,17 @@ class Arg:
 
         def set_type(self, new_type: str) -> None:
             if not self.obj.resolved() and self.obj.type is None:
-                self.obj.type = new_type
+                self.obj.type = sys.intern(new_type)
             assert new_type == self.obj.type, 'Object arg already has type ' + str(self.obj.type) + ', so can not be set to ' + new_type
 
-        def resolve(self, conn: 'Connection', message: 'Message', index: int) -> None:
-            super().resolve(conn, message, index)
+        def resolve(
+            self,
+            conn: 'Connection',
+            message: 'Message',
+            spec: Optional[protocol.Arg],
+            enum: Optional[protocol.Enum]
+        ) -> None:
+            super().resolve(conn, message, spec, enum)
             if not self.obj.resolved():
                 if self.is_new:
                     try:
@@ -112,11 +138,17 @@ class Arg:
         def __init__(self, values: Optional[List['Arg.Base']] = None) -> None:
             super().__init__()
             self.values = values
-        def resolve(self, conn: 'Connection', message: 'Message', index: int) -> None:
-            super().resolve(conn, message, index)
+        def resolve(
+            self,
+            conn: 'Connection',
+            message: 'Message',
+            spec: Optional[protocol.Arg],
+            enum: Optional[protocol.Enum]
+        ) -> None:
+            super().resolve(conn, message, spec, enum)
             if self.values is not None:
                 for v in self.values:
-                    v.resolve(conn, message, index)
+                    v.resolve(conn, message, spec, enum)
                     v.name = None # hack to stop names appearing in every array element
         def value_to_str(self) -> str:
             if self.values is not None:
@@ -1,40 +1,29 @@
 from typing import Optional, Tuple
 
 from core.util import *
+from core.clock import to_seconds
 from interfaces import Connection
 from .object import ObjectBase, MockObject
 from .arg import Arg
 from core.output import Output
 
 class Message:
-    # TODO: figure out a way to remove global time offset
-    base_time = None
-
-    def __init__(self, abs_time: float, obj: ObjectBase, sent: bool, name: str, args: Tuple[Arg.Base, ...]) -> None:
-        if Message.base_time is None:
-            Message.base_time = abs_time
-        self.timestamp = abs_time - Message.base_time
+    def __init__(self, timestamp: int, obj: ObjectBase, sent: bool, name: str, args: Tuple[Arg.Base, ...]) -> None:
+        '''timestamp: in whole microseconds, in whatever clock the backend uses until the message reaches a ConnectionManager, which
+        makes it relative to the start of the session
+        '''
+        self.timestamp = timestamp
         self.obj = obj
         self.sent = sent
         self.name = name
         self.args = args
         self.destroyed_obj: Optional[ObjectBase] = None
+        # If this answers a wl_display.sync, the microseconds since the sync was sent
+        self.roundtrip: Optional[int] = None
 
     def resolve(self, conn: Connection) -> None:
-        if not self.obj.resolved():
-            self.obj = self.obj.resolve(conn)
-        if self.obj.type == 'wl_registry' and self.name == 'bind':
-            assert len(self.args) == 4
-            assert isinstance(self.args[1], Arg.String)
-            assert isinstance(self.args[3], Arg.Object)
-            self.args[3].set_type(self.args[1].value)
-        if self.obj == conn.wl_display() and self.name == 'delete_id' and len(self.args) > 0:
-            first_arg = self.args[0]
-            assert isinstance(first_arg, Arg.Int)
-            self.destroyed_obj = conn.retrieve_object(first_arg.value, -1, None)
-            self.destroyed_obj.destroy(self.timestamp)
-        for i, arg in enumerate(self.args):
-            arg.resolve(conn, self, i)
+        '''Resolve with the connection's Resolver, so roundtrips and other state it keeps are not lost'''
+        conn.resolve_message(self)
 
     def used_objects(self) -> Tuple[ObjectBase, ...]:
         result = []
@@ -54,23 +43,31 @@ class Message:
                 color(bad_color, '.destroyed'))
             lifespan = self.destroyed_obj.lifespan()
             if lifespan is not None:
-                destroyed += color(timestamp_color, ' after {:0.4f}s'.format(lifespan))
+                destroyed += color(timestamp_color, ' after {:0.4f}s'.format(to_seconds(lifespan)))
+        roundtrip = ''
+        if self.roundtrip is not None:
+            roundtrip = color(symbol_color, ' -- ') + color(timestamp_color, 'roundtrip {:0.4f}s'.format(to_seconds(self.roundtrip)))
         return (
             (color(symbol_color, '→ ') if self.sent else '') +
             str(self.obj) +
             color(message_color, '.' + self.name) + color(symbol_color, '(') +
             color(symbol_color, ', ').join([str(i) for i in self.args]) + color(symbol_color, ')') +
             destroyed +
+            roundtrip +
             (color(symbol_color, ' ↲') if not self.sent else ''))
 
-    def show(self, out: Output) -> None:
+    def line(self) -> str:
+        '''The message as it is shown, with its timestamp and connection'''
         conn_name = '' if self.obj.connection is None else self.obj.connection.name()
-        out.show(color(timestamp_color, '{:7.4f}'.format(self.timestamp)) + ' ' + conn_name + ': ' + str(self))
+        return color(timestamp_color, '{:7.4f}'.format(to_seconds(self.timestamp))) + ' ' + conn_name + ': ' + str(self)
+
+    def show(self, out: Output) -> None:
+        out.show(self.line())
 
 class MockMessage(Message):
     def __init__(
         self,
-        timestamp: float = 0.0,
+        timestamp: int = 0,
         obj: ObjectBase = MockObject(),
         sent: bool = False,
         name: str = 'mock_message',
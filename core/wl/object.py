@@ -14,8 +14,9 @@ class ObjectBase:
         self.id = obj_id
         self.generation: Optional[int] = None
         self.type: Optional[str] = None
-        self.create_time: Optional[float] = None
-        self.destroy_time: Optional[float] = None
+        # In microseconds, like message timestamps
+        self.create_time: Optional[int] = None
+        self.destroy_time: Optional[int] = None
         self.alive = True
 
     def resolve(self, conn: Connection) -> 'ObjectBase':
@@ -46,11 +47,14 @@ class ObjectBase:
         # See https://wayland.freedesktop.org/docs/html/ch04.html#sect-Protocol-Creating-Objects
         return self.id >= 0xff000000
 
-    def destroy(self, time: float) -> None:
+    def destroy(self, time: int) -> None:
+        was_alive = self.alive
         self.destroy_time = time
         self.alive = False
+        if was_alive and self.connection is not None:
+            self.connection.object_destroyed(self)
 
-    def lifespan(self) -> Optional[float]:
+    def lifespan(self) -> Optional[int]:
         if self.create_time is not None and self.destroy_time is not None:
             return self.destroy_time - self.create_time
         else:
@@ -63,7 +67,7 @@ class ResolvedObject(ObjectBase):
     def __init__(
         self,
         conn: Connection,
-        create_time: float,
+        create_time: int,
         parent_obj: Optional[ObjectBase],
         obj_id: int,
         generation: int,
@@ -104,7 +108,7 @@ class MockObject(ObjectBase):
     def __init__(
         self,
         conn: Optional[Connection] = None,
-        create_time: float = 0.0,
+        create_time: int = 0,
         id: int = 1,
         generation: int = 0,
         type: Optional[str] = 'mock_type'
@@ -2,7 +2,8 @@ from __future__ import annotations
 import xml.etree.ElementTree as ET
 from collections import OrderedDict
 import logging
-from typing import Optional, Dict, List
+import struct
+from typing import Optional, Dict, List, Tuple, Iterator, Any
 import sys
 import time
 import re
@@ -22,26 +23,51 @@ class Protocol:
         self.interfaces = interfaces
 
 class Interface:
-    def __init__(self, name: str, version: int, messages: 'OrderedDict[str, Message]', enums: 'OrderedDict[str, Enum]') -> None:
+    '''
+    messages: all requests and events by name
+    requests: requests in XML order, so the index of each is it's opcode
+    events: events in XML order, so the index of each is it's opcode
+    requests and events default to the matching messages in order
+    '''
+    def __init__(
+        self,
+        name: str,
+        version: int,
+        messages: 'OrderedDict[str, Message]',
+        enums: 'OrderedDict[str, Enum]',
+        requests: Optional[List[Message]] = None,
+        events: Optional[List[Message]] = None
+    ) -> None:
         assert version > 0
-        for message in messages.values():
-            message.parent = self
+        if requests is None:
+            requests = [message for message in messages.values() if not message.is_event]
+        if events is None:
+            events = [message for message in messages.values() if message.is_event]
+        for message_list in (requests, events):
+            for opcode, message in enumerate(message_list):
+                message.parent = self
+                message.opcode = opcode
         for enum in enums.values():
             enum.parent = self
         self.name = name
         self.parent: Optional[Protocol] = None
         self.version = version
         self.messages = messages
+        self.requests = requests
+        self.events = events
         self.enums = enums
 
 class Message:
-    def __init__(self, name: str, is_event: bool, args: 'OrderedDict[str, Arg]') -> None:
+    def __init__(self, name: str, is_event: bool, args: 'OrderedDict[str, Arg]', is_destructor: bool = False) -> None:
         for i in args.values():
             i.parent = self
         self.name = name
         self.parent: Optional[Interface] = None
         self.is_event = is_event
+        self.is_destructor = is_destructor
+        self.opcode = -1
         self.args = args
+        self.decoder = MessageDecoder(self)
 
 class Arg:
     def __init__(self, name: str, type_: str, interface: Optional[str], enum: Optional[str]) -> None:
@@ -51,6 +77,110 @@ class Arg:
         self.interface = interface
         self.enum = enum
 
+# Struct format characters of argument types that are always 4 bytes on the wire
+_fixed_size_formats = {
+    'int': 'i',
+    'uint': 'I',
+    'fixed': 'i',
+    'object': 'I',
+    'new_id': 'I',
+}
+_uint = struct.Struct('=I')
+_int = struct.Struct('=i')
+
+def _padded(size: int) -> int:
+    return (size + 3) & ~3
+
+def _decode_string(data: bytes, offset: int) -> Tuple[Optional[str], int]:
+    size = _uint.unpack_from(data, offset)[0]
+    offset += 4
+    if size == 0:
+        return None, offset
+    if offset + size > len(data):
+        raise RuntimeError('string of ' + str(size) + ' bytes overflows message')
+    # size includes the null terminator
+    value = data[offset:offset + size - 1].decode('utf-8', 'replace')
+    return value, offset + _padded(size)
+
+class MessageDecoder:
+    '''Decodes the arguments of a message from the Wayland wire format into raw values
+    Compiled once from the signature, with each run of fixed size arguments unpacked by a single struct
+    Values are in argument order:
+    int, uint, fixed (still as 24.8 fixed point), object, new_id and fd: int
+    string: Optional[str]
+    array: bytes
+    new_id without an interface (as in wl_registry.bind): (Optional[str], int, int) of interface name, version and ID
+    '''
+    # Step kinds
+    FIXED = 0
+    STRING = 1
+    ARRAY = 2
+    UNTYPED_NEW_ID = 3
+    FD = 4
+
+    def __init__(self, message: Message) -> None:
+        self.message = message
+        self.steps: List[Tuple[int, Optional[struct.Struct]]] = []
+        run = ''
+        for arg in message.args.values():
+            fmt = _fixed_size_formats.get(arg.type)
+            if fmt is not None and not (arg.type == 'new_id' and arg.interface is None):
+                run += fmt
+                continue
+            if run:
+                self.steps.append((self.FIXED, struct.Struct('=' + run)))
+                run = ''
+            if arg.type == 'string':
+                self.steps.append((self.STRING, None))
+            elif arg.type == 'array':
+                self.steps.append((self.ARRAY, None))
+            elif arg.type == 'new_id':
+                self.steps.append((self.UNTYPED_NEW_ID, None))
+            elif arg.type == 'fd':
+                self.steps.append((self.FD, None))
+            else:
+                raise RuntimeError('Invalid argument type ' + repr(arg.type) + ' in ' + message.name)
+        if run:
+            self.steps.append((self.FIXED, struct.Struct('=' + run)))
+
+    def decode(self, data: bytes, offset: int, fds: Optional[Iterator[int]]) -> Tuple[List[Any], int]:
+        '''Returns the raw argument values and the offset after the last argument
+        fds: file descriptors sent alongside the message, or None if they are encoded inline as ints
+        Raises: RuntimeError if the data does not fit the signature
+        '''
+        values: List[Any] = []
+        try:
+            for kind, fixed in self.steps:
+                if kind == self.FIXED:
+                    assert fixed is not None
+                    values.extend(fixed.unpack_from(data, offset))
+                    offset += fixed.size
+                elif kind == self.STRING:
+                    value, offset = _decode_string(data, offset)
+                    values.append(value)
+                elif kind == self.ARRAY:
+                    size = _uint.unpack_from(data, offset)[0]
+                    offset += 4
+                    if offset + size > len(data):
+                        raise RuntimeError('array of ' + str(size) + ' bytes overflows message')
+                    values.append(bytes(data[offset:offset + size]))
+                    offset += _padded(size)
+                elif kind == self.UNTYPED_NEW_ID:
+                    interface, offset = _decode_string(data, offset)
+                    version, obj_id = struct.unpack_from('=II', data, offset)
+                    offset += 8
+                    values.append((sys.intern(interface) if interface is not None else None, version, obj_id))
+                elif fds is None:
+                    values.append(_int.unpack_from(data, offset)[0])
+                    offset += 4
+                else:
+                    values.append(next(fds, -1))
+        except struct.error as e:
+            raise RuntimeError(
+                'Arguments of ' + str(self.message.name) + ' do not fit in ' + str(len(data) - offset) + ' bytes'
+            ) from e
+        return values, offset
+
 class Enum:
     def __init__(self, name: str, bitfield: bool, entries: 'OrderedDict[str, EnumEntry]') -> None:
         for i in entries.values():
@@ -67,10 +197,11 @@ class EnumEntry:
         self.value = value
 
 def parse_arg(arg: ET.Element) -> Arg:
+    interface = arg.attrib.get('interface', None)
     return Arg(
-        arg.attrib['name'],
-        arg.attrib['type'],
-        arg.attrib.get('interface', None),
+        sys.intern(arg.attrib['name']),
+        sys.intern(arg.attrib['type']),
+        sys.intern(interface) if interface is not None else None,
         arg.attrib.get('enum', None))
 
 def parse_message(message: ET.Element) -> Message:
@@ -79,7 +210,8 @@ def parse_message(message: ET.Element) -> Message:
         if node.tag == 'arg':
             arg = parse_arg(node)
             args[arg.name] = arg
-    return Message(message.attrib['name'], message.tag == 'event', args)
+    return Message(
+        sys.intern(message.attrib['name']), message.tag == 'event', args, message.attrib.get('type') == 'destructor')
 
 number_re = re.compile(r'^\w+$') # Matches 7 and 0x42
 bitshift_re = re.compile(r'^(\w+)\s*<<\s*(\w+)$') # matches 3 << 4
@@ -115,15 +247,21 @@ def parse_enum(enum: ET.Element) -> Enum:
 def parse_interface(interface: ET.Element) -> Interface:
     version = int(interface.attrib['version'])
     messages = OrderedDict()
+    requests = []
+    events = []
     enums = OrderedDict()
     for node in interface:
         if node.tag == 'event' or node.tag == 'request':
             message = parse_message(node)
             messages[message.name] = message
+            if message.is_event:
+                events.append(message)
+            else:
+                requests.append(message)
         elif node.tag == 'enum':
             enum = parse_enum(node)
             enums[enum.name] = enum
-    return Interface(interface.attrib['name'], version, messages, enums)
+    return Interface(sys.intern(interface.attrib['name']), version, messages, enums, requests, events)
 
 def parse_protocol(xmlfile: str) -> Protocol:
     protocol = ET.parse(xmlfile).getroot()
@@ -269,6 +407,26 @@ def get_arg(interface_name: str, message_name: str, arg_index: int) -> Optional[
     arg = arg_list[arg_index]
     return arg
 
+def destructor_names() -> List[str]:
+    '''Names of all messages that are destructors in any loaded interface, sorted'''
+    return sorted({
+        message.name
+        for interface in interfaces.values()
+        for message in interface.messages.values()
+        if message.is_destructor})
+
+def get_message_by_opcode(interface_name: str, is_event: bool, opcode: int) -> Optional[Message]:
+    '''Look up a message by it's opcode (the index of the message among the interface's requests or events)
+    Returns None if the interface or opcode is unknown
+    '''
+    interface = interfaces.get(interface_name)
+    if not interface:
+        return None
+    messages = interface.events if is_event else interface.requests
+    if opcode < 0 or opcode >= len(messages):
+        return None
+    return messages[opcode]
+
 def get_arg_name(interface_name: str, message_name: str, arg_index: int) -> Optional[str]:
     arg = get_arg(interface_name, message_name, arg_index)
     if arg:
@@ -292,18 +450,15 @@ def get_enum(interface_name: str, enum_path: str) -> Optional[Enum]:
     if enum_interface is None: return None
     return enum_interface.enums.get(enum_name)
 
-def look_up_enum(interface_name: str, message_name: str, arg_index: int, arg_value: int) -> List[str]:
-    arg = get_arg(interface_name, message_name, arg_index)
-    if arg is None or arg.enum is None: return []
-    enum = get_enum(interface_name, arg.enum)
-    if enum is None: return []
+def enum_labels(enum: Enum, value: int) -> List[str]:
+    '''Returns the names of the entries of enum that make up value'''
     entries = []
     for entry in enum.entries.values():
         if enum.bitfield:
-            if entry.value & arg_value:
+            if entry.value & value:
                 entries.append(entry.name)
         else:
-            if entry.value == arg_value:
+            if entry.value == value:
                 entries.append(entry.name)
     if entries:
         return entries
@@ -311,3 +466,10 @@ def look_up_enum(interface_name: str, message_name: str, arg_index: int, arg_val
         return ['(none)']
     else:
         return ['INVALID ENUM VALUE']
+
+def look_up_enum(interface_name: str, message_name: str, arg_index: int, arg_value: int) -> List[str]:
+    arg = get_arg(interface_name, message_name, arg_index)
+    if arg is None or arg.enum is None: return []
+    enum = get_enum(interface_name, arg.enum)
+    if enum is None: return []
+    return enum_labels(enum, arg_value)
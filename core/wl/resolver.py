@@ -0,0 +1,141 @@
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from core.clock import to_seconds
+from core.histogram import LogHistogram
+from . import protocol
+from .arg import Arg
+
+if TYPE_CHECKING:
+    from interfaces import Connection
+    from .message import Message
+    from .object import ObjectBase
+
+class _Descriptor:
+    '''What the protocol says about the arguments of a message, looked up once per message type'''
+    def __init__(self, interface_name: Optional[str], message_name: str) -> None:
+        self.interface_name = interface_name
+        self.message_name = message_name
+        # The description and enum of each argument, or None if the interface is not known
+        self.args: Optional[List[Tuple[protocol.Arg, Optional[protocol.Enum]]]] = None
+        # Set if the interface is known but the message is not
+        self.error: Optional[str] = None
+        self.is_destructor = False
+        if interface_name is None or (interface_name, message_name) == ('wl_registry', 'bind'):
+            return # bind is special because the protocol doesn't match the detected messages
+        interface = protocol.interfaces.get(interface_name)
+        if interface is None:
+            return
+        message = interface.messages.get(message_name)
+        if message is None:
+            self.error = str(message_name) + ' is not a message in ' + str(interface_name)
+            return
+        self.args = [
+            (arg, protocol.get_enum(interface_name, arg.enum) if arg.enum is not None else None)
+            for arg in message.args.values()
+        ]
+        self.is_destructor = message.is_destructor
+
+    def missing(self, index: int) -> Tuple[Optional[protocol.Arg], Optional[protocol.Enum]]:
+        '''Called for arguments without a description, raises if the message doesn't fit the protocol'''
+        if self.error is not None:
+            raise RuntimeError(self.error)
+        if self.args is not None:
+            raise RuntimeError(
+                'Tried to access arg ' + str(index) +
+                ' in ' + str(self.interface_name) + '.' + str(self.message_name) +
+                ' (which only has ' + str(len(self.args)) + ' args)')
+        return None, None
+
+class Roundtrips:
+    '''How long the wl_display.sync requests on a connection took to be answered, latencies are in seconds'''
+    def __init__(self) -> None:
+        self.latencies = LogHistogram()
+        # The callbacks of syncs that have not been answered yet, and when they were sent
+        self.pending: Dict['ObjectBase', int] = {}
+
+    def save_state(self) -> Dict[str, Any]:
+        '''Returns the latencies and the syncs still waiting (by callback ID and generation), which can be turned into
+        JSON'''
+        return {
+            'latencies': self.latencies.save_state(),
+            'pending': [[callback.id, callback.generation, sent] for callback, sent in self.pending.items()],
+        }
+
+    def load_state(self, state: Dict[str, Any], conn: 'Connection') -> None:
+        '''Restore the state returned by save_state(), the callbacks must already be in the connection'''
+        self.latencies = LogHistogram.from_state(state['latencies'])
+        self.pending = {}
+        for callback_id, generation, sent in state['pending']:
+            self.pending[conn.retrieve_object(callback_id, generation, 'wl_callback')] = sent
+
+    def answered(self, message: 'Message', callback: 'ObjectBase') -> None:
+        '''Attach the latency to the message if it answers a sync'''
+        sent = self.pending.pop(callback, None)
+        if sent is not None:
+            message.roundtrip = message.timestamp - sent
+            self.latencies.add(to_seconds(message.roundtrip))
+
+class Resolver:
+    '''Resolves the objects and arguments of messages on a single connection
+    The protocol description of each type of message is cached, and messages that change how later messages are
+    resolved (such as wl_registry.bind) are handled by looking up their interface and name in a dispatch table.
+    Roundtrips are tracked by pairing each wl_display.sync with the wl_callback.done (or, failing that, the
+    wl_display.delete_id) that answers it.
+    '''
+    def __init__(self, conn: 'Connection') -> None:
+        self.conn = conn
+        self.descriptors: Dict[Tuple[Optional[str], str], _Descriptor] = {}
+        self.roundtrips = Roundtrips()
+        self.special: Dict[Tuple[Optional[str], str], Callable[['Message'], None]] = {
+            ('wl_registry', 'bind'): self._bind,
+            ('wl_display', 'delete_id'): self._delete_id,
+            ('wl_callback', 'done'): self._done,
+        }
+
+    def resolve(self, message: 'Message') -> None:
+        if not message.obj.resolved():
+            message.obj = message.obj.resolve(self.conn)
+        key = (message.obj.type, message.name)
+        special = self.special.get(key)
+        if special is not None:
+            special(message)
+        descriptor = self.descriptors.get(key)
+        if descriptor is None:
+            descriptor = _Descriptor(key[0], key[1])
+            self.descriptors[key] = descriptor
+        specs = descriptor.args
+        spec: Optional[protocol.Arg]
+        enum: Optional[protocol.Enum]
+        for i, arg in enumerate(message.args):
+            if specs is not None and i < len(specs):
+                spec, enum = specs[i]
+            else:
+                spec, enum = descriptor.missing(i)
+            arg.resolve(self.conn, message, spec, enum)
+        if descriptor.is_destructor and message.obj.owned_by_server() and message.obj.alive:
+            # Server owned objects don't get a wl_display.delete_id, so they are destroyed by their destructor
+            message.obj.destroy(message.timestamp)
+        if key == ('wl_display', 'sync') and message.args:
+            # Needs the callback to be created, so can't be special
+            callback = message.args[0]
+            assert isinstance(callback, Arg.Object)
+            self.roundtrips.pending[callback.obj] = message.timestamp
+
+    def _bind(self, message: 'Message') -> None:
+        assert len(message.args) == 4
+        assert isinstance(message.args[1], Arg.String)
+        assert isinstance(message.args[3], Arg.Object)
+        message.args[3].set_type(message.args[1].value)
+
+    def _delete_id(self, message: 'Message') -> None:
+        if message.obj == self.conn.wl_display() and len(message.args) > 0:
+            first_arg = message.args[0]
+            assert isinstance(first_arg, Arg.Int)
+            message.destroyed_obj = self.conn.retrieve_object(first_arg.value, -1, None)
+            message.destroyed_obj.destroy(message.timestamp)
+            if self.roundtrips.pending:
+                self.roundtrips.answered(message, message.destroyed_obj)
+
+    def _done(self, message: 'Message') -> None:
+        if self.roundtrips.pending:
+            self.roundtrips.answered(message, message.obj)
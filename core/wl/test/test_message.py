@@ -4,20 +4,15 @@ from core.wl.message import MockMessage
 import interfaces
 
 class TestMessage(TestCase):
-    def setUp(self):
-        assert hasattr(Message, 'base_time')
-        Message.base_time = None
-
     def test_create_message(self):
         o = UnresolvedObject(7, None)
-        m = Message(12.5, o, False, "some_msg", [])
+        m = Message(12500000, o, False, "some_msg", [])
 
-    def test_message_calculates_timestamp_offset(self):
+    def test_message_keeps_timestamp(self):
         o = UnresolvedObject(7, None)
-        m0 = Message(4.0, o, False, "some_msg", [])
-        m1 = Message(6.0, o, False, "other_msg", [])
-        self.assertEqual(m0.timestamp, 0.0)
-        self.assertEqual(m1.timestamp, 2.0)
+        Message(4000000, o, False, "some_msg", [])
+        m = Message(6000000, o, False, "other_msg", [])
+        self.assertEqual(m.timestamp, 6000000)
 
 class TestMockMessage(TestCase):
     def setUp(self):
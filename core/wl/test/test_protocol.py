@@ -1,7 +1,10 @@
+import sys
 import unittest
+import struct
 from os import path
 
 from core.wl.protocol import *
+from core.wl import protocol
 from core import output
 
 class TestProtocol(unittest.TestCase):
@@ -61,3 +64,62 @@ class TestLoadedProtocols(unittest.TestCase):
     def test_get_arg_errors_on_bad_arg_index(self):
         with self.assertRaises(RuntimeError):
             get_arg('wl_surface', 'attach', 4)
+
+    def test_requests_and_events_in_opcode_order(self):
+        display = protocol.interfaces['wl_display']
+        self.assertEqual([m.name for m in display.requests], ['sync', 'get_registry'])
+        self.assertEqual([m.name for m in display.events], ['error', 'delete_id'])
+        self.assertEqual(display.requests[1].opcode, 1)
+        self.assertEqual(display.events[1].opcode, 1)
+
+    def test_all_messages_have_opcodes(self):
+        for interface in protocol.interfaces.values():
+            for opcode, message in enumerate(interface.requests):
+                self.assertFalse(message.is_event)
+                self.assertEqual(message.opcode, opcode)
+            for opcode, message in enumerate(interface.events):
+                self.assertTrue(message.is_event)
+                self.assertEqual(message.opcode, opcode)
+
+    def test_get_message_by_opcode(self):
+        self.assertEqual(get_message_by_opcode('wl_surface', False, 1).name, 'attach')
+        self.assertEqual(get_message_by_opcode('wl_surface', True, 0).name, 'enter')
+        self.assertIs(get_message_by_opcode('wl_surface', True, 100), None)
+        self.assertIs(get_message_by_opcode('not_a_real_protocol', True, 0), None)
+
+    def test_interface_names_are_interned(self):
+        buffer_arg = get_arg('wl_surface', 'attach', 0)
+        self.assertIs(buffer_arg.interface, protocol.interfaces['wl_buffer'].name)
+        self.assertIs(protocol.interfaces['wl_surface'].messages['attach'].name, sys.intern('attach'))
+
+    def test_decoder_combines_fixed_size_args(self):
+        decoder = get_message_by_opcode('wl_surface', False, 1).decoder # attach(buffer, x, y)
+        self.assertEqual(len(decoder.steps), 1)
+        values, offset = decoder.decode(struct.pack('=Iii', 5, -3, 4), 0, None)
+        self.assertEqual(values, [5, -3, 4])
+        self.assertEqual(offset, 12)
+
+    def test_decoder_strings_and_untyped_new_id(self):
+        decoder = protocol.interfaces['wl_registry'].messages['bind'].decoder
+        data = struct.pack('=II', 7, 8) + b'wl_seat\0' + struct.pack('=II', 5, 3)
+        values, offset = decoder.decode(data, 0, None)
+        self.assertEqual(values, [7, ('wl_seat', 5, 3)])
+        self.assertEqual(offset, len(data))
+
+    def test_decoder_array_and_fds(self):
+        decoder = protocol.interfaces['wl_keyboard'].messages['keymap'].decoder
+        values, _ = decoder.decode(struct.pack('=II', 1, 4096), 0, iter([9]))
+        self.assertEqual(values, [1, 9, 4096])
+        decoder = protocol.interfaces['wl_keyboard'].messages['enter'].decoder
+        values, _ = decoder.decode(struct.pack('=IIIII', 3, 4, 8, 30, 31), 0, None)
+        self.assertEqual(values, [3, 4, struct.pack('=II', 30, 31)])
+
+    def test_decoder_raises_on_short_data(self):
+        decoder = protocol.interfaces['wl_surface'].messages['attach'].decoder
+        with self.assertRaises(RuntimeError):
+            decoder.decode(b'\0\0\0\0', 0, None)
+
+    def test_all_shipped_messages_have_decoders(self):
+        for interface in protocol.interfaces.values():
+            for message in interface.messages.values():
+                self.assertIsInstance(message.decoder, MessageDecoder)
@@ -0,0 +1,99 @@
+from unittest import TestCase
+from core import output, ConnectionImpl
+from core.wl import *
+from core.wl import protocol
+from core.clock import from_seconds
+
+class TestResolver(TestCase):
+    def setUp(self):
+        protocol.load_all(output.Strict())
+        self.c = ConnectionImpl(0, 'A', False)
+        self.resolver = Resolver(self.c)
+
+    def tearDown(self):
+        protocol.dump_all()
+
+    def message(self, obj_type, obj_id, name, args, seconds=0.0):
+        message = Message(from_seconds(seconds), UnresolvedObject(obj_id, obj_type), False, name, tuple(args))
+        self.resolver.resolve(message)
+        return message
+
+    def test_resolves_object_and_names_args(self):
+        m = self.message('wl_display', 1, 'sync', [Arg.Object(UnresolvedObject(3, 'wl_callback'), True)])
+        self.assertIs(m.obj, self.c.wl_display())
+        self.assertEqual(m.args[0].name, 'callback')
+        self.assertIs(m.args[0].obj, self.c.retrieve_object(3, -1, 'wl_callback'))
+
+    def test_bind_sets_new_object_type(self):
+        self.c.create_object(0, self.c.wl_display(), 2, 'wl_registry')
+        m = self.message('wl_registry', 2, 'bind', [
+            Arg.Int(1), Arg.String('wl_compositor'), Arg.Int(4), Arg.Object(UnresolvedObject(3, None), True)])
+        self.assertEqual(m.args[3].obj.type, 'wl_compositor')
+        self.assertIs(self.c.retrieve_object(3, -1, None), m.args[3].obj)
+
+    def test_delete_id_destroys_object(self):
+        surface = self.c.create_object(0, self.c.wl_display(), 3, 'wl_surface')
+        m = self.message('wl_display', 1, 'delete_id', [Arg.Int(3)])
+        self.assertIs(m.destroyed_obj, surface)
+        self.assertFalse(surface.alive)
+
+    def test_destructor_destroys_server_owned_object(self):
+        offer = self.c.create_object(0, self.c.wl_display(), 0xff000001, 'wl_data_offer')
+        self.message('wl_data_offer', 0xff000001, 'destroy', [])
+        self.assertFalse(offer.alive)
+
+    def test_destructor_does_not_destroy_client_owned_object(self):
+        surface = self.c.create_object(0, self.c.wl_display(), 3, 'wl_surface')
+        self.message('wl_surface', 3, 'destroy', [])
+        self.assertTrue(surface.alive)
+
+    def test_roundtrip_latency_attached_to_done(self):
+        self.message('wl_display', 1, 'sync', [Arg.Object(UnresolvedObject(3, 'wl_callback'), True)], 1.0)
+        done = self.message('wl_callback', 3, 'done', [Arg.Int(0)], 1.25)
+        delete = self.message('wl_display', 1, 'delete_id', [Arg.Int(3)], 1.5)
+        self.assertEqual(done.roundtrip, 250000)
+        self.assertIsNone(delete.roundtrip)
+        self.assertIn('roundtrip 0.2500s', str(done))
+        self.assertEqual(self.resolver.roundtrips.latencies.count, 1)
+        self.assertEqual(self.resolver.roundtrips.pending, {})
+
+    def test_roundtrip_answered_by_delete_id_without_done(self):
+        self.message('wl_display', 1, 'sync', [Arg.Object(UnresolvedObject(3, 'wl_callback'), True)], 1.0)
+        delete = self.message('wl_display', 1, 'delete_id', [Arg.Int(3)], 1.5)
+        self.assertEqual(delete.roundtrip, 500000)
+
+    def test_unanswered_roundtrip_is_pending(self):
+        sync = self.message('wl_display', 1, 'sync', [Arg.Object(UnresolvedObject(3, 'wl_callback'), True)], 1.0)
+        self.assertEqual(list(self.resolver.roundtrips.pending.values()), [sync.timestamp])
+        self.assertEqual(self.resolver.roundtrips.latencies.count, 0)
+
+    def test_frame_callback_is_not_a_roundtrip(self):
+        self.c.create_object(0, self.c.wl_display(), 3, 'wl_surface')
+        self.message('wl_surface', 3, 'frame', [Arg.Object(UnresolvedObject(4, 'wl_callback'), True)])
+        done = self.message('wl_callback', 4, 'done', [Arg.Int(0)])
+        self.assertIsNone(done.roundtrip)
+
+    def test_enum_labels(self):
+        self.c.create_object(0, self.c.wl_display(), 3, 'wl_seat')
+        m = self.message('wl_seat', 3, 'capabilities', [Arg.Int(3)])
+        self.assertEqual(m.args[0].labels, ['pointer', 'keyboard'])
+
+    def test_null_arg_gets_type(self):
+        self.c.create_object(0, self.c.wl_display(), 3, 'wl_surface')
+        m = self.message('wl_surface', 3, 'attach', [Arg.Null(), Arg.Int(0), Arg.Int(0)])
+        self.assertEqual(m.args[0].type, 'wl_buffer')
+
+    def test_unknown_interface_leaves_args_unnamed(self):
+        self.c.create_object(0, self.c.wl_display(), 3, 'not_a_real_type')
+        m = self.message('not_a_real_type', 3, 'foo', [Arg.Int(3)])
+        self.assertIs(m.args[0].name, None)
+
+    def test_raises_on_unknown_message(self):
+        self.c.create_object(0, self.c.wl_display(), 3, 'wl_surface')
+        with self.assertRaises(RuntimeError):
+            self.message('wl_surface', 3, 'not_a_message', [Arg.Int(3)])
+
+    def test_raises_on_too_many_args(self):
+        self.c.create_object(0, self.c.wl_display(), 3, 'wl_surface')
+        with self.assertRaises(RuntimeError):
+            self.message('wl_surface', 3, 'commit', [Arg.Int(3)])
@@ -0,0 +1,95 @@
+import unittest
+import struct
+
+from core.wl import Arg, protocol, wire
+from core import output
+
+def u32(value):
+    return struct.pack('=I', value)
+
+def i32(value):
+    return struct.pack('=i', value)
+
+def string(value):
+    encoded = value.encode('utf-8') + b'\0'
+    return u32(len(encoded)) + encoded + b'\0' * ((4 - len(encoded) % 4) % 4)
+
+class TestWire(unittest.TestCase):
+    def setUp(self):
+        protocol.load_all(output.Strict())
+
+    def tearDown(self):
+        protocol.dump_all()
+
+    def decode(self, interface, is_event, opcode, data, fds=None):
+        message = protocol.get_message_by_opcode(interface, is_event, opcode)
+        self.assertIsNotNone(message)
+        return message, wire.decode_args(message, data, 0, fds)
+
+    def test_fixed_to_float(self):
+        self.assertEqual(wire.fixed_to_float(256), 1.0)
+        self.assertEqual(wire.fixed_to_float(-128), -0.5)
+
+    def test_decode_motion(self):
+        message, args = self.decode('wl_pointer', True, 2, u32(77) + i32(256 * 12 + 64) + i32(-256))
+        self.assertEqual(message.name, 'motion')
+        self.assertEqual(len(args), 3)
+        self.assertIsInstance(args[0], Arg.Int)
+        self.assertEqual(args[0].value, 77)
+        self.assertIsInstance(args[1], Arg.Float)
+        self.assertEqual(args[1].value, 12.25)
+        self.assertEqual(args[2].value, -1.0)
+
+    def test_decode_new_id_and_object(self):
+        message, args = self.decode('wl_surface', False, 3, u32(12))
+        self.assertEqual(message.name, 'frame')
+        self.assertIsInstance(args[0], Arg.Object)
+        self.assertTrue(args[0].is_new)
+        self.assertEqual(args[0].obj.id, 12)
+        self.assertEqual(args[0].obj.type, 'wl_callback')
+
+    def test_decode_null_object(self):
+        message, args = self.decode('wl_surface', False, 1, u32(0) + i32(0) + i32(0))
+        self.assertEqual(message.name, 'attach')
+        self.assertIsInstance(args[0], Arg.Null)
+        self.assertEqual(args[0].type, 'wl_buffer')
+
+    def test_decode_untyped_new_id(self):
+        message, args = self.decode('wl_registry', False, 0, u32(4) + string('wl_compositor') + u32(5) + u32(3))
+        self.assertEqual(message.name, 'bind')
+        self.assertEqual(len(args), 4)
+        self.assertEqual(args[0].value, 4)
+        self.assertIsInstance(args[1], Arg.String)
+        self.assertEqual(args[1].value, 'wl_compositor')
+        self.assertEqual(args[2].value, 5)
+        self.assertIsInstance(args[3], Arg.Object)
+        self.assertEqual(args[3].obj.type, 'wl_compositor')
+        self.assertEqual(args[3].obj.id, 3)
+
+    def test_decode_string_and_null_string(self):
+        message, args = self.decode('xdg_toplevel', False, 2, string('Hello, world'))
+        self.assertEqual(message.name, 'set_title')
+        self.assertEqual(args[0].value, 'Hello, world')
+        message, args = self.decode('xdg_toplevel', False, 2, u32(0))
+        self.assertIsInstance(args[0], Arg.Null)
+
+    def test_decode_array(self):
+        message, args = self.decode('wl_keyboard', True, 1, u32(1) + u32(5) + u32(8) + u32(69) + u32(420))
+        self.assertEqual(message.name, 'enter')
+        self.assertIsInstance(args[2], Arg.Array)
+        self.assertEqual([v.value for v in args[2].values], [69, 420])
+
+    def test_decode_inline_fd(self):
+        message, args = self.decode('wl_keyboard', True, 0, u32(1) + i32(7) + u32(100))
+        self.assertEqual(message.name, 'keymap')
+        self.assertIsInstance(args[1], Arg.Fd)
+        self.assertEqual(args[1].value, 7)
+
+    def test_decode_out_of_band_fd(self):
+        message, args = self.decode('wl_keyboard', True, 0, u32(1) + u32(100), iter([9]))
+        self.assertEqual(args[1].value, 9)
+        self.assertEqual(args[2].value, 100)
+
+    def test_too_little_data_raises(self):
+        with self.assertRaises(RuntimeError):
+            self.decode('wl_pointer', True, 2, u32(77))
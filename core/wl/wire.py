@@ -0,0 +1,64 @@
+'''
+Decodes message arguments encoded in the Wayland wire format
+See https://wayland.freedesktop.org/docs/html/ch04.html#sect-Protocol-Wire-Format
+'''
+import struct
+from typing import List, Tuple, Iterator, Optional
+
+from . import protocol
+from .arg import Arg
+from .object import UnresolvedObject
+
+_int_array = struct.Struct('=i')
+
+def fixed_to_float(value: int) -> float:
+    '''Converts a 24.8 signed fixed point wl_fixed_t into a float'''
+    return value / 256.0
+
+def decode_args(
+    message: protocol.Message,
+    data: bytes,
+    offset: int,
+    fds: Optional[Iterator[int]]
+) -> Tuple[Arg.Base, ...]:
+    '''Decode the arguments of a message
+    message: the protocol description of the message
+    data: buffer containing the arguments
+    offset: where in the buffer the arguments start
+    fds: file descriptors sent alongside the message, or None if they are encoded inline as ints
+    Raises: RuntimeError if the data does not fit the message signature
+    '''
+    values, _ = message.decoder.decode(data, offset, fds)
+    args: List[Arg.Base] = []
+    for arg, value in zip(message.args.values(), values):
+        if arg.type == 'int' or arg.type == 'uint':
+            args.append(Arg.Int(value))
+        elif arg.type == 'fixed':
+            args.append(Arg.Float(fixed_to_float(value)))
+        elif arg.type == 'string':
+            if value is None:
+                args.append(Arg.Null())
+            else:
+                args.append(Arg.String(value))
+        elif arg.type == 'object':
+            if value == 0:
+                args.append(Arg.Null(arg.interface))
+            else:
+                args.append(Arg.Object(UnresolvedObject(value, arg.interface), False))
+        elif arg.type == 'new_id':
+            if arg.interface is None:
+                # Untyped new_ids (like in wl_registry.bind) are sent as an interface name, version and id
+                interface, version, obj_id = value
+                args.append(Arg.String(interface if interface is not None else ''))
+                args.append(Arg.Int(version))
+                args.append(Arg.Object(UnresolvedObject(obj_id, interface), True))
+            else:
+                args.append(Arg.Object(UnresolvedObject(value, arg.interface), True))
+        elif arg.type == 'array':
+            elems: List[Arg.Base] = [
+                Arg.Int(elem) for (elem,) in _int_array.iter_unpack(value[:len(value) - len(value) % 4])
+            ]
+            args.append(Arg.Array(elems))
+        elif arg.type == 'fd':
+            args.append(Arg.Fd(value))
+    return tuple(args)
@@ -3,4 +3,4 @@ A user interface based around text commands and text output suitable for termina
 '''
 from .controller import Controller
 from .terminal_ui import TerminalUI
-from .arguments import Mode, Arguments, parse_args
+from .arguments import Mode, RunBackend, Backpressure, Arguments, parse_args
@@ -14,18 +14,47 @@ class Mode(str, Enum):
     LOAD_FROM_FILE = 'load-from-file'
     PIPE = 'pipe'
 
+class RunBackend(str, Enum):
+    '''How messages are captured from the program in run mode'''
+    DEBUG_OUTPUT = 'debug-output'
+    PRELOAD = 'preload'
+    PROXY = 'proxy'
+
+class Backpressure(str, Enum):
+    '''What to do when messages arrive faster than they can be shown in pipe and run mode'''
+    BLOCK = 'block' # stop reading until the backlog is processed
+    DROP_DISPLAY = 'drop-display' # keep recording messages, but stop showing them until the backlog is processed
+
+default_queue_size = 10000
+
 class Arguments:
     '''
     show_verbose: if to show verbose output
     show_color: if to use terminal colors in output
     show_unprocessed_output: if to pass lines of output that aren't wayland messages through from the program
     mode: the requested mode to use
-    load_path: file path to load protocol messages from (if mode is LOAD_FROM_FILE, empty string otherwise)
+    load_paths: file paths to load protocol messages from, merged by timestamp if there are several (if mode is
+        LOAD_FROM_FILE, empty otherwise)
     filter_matcher: only messages matching this matcher will be shown by default
     stop_matcher: messages matching this matcher will be treated as a breakpoint (if the mode supports that)
     wayland_lib_dir: directory to add to the start of LD_LIBRARY_PATH, should contain a patched and debugable libwayland
     wayland_debug_args: raw arguments, excluding command_args and argument specifying command
     command_args: arguments after command that should be forwarded, or empty if none
+    run_backend: how messages are captured from the program in run mode
+    backpressure: what to do when parsed messages pile up in pipe and run mode
+    queue_size: how many parsed messages can be waiting to be processed in pipe and run mode (with drop-display,
+        how many can be waiting before output is suppressed)
+    profile: if to time each stage of processing messages, and show a summary at the end
+    load_from: when loading a file, seconds since the first message (or before the last if negative) to start showing
+        messages from, or None to start at the beginning
+    load_to: like load_from, but when to stop loading, or None to load until the end
+    write_checkpoints: when loading a file, if to save checkpoints next to it that later loads with load_from can start
+        from
+    stats_only: if to only count messages and objects instead of showing and keeping messages, and show the counts at
+        the end
+    stats_json: path to write the counts to as JSON ('-' for stdout), or None (only used with stats_only)
+    show_leaks: if to show objects that were never destroyed and object lifetimes at the end
+    correlate: when loading several files, if to find connections that are the client and server side of each other
     '''
     def __init__(
         self,
@@ -33,23 +62,45 @@ class Arguments:
         show_color: bool,
         show_unprocessed_output: bool,
         mode: Mode,
-        load_path: str,
+        load_paths: List[str],
         filter_matcher: matcher.Matcher,
         stop_matcher: matcher.Matcher,
         wayland_lib_dir: Optional[str],
         wayland_debug_args: List[str],
-        command_args: List[str]
+        command_args: List[str],
+        run_backend: RunBackend,
+        backpressure: Backpressure,
+        queue_size: int,
+        profile: bool,
+        load_from: Optional[float],
+        load_to: Optional[float],
+        write_checkpoints: bool,
+        stats_only: bool,
+        stats_json: Optional[str],
+        show_leaks: bool,
+        correlate: bool
     ) -> None:
         self.show_verbose = show_verbose
         self.show_color = show_color
         self.show_unprocessed_output = show_unprocessed_output
         self.mode = mode
-        self.load_path = load_path
+        self.load_paths = load_paths
         self.filter_matcher = filter_matcher
         self.stop_matcher = stop_matcher
         self.wayland_lib_dir = wayland_lib_dir
         self.wayland_debug_args = wayland_debug_args
         self.command_args = command_args
+        self.run_backend = run_backend
+        self.backpressure = backpressure
+        self.queue_size = queue_size
+        self.profile = profile
+        self.load_from = load_from
+        self.load_to = load_to
+        self.write_checkpoints = write_checkpoints
+        self.stats_only = stats_only
+        self.stats_json = stats_json
+        self.show_leaks = show_leaks
+        self.correlate = correlate
 
     @staticmethod
     def default() -> 'Arguments':
@@ -58,12 +109,23 @@ class Arguments:
             False,
             False,
             Mode.RUN,
-            '',
+            [],
             matcher.always,
             matcher.never,
             _get_libwayland_lib_path(None),
             ['main.py'],
             [],
+            RunBackend.DEBUG_OUTPUT,
+            Backpressure.BLOCK,
+            default_queue_size,
+            False,
+            None,
+            None,
+            False,
+            False,
+            None,
+            False,
+            False,
         )
 
 def _strip_dashes(s: str) -> str:
@@ -105,7 +167,7 @@ def _select_mode(command_id: str, args) -> Optional[Mode]:
 
     if check_gdb():
         modes.append(Mode.GDB_PLUGIN)
-    if args.path is not None:
+    if args.paths:
         modes.append(Mode.LOAD_FROM_FILE)
     if args.pipe:
         modes.append(Mode.PIPE)
@@ -159,7 +221,7 @@ def parse_args(argv: List[str]) -> Arguments:
     parser.add_argument('--matcher-help', action='store_true', help='show how to write matchers and exit')
     parser.add_argument('-r', '--run', action='store_true', help='run the following program and parse it\'s libwayland debugging messages. All subsequent command line arguments are sent to the program')
     parser.add_argument('-g', '--gdb', action='store_true', help='run inside gdb. All subsequent arguments are sent to gdb. When inside gdb start commands with \'wl\'')
-    parser.add_argument('-l', '--load', dest='path', type=str, help='load WAYLAND_DEBUG=1 messages from a file')
+    parser.add_argument('-l', '--load', dest='paths', type=str, nargs='+', action='extend', metavar='PATH', help='load WAYLAND_DEBUG=1 messages from a file (which may be compressed with gzip, xz or zstd). Several files (such as those of a compositor and its clients) are merged by timestamp')
     parser.add_argument('-p', '--pipe', action='store_true', help='receive WAYLAND_DEBUG=1 messages from stdin (note: messages are printed to stderr so you may want to redirect using 2>&1 before piping)')
     parser.add_argument('-f', '--filter', dest='f', type=str, help='only show these objects/messages (see --matcher-help for syntax)')
     parser.add_argument('-b', '--break', dest='b', type=str, help='stop on these objects/messages (see --matcher-help for syntax)')
@@ -167,6 +229,18 @@ def parse_args(argv: List[str]) -> Arguments:
     parser.add_argument('--color', action='store_true', help='force color output (default for interactive sessions)')
     parser.add_argument('--supress', action='store_true', help='supress non-wayland output of the program')
     parser.add_argument('--verbose', action='store_true', help='verbose output, mostly used for debugging this program')
+    parser.add_argument('--preload', action='store_true', help='in run mode, trace the program with a preloaded library instead of parsing WAYLAND_DEBUG output (much faster, requires libwayland 1.23+ for clients)')
+    parser.add_argument('--proxy', action='store_true', help='in run mode, decode the raw protocol by proxying the program\'s Wayland socket (works with any Wayland library, including ones that are not libwayland)')
+    parser.add_argument('--backpressure', type=Backpressure, choices=[i.value for i in Backpressure], default=Backpressure.BLOCK.value, help='in pipe and run mode, what to do when messages arrive faster than they can be shown: block reading until caught up (default), or drop-display to keep recording messages but stop showing them until caught up')
+    parser.add_argument('--queue-size', type=int, default=default_queue_size, help='in pipe and run mode, how many parsed messages can be waiting to be shown, with drop-display how many before output is suppressed (default ' + str(default_queue_size) + ')')
+    parser.add_argument('--profile', action='store_true', help='time each stage of processing messages (parsing, resolving, matching, output), use the stats command to see the results so far and a summary is shown at the end')
+    parser.add_argument('--from', dest='load_from', type=float, metavar='SECONDS', help='when loading a file, skip to this many seconds after the first message (or before the last if negative). Earlier messages are only used to keep track of objects')
+    parser.add_argument('--to', dest='load_to', type=float, metavar='SECONDS', help='when loading a file, stop loading this many seconds after the first message (or before the last if negative)')
+    parser.add_argument('--checkpoints', action='store_true', help='when loading an uncompressed file, save the state of every connection at regular points to a file next to it, so later loads with --from can start from the nearest one instead of scanning the whole log')
+    parser.add_argument('--stats-only', action='store_true', help='instead of showing messages, only count messages and objects (by interface, message, connection and second) and show a summary at the end. Messages are not kept, so memory use does not grow with the number of messages')
+    parser.add_argument('--stats-json', type=str, metavar='PATH', help='write the --stats-only summary to a file as JSON (- for stdout), implies --stats-only')
+    parser.add_argument('--leaks', action='store_true', help='at the end, show how many objects of each type were never destroyed, and how long objects lived (same as the leaks command). When loading a file, exit instead of waiting for commands')
+    parser.add_argument('--correlate', action='store_true', help='when loading several files, find connections that are the client and server side of each other by comparing their messages')
     parser.add_argument('--libwayland', type=str, help='path to directory that contains libwayland-client.so and libwayland-server.so. Only applies to GDB and run mode. Must come before --gdb/--run argument')
     # NOTE: -g/--gdb, -r/--run and --libwayland are here only for the help text, they are processed without argparse
 
@@ -209,7 +283,7 @@ def parse_args(argv: List[str]) -> Arguments:
         parser.print_help()
         exit(0)
 
-    load_path = args.path if args.path else ''
+    load_paths = args.paths if args.paths else []
 
     filter_matcher = matcher.always
     if args.f:
@@ -229,15 +303,61 @@ def parse_args(argv: List[str]) -> Arguments:
 
     libwayland_lib_dir = _get_libwayland_lib_path(args.libwayland)
 
+    run_backend = RunBackend.DEBUG_OUTPUT
+    if args.preload:
+        if mode != Mode.RUN:
+            logging.warning('ignoring --preload, since it only applies to run mode')
+        run_backend = RunBackend.PRELOAD
+    if args.proxy:
+        if mode != Mode.RUN:
+            logging.warning('ignoring --proxy, since it only applies to run mode')
+        if args.preload:
+            raise RuntimeError('--preload and --proxy can not be used together')
+        run_backend = RunBackend.PROXY
+
+    if (args.load_from is not None or args.load_to is not None) and mode != Mode.LOAD_FROM_FILE:
+        logging.warning('ignoring --from and --to, since they only apply when loading a file')
+        args.load_from = None
+        args.load_to = None
+    if args.checkpoints and mode != Mode.LOAD_FROM_FILE:
+        logging.warning('ignoring --checkpoints, since it only applies when loading a file')
+        args.checkpoints = False
+
+    if len(load_paths) > 1 and (args.load_from is not None or args.load_to is not None or args.checkpoints):
+        raise RuntimeError('--from, --to and --checkpoints can only be used when loading a single file')
+    if args.correlate and len(load_paths) < 2:
+        logging.warning('ignoring --correlate, since it only applies when loading several files')
+        args.correlate = False
+
+    stats_only = bool(args.stats_only or args.stats_json)
+    if stats_only and mode in (Mode.GDB_RUNNER, Mode.GDB_PLUGIN):
+        raise RuntimeError('--stats-only can not be used with GDB')
+    if args.leaks and mode in (Mode.GDB_RUNNER, Mode.GDB_PLUGIN):
+        raise RuntimeError('--leaks can not be used with GDB')
+
+    if args.queue_size < 1:
+        raise RuntimeError('--queue-size must be at least 1')
+
     return Arguments(
         show_verbose,
         show_color,
         show_unprocessed_output,
         mode,
-        load_path,
+        load_paths,
         filter_matcher,
         stop_matcher,
         libwayland_lib_dir,
         wayland_debug_args,
-        command_args
+        command_args,
+        run_backend,
+        args.backpressure,
+        args.queue_size,
+        args.profile,
+        args.load_from,
+        args.load_to,
+        args.checkpoints,
+        stats_only,
+        args.stats_json,
+        args.leaks,
+        args.correlate
     )
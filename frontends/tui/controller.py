@@ -1,13 +1,19 @@
 import re
 import logging
-from typing import Optional, Callable, List, Tuple
+from typing import Optional, Callable, Dict, List, Tuple
 
 from interfaces import CommandSink, ConnectionList, Connection, UIState
 from core import wl, matcher
+from core.profiling import Profiler
+from core import frames, columnar
+from core.clock import to_seconds, us_per_second
+from core.lifetimes import format_seconds
+from core.object_store import type_matches
 from core.util import *
 from core.output import Output
 
 help_command_color = alert_color
+histogram_width = 40 # Characters in the bar of the largest group
 
 def command_format(cmd: str) -> str:
     if check_gdb():
@@ -41,12 +47,20 @@ class Controller(CommandSink,
         output: Output,
         connection_list: ConnectionList,
         display_matcher: matcher.MessageMatcher,
-        stop_matcher: matcher.MessageMatcher
+        stop_matcher: matcher.MessageMatcher,
+        profiler: Optional[Profiler] = None,
+        keep_history: bool = True
     ):
         self.out = output
+        self.profiler = profiler
         self.connection_list = connection_list
+        self.keep_history = keep_history
         self.all_messages: List[wl.Message] = []
+        # Made the first time a large history is searched, if NumPy is available
+        self.columns: Optional[columnar.ColumnarHistory] = None
         connection_list.add_connection_list_listener(self, True)
+        self.frame_timing = frames.FrameTiming()
+        connection_list.add_connection_list_listener(self.frame_timing, True)
         self.display_matcher = display_matcher
         self.stop_matcher = stop_matcher
         self.current_connection: Optional[Connection] = None # The connection that is currently being shown
@@ -57,6 +71,13 @@ class Controller(CommandSink,
                 'List messages matching given matcher (or use the current filter matcher if none provided)\n' +
                 'Append "~ COUNT" to show at most the last COUNT messages that match\n' +
                 'See ' + command_format('help matcher') + ' for matcher syntax'),
+            Command('count', '[CONN:] [MATCHER]', self.count_command,
+                'Count messages matching given matcher (or the current filter matcher if none provided) without\n' +
+                'showing them, which is much quicker than ' + command_format('list') + ' on long sessions'),
+            Command('histogram', '[CONN:] [MATCHER] [by name|type|connection|second]', self.histogram_command,
+                'Show how many messages match given matcher (or the current filter matcher if none provided)\n' +
+                'for each message name (the default), object type, connection or second since the start\n' +
+                'For example ' + command_format('histogram wl_surface.commit by second') + ' shows commits per second'),
             Command('filter', '[MATCHER]', self.filter_command,
                 'Show the current output filter matcher, or add a new one\n' +
                 'See ' + command_format('help matcher') + ' for matcher syntax'),
@@ -69,13 +90,31 @@ class Controller(CommandSink,
             Command('connection', '[CONNECTION]', self.connection_command,
                 'Show Wayland connections, or switch to seeing messages from a specific connection\n' +
                 'Switch to `all` to see messages from all connections (default)'),
+            Command('objects', '[TYPE]', self.objects_command,
+                'Show how many objects of each type are alive, or list the live objects of the given type\n' +
+                'The type may contain wildcards, only the current connection is shown if one is selected'),
+            Command('leaks', '[TYPE]', self.leaks_command,
+                'Show how many objects of each type were created and destroyed, how long they lived and how many\n' +
+                'are still alive (or were when the connection closed)\n' +
+                'With a type (which may contain wildcards), show its live count over time and the objects still alive'),
+            Command('frames', None, self.frames_command,
+                'Show frame timing of each surface: time between commits and how much it varies (jitter), how long\n' +
+                'frame callbacks take to be done, and how long configures take to be acked and then committed\n' +
+                'Recent numbers cover the last ' + str(frames.recent_frames) + ' frames of each surface'),
+            Command('roundtrips', None, self.roundtrips_command,
+                'Show how long wl_display.sync requests took to be answered on each connection, and how many are\n' +
+                'still waiting (with how long the oldest has been waiting for, which points to a stalled compositor)'),
+            Command('stats', None, self.stats_command,
+                'Show message and connection counts, and the time spent in each stage if run with --profile'),
             Command('resume', None, self.resume_command,
                 'Resume processing events\n' +
                 'In GDB you can also use the continue gdb command'),
             Command('quit', None, self.quit_command,
                 'Quit the program'),
         ]
-        self.last_shown_timestamp: Optional[float] = None
+        self.last_shown_timestamp: Optional[int] = None
+        self.output_suppressed = False
+        self.suppressed_count = 0 # Messages that matched the display matcher but were not shown due to suppression
         self.ui_state_listener = new_disseminator_of_type(UIState.Listener)
 
     def process_command(self, input_line: str) -> None:
@@ -120,14 +159,42 @@ class Controller(CommandSink,
 
     def connection_got_new_message(self, connection: Connection, message: wl.Message) -> None:
         '''Overrides method in Connection.Listener'''
-        self.all_messages.append(message)
+        if self.keep_history:
+            self.all_messages.append(message)
         if self.current_connection is None or connection == self.current_connection:
             if self.display_matcher.matches(message):
-                self._show_message(message)
+                if self.output_suppressed:
+                    self.suppressed_count += 1
+                else:
+                    self._show_message(message)
             if self.stop_matcher.matches(message):
                 self.out.show(color(alert_color, '    Stopped at ') + str(message).strip())
                 self.ui_state_listener.pause_requested()
 
+    def connection_got_new_messages(self, connection: Connection, messages: List[wl.Message]) -> None:
+        '''Overrides method in Connection.Listener'''
+        if self.keep_history:
+            self.all_messages.extend(messages)
+        if self.current_connection is not None and connection != self.current_connection:
+            return
+        display_matches = self.display_matcher.matches
+        stop_matches = self.stop_matcher.matches
+        # Shown all at once so the output is only written to once per batch
+        lines: List[str] = []
+        for message in messages:
+            if display_matches(message):
+                if self.output_suppressed:
+                    self.suppressed_count += 1
+                else:
+                    self._message_lines(message, lines)
+            if stop_matches(message):
+                lines.append(color(alert_color, '    Stopped at ') + str(message).strip())
+                self.out.show('\n'.join(lines))
+                lines = []
+                self.ui_state_listener.pause_requested()
+        if lines:
+            self.out.show('\n'.join(lines))
+
     def connection_closed(self, connection: Connection) -> None:
         '''Overrides method in Connection.Listener'''
         self.out.show(color(
@@ -142,6 +209,18 @@ class Controller(CommandSink,
         '''Overrides method in UIState'''
         self.ui_state_listener.remove_listener(listener)
 
+    def set_output_suppressed(self, suppressed: bool) -> None:
+        '''Overrides method in UIState'''
+        if suppressed == self.output_suppressed:
+            return
+        self.output_suppressed = suppressed
+        if not suppressed and self.suppressed_count:
+            self.out.show(color(
+                alert_color,
+                '    ───┤ ' + str(self.suppressed_count) + ' messages not shown while catching up ├───'))
+            self.suppressed_count = 0
+            self.last_shown_timestamp = None
+
     def show_messages(self, connection: Optional[Connection], matcher: matcher.MessageMatcher, cap: Optional[int]) -> None:
         msg = 'Messages that match ' + str(matcher)
         if connection is not None and connection != self.current_connection:
@@ -166,12 +245,18 @@ class Controller(CommandSink,
                 ')')
             self.last_shown_timestamp = None
 
-    def _show_message(self, message: wl.Message) -> None:
+    def _message_lines(self, message: wl.Message, lines: List[str]) -> None:
+        '''Append the lines that show the given message'''
         delta = message.timestamp - self.last_shown_timestamp if self.last_shown_timestamp is not None else 0
-        if delta > 1.0:
-            self.out.show(color(timestamp_color, '    ───┤ {:0.4f}s ├───'.format(delta)))
+        if delta > us_per_second:
+            lines.append(color(timestamp_color, '    ───┤ {:0.4f}s ├───'.format(to_seconds(delta))))
         self.last_shown_timestamp = message.timestamp
-        message.show(self.out)
+        lines.append(message.line())
+
+    def _show_message(self, message: wl.Message) -> None:
+        lines: List[str] = []
+        self._message_lines(message, lines)
+        self.out.show('\n'.join(lines))
 
     def _get_matching(
         self,
@@ -181,6 +266,8 @@ class Controller(CommandSink,
     ) -> Tuple[List[wl.Message], int, int, int]:
         if cap == 0:
             cap = None
+        if self._use_columns():
+            return self._get_matching_columnar(connection, matcher, cap)
         didnt_match = 0
         acc = []
         if connection:
@@ -196,6 +283,58 @@ class Controller(CommandSink,
                 didnt_match += 1
         return (list(reversed(acc)), len(acc), didnt_match, len(messages) - len(acc) - didnt_match)
 
+    def _get_matching_columnar(
+        self,
+        connection: Optional[Connection],
+        matcher: matcher.MessageMatcher,
+        cap: Optional[int]
+    ) -> Tuple[List[wl.Message], int, int, int]:
+        '''Same as _get_matching(), but searches all of history at once with NumPy'''
+        columns = self._columns()
+        if connection:
+            on_connection = columns.connection_mask(connection.name())
+            mask = columns.mask(matcher, on_connection)
+        else:
+            mask = columns.mask(matcher)
+        rows = columnar.rows(mask)
+        total = len(connection.messages()) if connection else len(columns)
+        checked = total
+        if cap and len(rows) >= cap:
+            # Counted as if checking stopped at the last match needed, like _get_matching()
+            rows = rows[-cap:]
+            checked = total - (int(on_connection[:rows[0]].sum()) if connection else rows[0])
+        return [columns.messages[i] for i in rows], len(rows), checked - len(rows), total - checked
+
+    def _use_columns(self) -> bool:
+        return len(self.all_messages) >= columnar.min_rows and columnar.available()
+
+    def _columns(self) -> columnar.ColumnarHistory:
+        '''Returns the columnar copy of history, brought up to date with any new messages'''
+        if self.columns is None:
+            self.columns = columnar.ColumnarHistory()
+        self.columns.update(self.all_messages)
+        return self.columns
+
+    def _tally(
+        self,
+        connection: Optional[Connection],
+        matcher: matcher.MessageMatcher,
+        by: Optional[str]
+    ) -> Tuple[int, int, Dict[columnar.Key, int]]:
+        '''Returns how many messages match, how many were checked and (if by is given) the histogram of matches
+        Nothing is shown or copied out of history, so this stays quick on very long sessions
+        Raises: RuntimeError if by is not one of columnar.histogram_keys
+        '''
+        if self._use_columns():
+            columns = self._columns()
+            within = columns.connection_mask(connection.name()) if connection else None
+            mask = columns.mask(matcher, within)
+            total = len(connection.messages()) if connection else len(columns)
+            return int(mask.sum()), total, columns.histogram(mask, by) if by else {}
+        messages = connection.messages() if connection else self.all_messages
+        matches = [message for message in messages if matcher.matches(message)]
+        return len(matches), len(messages), columnar.histogram(matches, by) if by else {}
+
     def _get_command(self, command: str) -> Optional[Command]:
         found = []
         for c in self.commands:
@@ -287,6 +426,41 @@ class Controller(CommandSink,
             m = self.parse_and_join(arg, None)
         self.show_messages(self.current_connection, m, cap)
 
+    def count_command(self, arg: str) -> None:
+        m = self.parse_and_join(arg, None) if arg else self.display_matcher
+        count, total, _ = self._tally(self.current_connection, m, None)
+        self.out.show(
+            color(int_color, str(count)) + ' of ' + str(total) + ' messages' +
+            (' on ' + self.current_connection.name() if self.current_connection else '') + ' match ' + str(m))
+
+    def histogram_command(self, arg: str) -> None:
+        by = 'name'
+        by_match = re.fullmatch(r'(?:(.*)\s)?by\s+(\w+)\s*', arg)
+        if by_match:
+            arg = (by_match.group(1) or '').strip()
+            by = by_match.group(2)
+        m = self.parse_and_join(arg, None) if arg else self.display_matcher
+        try:
+            count, _, counts = self._tally(self.current_connection, m, by)
+        except RuntimeError as e:
+            self.out.error(str(e))
+            return
+        if not count:
+            self.out.show('No messages match ' + str(m))
+            return
+        if by == 'second':
+            groups = sorted(counts.items(), key=lambda item: item[0])
+            labels = ['{}s'.format(second) for second, _ in groups]
+        else:
+            groups = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+            labels = [str(key) for key, _ in groups]
+        most = max(counts.values())
+        lines = table_lines([(by, 'messages')] + [(label, str(n)) for label, (_, n) in zip(labels, groups)])
+        for i, (_, n) in enumerate(groups):
+            lines[i + 1] += '  ' + '#' * max(1, round(histogram_width * n / most))
+        self.out.show(str(count) + ' messages match ' + str(m))
+        self.out.show('\n'.join(lines))
+
     def _get_connection(self, name: str) -> Optional[Connection]:
         name = name.lower()
         for connection in self.connection_list.connections():
@@ -329,6 +503,98 @@ class Controller(CommandSink,
             line += color(int_color, str(len(connection.messages()))) + ' messages'
             self.out.show(line)
 
+    def objects_command(self, arg: str) -> None:
+        if self.current_connection is None:
+            connections: Tuple[Connection, ...] = self.connection_list.connections()
+        else:
+            connections = (self.current_connection,)
+        for connection in connections:
+            objects = connection.live_objects(arg if arg else None)
+            self.out.show(
+                color('1;37', connection.name()) + ': ' + color(int_color, str(len(objects))) + ' live object' +
+                ('' if len(objects) == 1 else 's') + (' of type ' + arg if arg else ''))
+            if arg:
+                for obj in objects:
+                    self.out.show('    ' + str(obj))
+            else:
+                counts: Dict[str, int] = {}
+                for obj in objects:
+                    counts[obj.type_str()] = counts.get(obj.type_str(), 0) + 1
+                for type_name, count in sorted(counts.items(), key=lambda item: (-item[1], item[0])):
+                    self.out.show('    ' + color(object_type_color, type_name) + ': ' + color(int_color, str(count)))
+
+    def leaks_command(self, arg: str) -> None:
+        if self.current_connection is None:
+            connections: Tuple[Connection, ...] = self.connection_list.connections()
+        else:
+            connections = (self.current_connection,)
+        for connection in connections:
+            lifetimes = connection.object_lifetimes()
+            live = sum(lifetimes.live_counts().values())
+            self.out.show(
+                color('1;37', connection.name()) + ': ' + color(int_color, str(live)) + ' object' +
+                ('' if live == 1 else 's') + ' never destroyed' +
+                (' so far' if connection.is_open() else ' before the connection closed'))
+            if not arg:
+                self.out.show('\n'.join('    ' + line for line in table_lines(lifetimes.report())))
+                continue
+            for interface in lifetimes.interfaces.values():
+                if not type_matches(arg, interface.name):
+                    continue
+                self.out.show('  ' + color(object_type_color, interface.name) + ' live over time:')
+                for start, end, count in interface.live_over_time(10):
+                    self.out.show(
+                        '    ' + color(timestamp_color, '{:0.2f}s - {:0.2f}s'.format(start, end)) + ': ' +
+                        color(int_color, str(count)))
+            for obj in connection.live_objects(arg):
+                self.out.show('    ' + str(obj) + ' created at ' + color(timestamp_color, '{:0.4f}s'.format(to_seconds(obj.create_time or 0))))
+
+    def frames_command(self, arg: str) -> None:
+        connection_name = self.current_connection.name() if self.current_connection is not None else None
+        lines = self.frame_timing.report(connection_name)
+        if lines:
+            self.out.show('\n'.join(lines))
+        else:
+            self.out.show('No surfaces have been committed' + (' on ' + connection_name if connection_name else ''))
+
+    def roundtrips_command(self, arg: str) -> None:
+        if self.current_connection is None:
+            connections: Tuple[Connection, ...] = self.connection_list.connections()
+        else:
+            connections = (self.current_connection,)
+        rows: List[Tuple[str, ...]] = [('connection', 'roundtrips', 'p50', 'p90', 'p99', 'max', 'waiting', 'oldest')]
+        for connection in connections:
+            roundtrips = connection.roundtrips()
+            latencies = roundtrips.latencies
+            messages = connection.messages()
+            oldest = None
+            if roundtrips.pending and messages:
+                oldest = to_seconds(messages[-1].timestamp - min(roundtrips.pending.values()))
+            rows.append((
+                connection.name(),
+                str(latencies.count),
+                format_seconds(latencies.percentile(50)),
+                format_seconds(latencies.percentile(90)),
+                format_seconds(latencies.percentile(99)),
+                format_seconds(latencies.max if latencies.count else None),
+                str(len(roundtrips.pending)),
+                format_seconds(oldest),
+            ))
+        if len(rows) == 1:
+            self.out.show('No connections')
+        else:
+            self.out.show('\n'.join(table_lines(rows)))
+
+    def stats_command(self, arg: str) -> None:
+        connections = self.connection_list.connections()
+        self.out.show(
+            str(len(self.all_messages)) + ' messages on ' +
+            str(len(connections)) + ' connection' + ('' if len(connections) == 1 else 's'))
+        if self.profiler is None:
+            self.out.show('Run with --profile to see time spent in each stage')
+        else:
+            self.out.show('\n'.join(self.profiler.summary('resolve')))
+
     def resume_command(self, arg: str) -> None:
         logging.info('Resuming…')
         self.ui_state_listener.resume_requested()
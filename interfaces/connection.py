@@ -1,8 +1,9 @@
 from abc import abstractmethod
-from typing import Tuple, Optional, TYPE_CHECKING
+from typing import Any, Dict, Tuple, Optional, List, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from core import wl
+    from core.lifetimes import ObjectLifetimes
 
 class Connection():
     '''A single Wayland client-server connection'''
@@ -16,7 +17,33 @@ class Connection():
             raise NotImplementedError()
 
         @abstractmethod
-        def close(self, time: float) -> None:
+        def message_batch(self, messages: List['wl.Message']) -> None:
+            '''Process several new messages in order, listeners are notified of them together
+            Raises: RuntimeError if any messages could not be processed, after processing the rest
+            '''
+            raise NotImplementedError()
+
+        @abstractmethod
+        def track(self, message: 'wl.Message') -> None:
+            '''Resolve a message so the objects it creates and destroys are known, without keeping it or notifying
+            listeners of it'''
+            raise NotImplementedError()
+
+        @abstractmethod
+        def save_state(self) -> Dict[str, Any]:
+            '''Returns the objects, object lifetimes, roundtrips and other state of the connection, which can be turned into
+            JSON
+            The message history is not included
+            '''
+            raise NotImplementedError()
+
+        @abstractmethod
+        def load_state(self, state: Dict[str, Any]) -> None:
+            '''Restore the state returned by save_state(), only used on connections that have just been opened'''
+            raise NotImplementedError()
+
+        @abstractmethod
+        def close(self, time: int) -> None:
             '''Close the connection
             time: the time the connection was closed
             '''
@@ -40,6 +67,11 @@ class Connection():
             '''Called when a new message has been processed'''
             raise NotImplementedError()
 
+        @abstractmethod
+        def connection_got_new_messages(self, connection: 'Connection', messages: List['wl.Message']) -> None:
+            '''Called when several new messages have been processed at once'''
+            raise NotImplementedError()
+
         @abstractmethod
         def connection_closed(self, connection: 'Connection') -> None:
             '''Called only once when the connection is closed'''
@@ -71,7 +103,7 @@ class Connection():
         raise NotImplementedError()
 
     @abstractmethod
-    def create_object(self, time: float, parent: 'wl.ObjectBase', obj_id: int, type_name: str) -> 'wl.ObjectBase':
+    def create_object(self, time: int, parent: 'wl.ObjectBase', obj_id: int, type_name: str) -> 'wl.ObjectBase':
         '''Create a new objects and add it to the database
         time: the time to create the object with
         parent: the object that created this object
@@ -90,6 +122,33 @@ class Connection():
         '''
         raise NotImplementedError()
 
+    @abstractmethod
+    def object_destroyed(self, obj: 'wl.ObjectBase') -> None:
+        '''Called by objects of this connection when they are destroyed'''
+        raise NotImplementedError()
+
+    @abstractmethod
+    def object_lifetimes(self) -> 'ObjectLifetimes':
+        '''Get counts of how many objects of each interface have been created, destroyed and are alive'''
+        raise NotImplementedError()
+
+    @abstractmethod
+    def roundtrips(self) -> 'wl.Roundtrips':
+        '''Get how long wl_display.sync requests took to be answered, and the ones that have not been yet'''
+        raise NotImplementedError()
+
+    @abstractmethod
+    def resolve_message(self, message: 'wl.Message') -> None:
+        '''Resolve a message with this connection's resolver, so the objects and roundtrips it changes are recorded'''
+        raise NotImplementedError()
+
+    @abstractmethod
+    def live_objects(self, type_pattern: Optional[str]) -> Tuple['wl.ObjectBase', ...]:
+        '''Get the objects that have been created and not yet destroyed, ordered by ID
+        type_pattern: str or None, if set only objects with matching types are returned, wildcards allowed
+        '''
+        raise NotImplementedError()
+
     @abstractmethod
     def wl_display(self) -> 'wl.ObjectBase':
         '''Get the wl_display object every connection has'''
@@ -1,5 +1,5 @@
 from abc import abstractmethod
-from typing import Optional, TYPE_CHECKING
+from typing import Any, Dict, Optional, List, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from core import wl
@@ -9,9 +9,9 @@ class ConnectionIDSink:
     '''Receives messages and connection created/deleted events based on a unique connection ID'''
 
     @abstractmethod
-    def open_connection(self, time: float, connection_id: str, is_server: Optional[bool]) -> 'Connection':
+    def open_connection(self, time: int, connection_id: str, is_server: Optional[bool]) -> 'Connection':
         '''Open a new client-server connection
-        time: what is returned by time.perf_counter() will do
+        time: in whole microseconds, what is returned by time.perf_counter_ns() // 1000 will do
         connection_id: unique identifier of the connection (only used internally, never shown to user)
         is_server: if this connection is a server or a client (can be None if value is unknown)
         returns: the newly created connection
@@ -20,9 +20,9 @@ class ConnectionIDSink:
         raise NotImplementedError()
 
     @abstractmethod
-    def close_connection(self, time: float, connection_id: str) -> None:
+    def close_connection(self, time: int, connection_id: str) -> None:
         '''Close the given connection
-        time: what is returned by time.perf_counter() will do
+        time: in whole microseconds, what is returned by time.perf_counter_ns() // 1000 will do
         connection_id: the unique ID the connection was created with
         '''
         raise NotImplementedError()
@@ -34,3 +34,45 @@ class ConnectionIDSink:
         message: the message
         '''
         raise NotImplementedError()
+
+    @abstractmethod
+    def messages(self, connection_id: str, batch: List['wl.Message']) -> None:
+        '''Process several messages on the same connection at once, in order
+        Used by backends that don't need to stop between messages, it's faster than calling message() for each
+        connection_id: the unique ID of the connection the messages were on
+        batch: the messages
+        Raises: RuntimeError if any messages could not be processed, after processing the rest
+        '''
+        raise NotImplementedError()
+
+    @abstractmethod
+    def track(self, connection_id: str, message: 'wl.Message') -> None:
+        '''Update the objects of a connection with a message, without keeping or showing it
+        Used for messages before the part of a log being loaded, so objects created earlier still resolve
+        connection_id: the unique ID of the connection this message was on
+        message: the message
+        '''
+        raise NotImplementedError()
+
+    @abstractmethod
+    def save_state(self) -> Dict[str, Any]:
+        '''Returns the state of the session, which can be turned into JSON
+        'connections' has the state of each connection (open or closed) in the order they were opened. Each has the
+        'connection_id' it was opened with, and a 'close_time' that is None if it is still open
+        'lifetimes' (if present) has the counts of objects of all connections together
+        The message history is not saved, but everything else that is known about the connections and their objects is
+        '''
+        raise NotImplementedError()
+
+    @abstractmethod
+    def load_state(self, state: Dict[str, Any]) -> None:
+        '''Open (and close) connections with the state returned by save_state()'''
+        raise NotImplementedError()
+
+    @abstractmethod
+    def set_start_time(self, time: int) -> None:
+        '''Set the time timestamps are made relative to, instead of the first time the sink gets
+        Has no effect if the sink has already got a time, so it should be called before any connections are opened
+        time: in the same clock as the times and timestamps the sink gets
+        '''
+        raise NotImplementedError()
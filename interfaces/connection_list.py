@@ -3,6 +3,7 @@ from typing import Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from . import Connection
+    from core.lifetimes import ObjectLifetimes
 
 class ConnectionList:
     '''Simply a list of wl.Connections that supports adding listeners'''
@@ -22,6 +23,11 @@ class ConnectionList:
         '''Get all connections (open and closed) in order they were created'''
         raise NotImplementedError()
 
+    @abstractmethod
+    def object_lifetimes(self) -> 'ObjectLifetimes':
+        '''Get counts of the objects of all connections together, peaks are of how many were alive at the same time'''
+        raise NotImplementedError()
+
     @abstractmethod
     def add_connection_list_listener(self, listener: Listener, catch_up: bool) -> None:
         '''Add a listener to be notified of opened and closed connections
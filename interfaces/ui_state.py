@@ -23,3 +23,9 @@ class UIState:
     def remove_ui_state_listener(self, listener: Listener) -> None:
         '''Stop being notified'''
         raise NotImplementedError()
+
+    def set_output_suppressed(self, suppressed: bool) -> None:
+        '''While output is suppressed new messages are still recorded, but not shown
+        Used by backends that are falling behind the messages they receive
+        '''
+        raise NotImplementedError()
@@ -1,17 +1,22 @@
 #!/usr/bin/python3
 
 import sys
+import os
 import re
+import json
 import logging
-from typing import Callable, List
+from typing import Callable, Dict, List, Optional
 
-from interfaces import UIState, ConnectionIDSink, CommandSink
-from core import matcher, ConnectionManager
+from interfaces import UIState, ConnectionIDSink, CommandSink, Connection
+from core import matcher, ConnectionManager, wl
+from core.correlate import Correlator
+from core.profiling import Profiler
+from core.stats import MessageStats
 from core.util import check_gdb, set_color_output, set_verbose, color
 from core.wl import protocol
-from frontends.tui import Controller, TerminalUI, parse_args, Arguments, Mode
-from backends.libwayland_debug_output import parse, run_program
-from backends import gdb_plugin
+from frontends.tui import Controller, TerminalUI, parse_args, Arguments, Mode, RunBackend
+from backends.libwayland_debug_output import parse, time_range, merge, run_program, Pipeline, open_log
+from backends import gdb_plugin, preload_shim, wire_proxy
 from core.output import stream, Output
 
 logging.basicConfig()
@@ -20,9 +25,11 @@ set_verbose(False)
 if sys.version_info[0] < 3 or sys.version_info[1] < 8:
     logging.error('Needs at least Python 3.8!')
 
-def piped_input_main(output: Output, connection_id_sink: ConnectionIDSink) -> None:
+def piped_input_main(output: Output, args: Arguments, connection_id_sink: ConnectionIDSink, ui_state: UIState) -> None:
     logging.info('Getting input piped from stdin')
-    parse.into_sink(sys.stdin, output, connection_id_sink)
+    pipeline = Pipeline(output, connection_id_sink, ui_state, args.backpressure, args.queue_size)
+    pipeline.start(os.dup(sys.stdin.fileno()))
+    pipeline.run()
     logging.info('Done with input')
 
 def file_input_main(
@@ -31,19 +38,85 @@ def file_input_main(
     connection_id_sink: ConnectionIDSink,
     command_sink: CommandSink,
     ui_state: UIState,
-    input_func: Callable[[str], str]
+    input_func: Callable[[str], str],
+    load_from: Optional[float] = None,
+    load_to: Optional[float] = None,
+    write_checkpoints: bool = False,
+    interactive: bool = True
 ) -> None:
     ui = TerminalUI(command_sink, ui_state, input_func)
     logging.info('Opening ' + file_path)
     try:
-        input_file = open(file_path)
-        parse.into_sink(input_file, output, connection_id_sink)
-        input_file.close()
+        if load_from is None and load_to is None and not write_checkpoints:
+            input_file = open_log(file_path)
+            parse.into_sink(input_file, output, connection_id_sink)
+            input_file.close()
+        else:
+            time_range.into_sink(file_path, output, connection_id_sink, load_from, load_to, write_checkpoints)
     except FileNotFoundError:
         output.error(file_path + ' not found')
-    ui.run_until_stopped()
+    if interactive:
+        ui.run_until_stopped()
     logging.info('Done with file')
 
+def merged_files_main(
+    file_paths: List[str],
+    output: Output,
+    connection_manager: ConnectionManager,
+    command_sink: CommandSink,
+    ui_state: UIState,
+    input_func: Callable[[str], str],
+    correlate: bool = False,
+    interactive: bool = True
+) -> None:
+    ui = TerminalUI(command_sink, ui_state, input_func)
+    correlator = None
+    if correlate:
+        correlator = Correlator()
+        connection_manager.add_connection_list_listener(correlator, True)
+    sinks = [connection_manager.namespace(str(i) + '/') for i in range(len(file_paths))]
+    logging.info('Opening ' + ', '.join(file_paths))
+    try:
+        merge.into_sinks(file_paths, output, list(sinks))
+    except FileNotFoundError as e:
+        output.error(str(e.filename) + ' not found')
+    sources: Dict[Connection, str] = {}
+    for path, sink in zip(file_paths, sinks):
+        names = [connection.name() for connection in sink.opened]
+        output.show(path + ': ' + (', '.join(names) if names else 'no connections'))
+        for connection in sink.opened:
+            sources[connection] = path
+    if correlator is not None:
+        matches = correlator.matches(sources)
+        for client, server, similarity in matches:
+            output.show(
+                'Client ' + client.name() + ' (' + sources[client] + ') is server ' + server.name() +
+                ' (' + sources[server] + '), ' + '{:0.0f}%'.format(similarity * 100) + ' of messages match')
+        if not matches:
+            output.show('No connections are the same connection from the other side')
+    if interactive:
+        ui.run_until_stopped()
+    logging.info('Done with files')
+
+def start_profiling() -> Profiler:
+    '''Instrument each stage of processing a message, must be called before anything is created'''
+    profiler = Profiler()
+    profiler.instrument(parse, 'message', 'parse')
+    profiler.instrument(wl.Resolver, 'resolve', 'resolve')
+    profiler.instrument(Controller, 'connection_got_new_message', 'match')
+    profiler.instrument(Controller, 'connection_got_new_messages', 'match')
+    # Commands also show output while the user is idle at the prompt, so this doesn't extend the elapsed time
+    profiler.instrument(Output, 'show', 'output', counts_as_work=False)
+    return profiler
+
+def show_stats(output: Output, stats: MessageStats, json_path: Optional[str]) -> None:
+    output.show('\n'.join(['Stats:'] + ['  ' + line for line in stats.summary()]))
+    if json_path == '-':
+        output.show(json.dumps(stats.to_json(), indent=2))
+    elif json_path is not None:
+        with open(json_path, 'w') as f:
+            json.dump(stats.to_json(), f, indent=2)
+
 def main(args: Arguments, output: Output, input_func: Callable[[str], str]) -> None:
     # If we want to run inside GDB, the rest of main does not get called in this instance of the script
     # Instead GDB is run, an instance of wayland-debug is run inside it and main() is run in that
@@ -54,25 +127,54 @@ def main(args: Arguments, output: Output, input_func: Callable[[str], str]) -> N
             logging.error(e)
     else:
         protocol.load_all(output)
-        connection_list = ConnectionManager()
-        ui_controller = Controller(output, connection_list, args.filter_matcher, args.stop_matcher)
+        profiler = start_profiling() if args.profile else None
+        connection_list = ConnectionManager(keep_history=not args.stats_only)
+        stats = None
+        if args.stats_only:
+            # Messages are counted instead of shown or kept
+            stats = MessageStats()
+            connection_list.add_connection_list_listener(stats, True)
+            ui_controller = Controller(output, connection_list, matcher.never, matcher.never, profiler, keep_history=False)
+        else:
+            ui_controller = Controller(output, connection_list, args.filter_matcher, args.stop_matcher, profiler)
+        returncode = 0
         if args.mode == Mode.GDB_PLUGIN:
             try:
                 gdb_plugin.plugin.Plugin(output, connection_list, ui_controller, ui_controller)
             except:
                 import traceback
                 traceback.print_exc()
+        elif args.mode == Mode.LOAD_FROM_FILE and len(args.load_paths) > 1:
+            merged_files_main(
+                args.load_paths, output, connection_list, ui_controller, ui_controller, input_func,
+                args.correlate, not (args.stats_only or args.show_leaks))
         elif args.mode == Mode.LOAD_FROM_FILE:
-            file_input_main(args.load_path, output, connection_list, ui_controller, ui_controller, input_func)
+            file_input_main(
+                args.load_paths[0], output, connection_list, ui_controller, ui_controller, input_func,
+                args.load_from, args.load_to, args.write_checkpoints, not (args.stats_only or args.show_leaks))
         elif args.mode == Mode.PIPE:
             if args.stop_matcher != matcher.never:
                 output.warn('Ignoring stop matcher when stdin is used for messages')
-            piped_input_main(output, connection_list)
+            piped_input_main(output, args, connection_list, ui_controller)
         elif args.mode == Mode.RUN:
-            returncode = run_program(output, args, connection_list, ui_controller, ui_controller, input_func)
-            exit(returncode)
+            if args.run_backend == RunBackend.PRELOAD:
+                returncode = preload_shim.run_program(output, args, connection_list, ui_controller, ui_controller, input_func)
+            elif args.run_backend == RunBackend.PROXY:
+                returncode = wire_proxy.run_program(output, args, connection_list, ui_controller, ui_controller, input_func)
+            else:
+                returncode = run_program(output, args, connection_list, ui_controller, ui_controller, input_func)
         else:
             assert False, 'invalid mode ' + repr(args.mode)
+        if stats is not None:
+            show_stats(output, stats, args.stats_json)
+        if args.show_leaks:
+            ui_controller.leaks_command('')
+        if profiler is not None:
+            summary = profiler.summary('resolve')
+            profiler.restore()
+            output.show('\n'.join(['Profile:'] + ['  ' + line for line in summary]))
+        if args.mode == Mode.RUN:
+            exit(returncode)
 
 if __name__ == '__main__':
     if check_gdb():
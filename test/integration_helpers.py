@@ -1,7 +1,11 @@
 import os
+import io
+import queue
 import subprocess
 import shutil
-from typing import List
+import threading
+import time
+from typing import Dict, List, Tuple
 
 from frontends.tui import parse_args
 from core.output import Output
@@ -61,10 +65,8 @@ def run_main(args):
     assert err.buffer == '', err.buffer
     return out.buffer
 
-def run_in_gdb(wldbg_args: List[str], gdb_args: List[str], also_run: List[str]):
-    from backends import gdb_plugin
-    from core.util import no_color
-
+def set_up_test_display() -> str:
+    '''Sets WAYLAND_DISPLAY (and XDG_RUNTIME_DIR if needed) for the mock server, and returns the socket path'''
     if not os.environ.get('XDG_RUNTIME_DIR'):
         tmp_runtime_dir = '/tmp/wldbg-runtime-dir'
         try:
@@ -80,6 +82,13 @@ def run_in_gdb(wldbg_args: List[str], gdb_args: List[str], also_run: List[str]):
         os.remove(wayland_display_path)
     if os.path.exists(wayland_display_path + '.lock'):
         os.remove(wayland_display_path + '.lock')
+    return wayland_display_path
+
+def run_in_gdb(wldbg_args: List[str], gdb_args: List[str], also_run: List[str]):
+    from backends import gdb_plugin
+    from core.util import no_color
+
+    set_up_test_display()
 
     gdb_args = ['-ex', 'set logging file ' + gdb_log_path, '-ex', 'set logging on'] + gdb_args
     if os.path.exists(gdb_log_path):
@@ -109,6 +118,101 @@ def run_in_gdb(wldbg_args: List[str], gdb_args: List[str], also_run: List[str]):
 
     return result
 
+def run_through_proxy(mock_client: str, mock_server: str, mode: str) -> Tuple[List, List]:
+    '''Runs the mock client with WAYLAND_DEBUG=1 through the wire proxy to the mock server
+    Returns the messages the proxy decoded, and the messages parsed from the client's WAYLAND_DEBUG output
+    '''
+    from core import ConnectionManager, output as core_output
+    from backends.wire_proxy import proxy, runner
+
+    server_path = set_up_test_display()
+    proxy_path = server_path + '-proxy'
+    output = core_output.Strict()
+    server = subprocess.Popen([mock_server], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    deadline = time.perf_counter() + 5
+    while not os.path.exists(server_path):
+        assert time.perf_counter() < deadline, 'mock server did not create ' + server_path
+        time.sleep(0.01)
+    events: 'queue.SimpleQueue[proxy.ProxyEvent]' = queue.SimpleQueue()
+    wire_proxy = proxy.Proxy(proxy_path, server_path, events.put)
+    wire_proxy.start()
+    env = os.environ.copy()
+    env['WAYLAND_DISPLAY'] = os.path.basename(proxy_path)
+    env['WAYLAND_DEBUG'] = '1'
+    client = subprocess.run([mock_client, mode], env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=5)
+    server_out, _ = server.communicate(timeout=5)
+    wire_proxy.stop()
+    if client.returncode != 0 or server.returncode != 0:
+        raise RuntimeError(
+            'Client exit code: ' + str(client.returncode) + ', Output: ' + client.stdout.decode('utf-8') +
+            '\nServer exit code: ' + str(server.returncode) + ', Output: ' + server_out.decode('utf-8'))
+
+    decoded = ConnectionManager()
+    decoder = runner._Decoder(output, decoded)
+    while not events.empty():
+        decoder.event(events.get())
+    decoder.cleanup()
+    return (
+        [message for conn in decoded.connections() for message in conn.messages()],
+        parse_debug_output(client.stderr.decode('utf-8')))
+
+def run_with_preload_shim(mock_client: str, mock_server: str, mode: str) -> Tuple[Dict[bool, List], Dict[bool, str]]:
+    '''Runs the mock server and client with the preload shim and WAYLAND_DEBUG=1
+    Returns the messages the shim recorded and the WAYLAND_DEBUG output of each program, both keyed by if it is the
+    server
+    '''
+    from core import ConnectionManager, output as core_output
+    from backends.preload_shim import decode, runner
+
+    shim = runner.shim_library_path()
+    server_path = set_up_test_display()
+    readable, writable = os.pipe()
+    env = os.environ.copy()
+    env['LD_PRELOAD'] = shim
+    env['WAYLAND_DEBUG'] = '1'
+    env[runner.shim_fd_env] = str(writable)
+    shim_output = ConnectionManager()
+    decoder = decode.RecordDecoder(core_output.Strict(), shim_output)
+
+    def read_records() -> None:
+        while True:
+            data = os.read(readable, runner.read_size)
+            if not data:
+                break
+            decoder.feed(data)
+        os.close(readable)
+    reader = threading.Thread(target=read_records, daemon=True)
+    reader.start()
+    server = subprocess.Popen([mock_server], env=env, pass_fds=(writable,), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    deadline = time.perf_counter() + 5
+    while not os.path.exists(server_path):
+        assert time.perf_counter() < deadline, 'mock server did not create ' + server_path
+        time.sleep(0.01)
+    client = subprocess.run(
+        [mock_client, mode], env=env, pass_fds=(writable,), stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=5)
+    server_out, server_err = server.communicate(timeout=5)
+    os.close(writable)
+    reader.join(5)
+    assert not reader.is_alive(), 'shim output did not end'
+    if client.returncode != 0 or server.returncode != 0:
+        raise RuntimeError(
+            'Client exit code: ' + str(client.returncode) + ', Output: ' + client.stdout.decode('utf-8') +
+            '\nServer exit code: ' + str(server.returncode) + ', Output: ' + server_out.decode('utf-8'))
+    decoder.cleanup()
+    messages: Dict[bool, List] = {True: [], False: []}
+    for conn in shim_output.connections():
+        messages[bool(conn.is_server())].extend(conn.messages())
+    return messages, {True: server_err.decode('utf-8'), False: client.stderr.decode('utf-8')}
+
+def parse_debug_output(debug_output: str) -> List:
+    '''Returns the messages in WAYLAND_DEBUG output'''
+    from core import ConnectionManager, output as core_output
+    from backends.libwayland_debug_output import parse
+
+    connections = ConnectionManager()
+    parse.into_sink(io.StringIO(debug_output), core_output.Strict(), connections)
+    return [message for conn in connections.connections() for message in conn.messages()]
+
 mock_program_path = 'test/mock_program'
 
 def build_mock_program():
@@ -130,3 +130,103 @@ class MockProgramInGDBTests(TestCase):
         result = self.run_server_in_gdb('keyboard-enter')
         # The keys the server provides to wl_keybaord.enter()
         self.assertIn('keys=[69, 420]', result)
+
+class WireProxyTests(TestCase):
+    '''The messages the wire proxy decodes should be the ones libwayland prints with WAYLAND_DEBUG=1'''
+    def setUp(self):
+        from core import output
+        from core.wl import protocol
+        mock_client, mock_server = helpers.build_mock_program()
+        self.mock_client = mock_client
+        self.mock_server = mock_server
+        protocol.load_all(output.Strict())
+        self.addCleanup(protocol.dump_all)
+
+    def check_mode(self, mode):
+        decoded, debug_output = helpers.run_through_proxy(self.mock_client, self.mock_server, mode)
+        self.assertGreater(len(debug_output), 0)
+        # libwayland prints requests when they are queued and events when they are dispatched, so the order of
+        # requests relative to events can be different from what went through the proxy
+        for sent in (True, False):
+            self.assertEqual(
+                [message_summary(m) for m in decoded if m.sent == sent],
+                [message_summary(m) for m in debug_output if m.sent == sent])
+
+    def test_simple_client(self):
+        self.check_mode('simple-client')
+
+    def test_pointer_move(self):
+        self.check_mode('pointer-move')
+
+    def test_dispatcher(self):
+        self.check_mode('dispatcher')
+
+    def test_server_created_obj(self):
+        self.check_mode('server-created-obj')
+
+    def test_keyboard_enter(self):
+        self.check_mode('keyboard-enter')
+
+class PreloadShimTests(TestCase):
+    '''The messages the preload shim records should be the ones libwayland prints with WAYLAND_DEBUG=1 in the same
+    process'''
+    def setUp(self):
+        from core import output
+        from core.wl import protocol
+        mock_client, mock_server = helpers.build_mock_program()
+        self.mock_client = mock_client
+        self.mock_server = mock_server
+        protocol.load_all(output.Strict())
+        self.addCleanup(protocol.dump_all)
+
+    def check_mode(self, mode):
+        recorded, debug_output = helpers.run_with_preload_shim(self.mock_client, self.mock_server, mode)
+        server_messages = helpers.parse_debug_output(debug_output[True])
+        self.assertGreater(len(server_messages), 0)
+        self.assertEqual([message_summary(m) for m in recorded[True]], [message_summary(m) for m in server_messages])
+        # Clients are traced with the observer API the shim looks up at runtime, which needs libwayland 1.23+
+        if 'too old to trace clients' in debug_output[False]:
+            self.assertEqual(recorded[False], [])
+        else:
+            client_messages = helpers.parse_debug_output(debug_output[False])
+            self.assertGreater(len(client_messages), 0)
+            self.assertEqual(
+                [message_summary(m) for m in recorded[False]],
+                [message_summary(m) for m in client_messages])
+
+    def test_simple_client(self):
+        self.check_mode('simple-client')
+
+    def test_pointer_move(self):
+        self.check_mode('pointer-move')
+
+    def test_dispatcher(self):
+        self.check_mode('dispatcher')
+
+    def test_server_created_obj(self):
+        self.check_mode('server-created-obj')
+
+    def test_keyboard_enter(self):
+        self.check_mode('keyboard-enter')
+
+def arg_summary(arg):
+    '''What an argument should have in common whether it was decoded by the proxy or parsed from WAYLAND_DEBUG
+    File descriptors are numbered differently in each process, WAYLAND_DEBUG rounds fixed point numbers and it only
+    shows the size of arrays (as "array" or "array[size]" depending on the libwayland version)
+    '''
+    from core.wl import Arg
+    if isinstance(arg, Arg.Fd):
+        return 'fd'
+    elif isinstance(arg, Arg.Float):
+        return round(arg.value, 2)
+    elif isinstance(arg, Arg.Object):
+        return (arg.obj.type, arg.obj.id, arg.is_new)
+    elif isinstance(arg, Arg.Array) or (isinstance(arg, Arg.Unknown) and (arg.string or '').startswith('array[')):
+        return 'array'
+    elif isinstance(arg, (Arg.Int, Arg.String)):
+        return arg.value
+    else:
+        return type(arg).__name__
+
+def message_summary(message):
+    return (message.sent, message.obj.type, message.obj.id, message.name, [arg_summary(arg) for arg in message.args])